@@ -0,0 +1,96 @@
+"""Download archive: which (extractor, video id) was downloaded with which output options
+
+Like yt-dlp's --download-archive, but an indexed SQLite table instead of a
+text file read line by line, so a lookup costs the same with 100 or 500k
+entries and can run before any network request.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive (
+    extractor   TEXT NOT NULL,
+    video_id    TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    output_path TEXT,
+    added       REAL NOT NULL,
+    PRIMARY KEY (extractor, video_id, options)
+) WITHOUT ROWID;
+"""
+
+# job options that make a different file (the rest, like 'playlist', don't)
+OUTPUT_OPTIONS = ('download_type', 'file_format', 'quality', 'download_path')
+# clips are different files; only in the key when set, so keys of whole-file downloads don't change
+CLIP_OPTIONS = ('sections', 'chapters', 'exact_cuts')
+
+
+def output_key(options):
+    """Stable text form of the options that decide the output file"""
+    key = {name: options.get(name) for name in OUTPUT_OPTIONS}
+    key.update((name, options[name]) for name in CLIP_OPTIONS if options.get(name))
+    return json.dumps(key, sort_keys=True)
+
+
+class DownloadArchive:
+    """SQLite (WAL) archive of finished downloads, safe to share between threads"""
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def find(self, extractor, video_id, options):
+        """(True, output path) if archived (path may be None), else (False, None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output_path FROM archive WHERE extractor = ? AND video_id = ? AND options = ?",
+                (extractor.lower(), str(video_id), output_key(options))).fetchone()
+        return (True, row[0]) if row else (False, None)
+
+    def add(self, extractor, video_id, options, output_path=None):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO archive (extractor, video_id, options, output_path, added) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (extractor.lower(), str(video_id), output_key(options), output_path, time.time()))
+
+    def remove(self, extractor, video_id, options):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM archive WHERE extractor = ? AND video_id = ? AND options = ?",
+                    (extractor.lower(), str(video_id), output_key(options)))
+
+    def import_ytdlp(self, path, options):
+        """Add the entries of a yt-dlp --download-archive file ("extractor id" lines) for options"""
+        rows = []
+        now = time.time()
+        key = output_key(options)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2:
+                    rows.append((parts[0].lower(), parts[1], key, None, now))
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO archive (extractor, video_id, options, output_path, added) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,100 @@
+"""Global bandwidth limit shared by all running downloads
+
+One rate for the whole app, split between the jobs that are transferring
+right now in proportion to their weight (from priority). Each job has its
+own token bucket refilled at its current share; the transfer thread pays
+for every block from the progress hook and sleeps while its bucket is in
+debt. Rate and weights are re-read on every refill, so changes apply to
+running downloads within a fraction of a second.
+"""
+import threading
+import time
+
+# job priority (PRIORITIES value) -> share weight
+PRIORITY_WEIGHTS = {0: 8, 1: 2, 2: 1}
+
+BURST_SECONDS = 0.5   # a bucket holds at most this much of its share
+IDLE_SECONDS = 2.0    # jobs silent for this long stop counting towards the split
+MAX_SLEEP = 0.25      # re-check rate/weights/cancel at least this often
+
+
+def weight_for(priority):
+    return PRIORITY_WEIGHTS.get(priority, 1)
+
+
+def parse_rate(text):
+    """'500K', '2M', '1.5m', '800000' -> bytes/s (None for '0'/'none')"""
+    text = text.strip().upper().rstrip('/S').rstrip('B')
+    if text in ('', '0', 'NONE'):
+        return None
+    multiplier = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}.get(text[-1], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    rate = float(text) * multiplier
+    if rate <= 0:
+        return None
+    return int(rate)
+
+
+class BandwidthManager:
+    """Weighted token buckets under one global rate (bytes/s, None = unlimited)"""
+    def __init__(self, rate=None):
+        self.rate = rate or None
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [weight, tokens, last refill, last seen]
+
+    def set_rate(self, rate):
+        """Change the global limit, None/0 lifts it"""
+        with self._lock:
+            self.rate = rate or None
+
+    def consume(self, key, weight, nbytes, cancelled=None):
+        """Charge nbytes to key's bucket, sleeping until it is paid off
+
+        Returns early when the limit is lifted or cancelled() turns true.
+        """
+        if not self.rate:
+            return
+        with self._lock:
+            bucket = self._bucket(key, weight)
+            bucket[1] -= nbytes
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return
+                share = self._refill(key, weight)
+                debt = -self._buckets[key][1]
+            if debt <= 0 or (cancelled and cancelled()):
+                return
+            time.sleep(min(debt / share, MAX_SLEEP))
+
+    def forget(self, key):
+        """Job finished, its share goes back to the others"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def active_count(self):
+        with self._lock:
+            return len(self._buckets)
+
+    def _bucket(self, key, weight):
+        # caller holds the lock
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [weight, 0.0, now, now]
+        bucket[0] = weight
+        bucket[3] = now
+        return bucket
+
+    def _refill(self, key, weight):
+        # caller holds the lock, returns key's current share in bytes/s
+        now = time.monotonic()
+        for other in [k for k, b in self._buckets.items() if now - b[3] > IDLE_SECONDS and k != key]:
+            del self._buckets[other]
+        bucket = self._bucket(key, weight)
+        total_weight = sum(b[0] for b in self._buckets.values())
+        share = self.rate * bucket[0] / total_weight
+        bucket[1] = min(bucket[1] + (now - bucket[2]) * share, share * BURST_SECONDS)
+        bucket[2] = now
+        return share
@@ -0,0 +1,90 @@
+"""Fragment concurrency benchmark against a local, throttled HLS server
+
+Serves a synthetic HLS playlist whose segments are throttled per connection
+(like hosts that limit each connection), then downloads it with one fragment
+at a time and with the adaptive controller.
+
+    python benchmarks/hls_fragments.py                       # print JSON
+    python benchmarks/hls_fragments.py --error-rate 0.05     # some segments answer 429
+    python benchmarks/hls_fragments.py -o hls_fragments.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import DownloadEngine, default_options  # noqa: E402
+from mediaserver import SEGMENT_SECONDS, MediaServer, make_media  # noqa: E402
+
+
+def download(url, fragment_workers, folder):
+    """Seconds to download url, and the controller's final limit"""
+    engine = DownloadEngine(fragment_workers=fragment_workers, cache_folder=folder)
+    controllers = []
+    build_ydl_opts = engine.build_ydl_opts
+
+    def keep_controller(job):
+        opts = build_ydl_opts(job)
+        controllers.append(opts['fragment_controller'])
+        return opts
+    engine.build_ydl_opts = keep_controller
+
+    start = time.perf_counter()
+    job = engine.submit(url, default_options('video', 'mp4', 'Best', os.path.join(folder, str(fragment_workers))))
+    engine.wait()
+    elapsed = time.perf_counter() - start
+    engine.close()
+    return {
+        'seconds': round(elapsed, 2),
+        'state': job.state,
+        'error': job.error,
+        'final_limit': controllers[-1].limit if controllers else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HLS fragment concurrency benchmark")
+    parser.add_argument('--segments', type=int, default=40)
+    parser.add_argument('--segment-kib', type=int, default=256)
+    parser.add_argument('--rate-kib', type=int, default=512, help="per connection rate (default 512 KiB/s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of segment requests answering 429")
+    parser.add_argument('--workers', type=int, default=8, help="max fragments per job for the adaptive run")
+    parser.add_argument('-o', '--output', help="write JSON results to this file")
+    args = parser.parse_args(argv)
+
+    media = make_media(args.segments * args.segment_kib * 1024, args.segments * SEGMENT_SECONDS)
+    server = MediaServer(media, rate=args.rate_kib * 1024, error_rate=args.error_rate, error_status=429).start()
+    url = server.url('hls', 'stream')
+
+    folder = tempfile.mkdtemp(prefix='fragbench-')
+    try:
+        results = {
+            'segments': args.segments,
+            'segment_kib': args.segment_kib,
+            'rate_kib': args.rate_kib,
+            'error_rate': args.error_rate,
+            'sequential': download(url, 1, folder),
+            'adaptive': download(url, args.workers, folder),
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(folder, ignore_errors=True)
+    sequential, adaptive = results['sequential']['seconds'], results['adaptive']['seconds']
+    results['speedup'] = round(sequential / adaptive, 2) if adaptive else None
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0 if results['adaptive']['state'] == 'done' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""Local stand-in for a media site, for offline benchmarks
+
+Serves synthetic media with a per-connection rate limit, a first-byte delay
+and a share of failing requests:
+
+    /progressive/<name>.mp4     one file with video and audio (Range requests work)
+    /split/<name>.mpd           DASH manifest with separate video and audio files
+    /hls/<name>.m3u8            HLS playlist, segments under /hls/<name>/
+
+<name> is free, so every job can get its own URL (and output file). All of
+them go through yt-dlp's generic extractor, no site code involved.
+
+With an ffmpeg the payloads are real (test pattern + tone) so merging and
+conversion do real work; without one they are random bytes of the same size.
+
+    python benchmarks/mediaserver.py --port 8800 --rate-kib 512   # run it by hand
+"""
+import argparse
+import os
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHUNK = 16 * 1024
+SEGMENT_SECONDS = 2
+AUDIO_BITRATE = 128 * 1000
+
+
+def encode(ffmpeg, args, path):
+    """Run one ffmpeg encode, True if it produced path"""
+    try:
+        proc = subprocess.run([ffmpeg, '-y', '-v', 'error'] + args + [path],
+                              capture_output=True, timeout=300)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return proc.returncode == 0 and os.path.getsize(path) > 0
+
+
+def make_media(size, seconds=10, ffmpeg=None):
+    """Payloads by kind: 'progressive', 'video', 'audio' (bytes) and 'segments' (list of bytes)
+
+    size is the progressive file's size; real media is encoded at the bitrate
+    that gives about that size, random bytes are used if there's no ffmpeg or
+    encoding fails.
+    """
+    if ffmpeg:
+        folder = tempfile.mkdtemp(prefix='mediaserver-')
+        try:
+            media = _encode_media(ffmpeg, folder, size, seconds)
+            if media:
+                return media
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    audio_size = min(size // 4, AUDIO_BITRATE // 8 * seconds)
+    count = max(1, seconds // SEGMENT_SECONDS)
+    return {
+        'real': False,
+        'seconds': seconds,
+        'progressive': os.urandom(size),
+        'video': os.urandom(size - audio_size),
+        'audio': os.urandom(audio_size),
+        'segments': [os.urandom(size // count) for _ in range(count)],
+    }
+
+
+def _encode_media(ffmpeg, folder, size, seconds):
+    video_bitrate = max(100 * 1000, size * 8 // seconds - AUDIO_BITRATE)
+    video_in = ['-f', 'lavfi', '-i', f'testsrc=duration={seconds}:size=640x360:rate=25']
+    audio_in = ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}']
+    video_codec = ['-c:v', 'mpeg4', '-b:v', str(video_bitrate)]
+    audio_codec = ['-c:a', 'aac', '-b:a', str(AUDIO_BITRATE)]
+
+    def path(name):
+        return os.path.join(folder, name)
+
+    ok = (encode(ffmpeg, video_in + audio_in + video_codec + audio_codec, path('progressive.mp4'))
+          and encode(ffmpeg, video_in + video_codec + ['-an'], path('video.mp4'))
+          and encode(ffmpeg, audio_in + audio_codec + ['-vn'], path('audio.m4a'))
+          and encode(ffmpeg, video_in + audio_in + video_codec + audio_codec +
+                     ['-f', 'segment', '-segment_time', str(SEGMENT_SECONDS), '-segment_format', 'mpegts'],
+                     path('seg%03d.ts')))
+    if not ok:
+        return None
+
+    def read(name):
+        with open(path(name), 'rb') as f:
+            return f.read()
+    return {
+        'real': True,
+        'seconds': seconds,
+        'progressive': read('progressive.mp4'),
+        'video': read('video.mp4'),
+        'audio': read('audio.m4a'),
+        'segments': [read(name) for name in sorted(os.listdir(folder)) if name.endswith('.ts')],
+    }
+
+
+def dash_manifest(name, media):
+    seconds = media['seconds']
+    video_bandwidth = len(media['video']) * 8 // seconds
+    audio_bandwidth = len(media['audio']) * 8 // seconds
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" minBufferTime="PT2S"
+     mediaPresentationDuration="PT{seconds}S" profiles="urn:mpeg:dash:profile:isoff-on-demand:2011">
+  <Period>
+    <AdaptationSet contentType="video" mimeType="video/mp4">
+      <Representation id="video" bandwidth="{video_bandwidth}" codecs="mp4v.20.9" width="640" height="360">
+        <BaseURL>{name}-video.mp4</BaseURL>
+      </Representation>
+    </AdaptationSet>
+    <AdaptationSet contentType="audio" mimeType="audio/mp4" lang="en">
+      <Representation id="audio" bandwidth="{audio_bandwidth}" codecs="mp4a.40.2" audioSamplingRate="44100">
+        <BaseURL>{name}-audio.m4a</BaseURL>
+      </Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>
+"""
+
+
+def hls_playlist(name, media):
+    seconds = media['seconds'] / len(media['segments'])
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{int(seconds + 0.999)}',
+             '#EXT-X-MEDIA-SEQUENCE:0', '#EXT-X-PLAYLIST-TYPE:VOD']
+    for index in range(len(media['segments'])):
+        lines += [f'#EXTINF:{seconds:.3f},', f'{name}/{index}.ts']
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+class MediaServer:
+    """Threaded HTTP server on 127.0.0.1 serving make_media() payloads
+
+    rate: bytes/s per connection (None = as fast as possible)
+    latency: seconds before the first byte of every response
+    error_rate: share of media requests (not manifests) answered with error_status
+    """
+    def __init__(self, media, rate=None, latency=0.0, error_rate=0.0, error_status=503, port=0):
+        self.media = media
+        self.rate = rate
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+
+    def url(self, kind, name):
+        """URL of a 'progressive', 'split' or 'hls' item"""
+        ext = {'progressive': 'mp4', 'split': 'mpd', 'hls': 'm3u8'}[kind]
+        return f'http://127.0.0.1:{self.port}/{kind}/{name}.{ext}'
+
+    def start(self):
+        """Serve from a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors, 'bytes_sent': self.bytes_sent}
+
+    def _count(self, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += error
+
+    def _sent(self, nbytes):
+        with self._lock:
+            self.bytes_sent += nbytes
+
+    def _route(self, path):
+        """(content type, payload, is media) for a request path, None if unknown"""
+        media = self.media
+        match = re.fullmatch(r'/progressive/[^/]+\.mp4', path)
+        if match:
+            return 'video/mp4', media['progressive'], True
+        match = re.fullmatch(r'/split/([^/]+?)(?:-(video|audio))?\.(mpd|mp4|m4a)', path)
+        if match:
+            name, kind, ext = match.groups()
+            if kind is None and ext == 'mpd':
+                return 'application/dash+xml', dash_manifest(name, media).encode(), False
+            if kind == 'video' and ext == 'mp4':
+                return 'video/mp4', media['video'], True
+            if kind == 'audio' and ext == 'm4a':
+                return 'audio/mp4', media['audio'], True
+            return None
+        match = re.fullmatch(r'/hls/([^/]+)\.m3u8', path)
+        if match:
+            return 'application/vnd.apple.mpegurl', hls_playlist(match.group(1), media).encode(), False
+        match = re.fullmatch(r'/hls/[^/]+/(\d+)\.ts', path)
+        if match and int(match.group(1)) < len(media['segments']):
+            return 'video/mp2t', media['segments'][int(match.group(1))], True
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.respond(body=False)
+
+            def do_GET(self):
+                self.respond(body=True)
+
+            def respond(self, body):
+                route = server._route(self.path.split('?')[0])
+                if route is None:
+                    self.send_error(404)
+                    return
+                content_type, payload, is_media = route
+                if server.latency:
+                    time.sleep(server.latency)
+                if is_media and server.error_rate and random.random() < server.error_rate:
+                    server._count(error=True)
+                    self.send_error(server.error_status)
+                    return
+                server._count()
+                start, end = 0, len(payload) - 1
+                byte_range = re.fullmatch(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+                if byte_range and is_media and any(byte_range.groups()):
+                    first, last = byte_range.groups()
+                    if first:
+                        start, end = int(first), min(int(last or end), end)
+                    else:
+                        start = max(0, len(payload) - int(last))
+                    if start > end:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{len(payload)}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{end}/{len(payload)}')
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.send_header('Accept-Ranges', 'bytes')
+                self.end_headers()
+                if body:
+                    self.send_payload(payload, start, end + 1)
+
+            def send_payload(self, payload, start, stop):
+                for offset in range(start, stop, CHUNK):
+                    block = payload[offset:min(offset + CHUNK, stop)]
+                    try:
+                        self.wfile.write(block)
+                    except OSError:
+                        return  # client went away (cancelled / retried)
+                    server._sent(len(block))
+                    if server.rate:
+                        time.sleep(len(block) / server.rate)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve synthetic media for offline benchmarks")
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--size-mib', type=float, default=4, help="progressive file size (default 4 MiB)")
+    parser.add_argument('--seconds', type=int, default=10, help="media duration (default 10)")
+    parser.add_argument('--rate-kib', type=int, help="per connection rate limit in KiB/s")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds before each response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of media requests that fail")
+    parser.add_argument('--ffmpeg', default=shutil.which('ffmpeg'), help="ffmpeg for real media (default: PATH)")
+    args = parser.parse_args(argv)
+
+    media = make_media(int(args.size_mib * 1024 * 1024), args.seconds, args.ffmpeg)
+    server = MediaServer(media, rate=args.rate_kib * 1024 if args.rate_kib else None, latency=args.latency,
+                         error_rate=args.error_rate, port=args.port)
+    print(f"{'real' if media['real'] else 'synthetic'} media on:")
+    for kind in ('progressive', 'split', 'hls'):
+        print(f"  {server.url(kind, 'example')}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
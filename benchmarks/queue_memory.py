@@ -0,0 +1,116 @@
+"""Memory held by a large download queue
+
+Queues N jobs that never start (the single worker is kept busy) and reports
+the Python heap they hold. Part of them can be resolved playlist entries with
+a realistic info dict (40 formats with headers, thumbnails, subtitles), the
+kind that used to stay in memory per queued job.
+
+    python benchmarks/queue_memory.py                        # 50,000 jobs, 10% resolved entries
+    python benchmarks/queue_memory.py --jobs 200000 --max-kib-per-job 1.5   # exit 1 above the bound
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import DownloadEngine, archive_id_from_url, default_options  # noqa: E402
+
+FORMATS_PER_ENTRY = 40
+
+
+def resolved_entry(index):
+    """Info dict like a playlist extractor returns for an already resolved entry"""
+    headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)',
+               'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+               'Accept-Language': 'en-us,en;q=0.5', 'Sec-Fetch-Mode': 'navigate'}
+    return {
+        'id': f'entry{index}',
+        'title': f'Entry {index}',
+        'duration': 600,
+        'webpage_url': f'https://media.example.com/watch/{index}',
+        'extractor': 'example', 'extractor_key': 'Example',
+        'thumbnails': [{'url': f'https://img.example.com/{index}/{k}.jpg', 'width': 160 * k, 'height': 90 * k,
+                        'id': str(k)} for k in range(1, 21)],
+        'subtitles': {lang: [{'url': f'https://media.example.com/subs/{index}.{lang}.vtt', 'ext': 'vtt'}]
+                      for lang in ('en', 'de', 'fr', 'es')},
+        'formats': [{'format_id': str(k), 'ext': 'mp4', 'protocol': 'https',
+                     'url': f'https://cdn.example.com/{index}/{k}.mp4?expire=1700000000&sig=' + 'f' * 256,
+                     'width': 256 * k, 'height': 144 * k, 'vcodec': 'avc1.4d401f', 'acodec': 'none',
+                     'tbr': 100.0 * k, 'http_headers': dict(headers)} for k in range(1, FORMATS_PER_ENTRY + 1)],
+    }
+
+
+class _Ydl:
+    """Enough of a YoutubeDL for engine._submit_entry"""
+    @staticmethod
+    def sanitize_info(info):
+        return info
+
+
+def run(count=50000, resolved_share=0.1):
+    """Queue count jobs, returns the heap they hold"""
+    folder = tempfile.mkdtemp(prefix='queue-memory-')
+    engine = DownloadEngine(max_workers=1, cache_folder=folder)
+    busy = threading.Event()
+    engine.queue.run_job = lambda job: busy.wait() or True  # nothing leaves the queue
+    options = default_options('video', 'mp4', 'Best', folder)
+    playlist = {'title': 'Example list', 'webpage_url': 'https://media.example.com/list'}
+    every = round(1 / resolved_share) if resolved_share else 0
+    entry_bytes = len(json.dumps(resolved_entry(0)))
+    # yt-dlp and its extractor list load once per process (the first queued URL is identified), not per job
+    archive_id_from_url(playlist['webpage_url'])
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        resolved = 0
+        for index in range(count):
+            if every and index % every == 0:
+                engine._submit_entry(_Ydl, playlist, resolved_entry(index), options, 1, index + 1)
+                resolved += 1
+            else:
+                engine.submit(f'https://media.example.com/watch/{index}?utm_source=bench', options)
+        seconds = time.perf_counter() - start
+        held, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        engine.cancel_all()
+        busy.set()
+        engine.close()
+    held -= before
+    return {
+        'jobs': count,
+        'resolved_entries': resolved,
+        'entry_info_kib': round(entry_bytes / 1024, 1),
+        'queue_seconds': round(seconds, 2),
+        'held_mib': round(held / 1024 ** 2, 1),
+        'peak_mib': round((peak - before) / 1024 ** 2, 1),
+        'kib_per_job': round(held / 1024 / count, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory held by a large download queue")
+    parser.add_argument('--jobs', type=int, default=50000, help="queued jobs (default 50000)")
+    parser.add_argument('--resolved', type=float, default=0.1,
+                        help="share of resolved playlist entries with full info (default 0.1)")
+    parser.add_argument('--max-kib-per-job', type=float, help="exit 1 if the queue holds more than this per job")
+    args = parser.parse_args(argv)
+    results = run(max(1, args.jobs), min(1.0, max(0.0, args.resolved)))
+    print(json.dumps(results, indent=2))
+    if args.max_kib_per_job and results['kib_per_job'] > args.max_kib_per_job:
+        print(f"REGRESSION {results['kib_per_job']} KiB per job > {args.max_kib_per_job}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
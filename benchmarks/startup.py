@@ -0,0 +1,133 @@
+"""Startup benchmark
+
+Measures, in fresh interpreters:
+  - import cost of our modules and yt-dlp (python -X importtime)
+  - wall time until the CLI prints its first line
+  - wall time until the GUI window has painted (needs a display)
+
+    python benchmarks/startup.py                          # print JSON
+    python benchmarks/startup.py -o startup.json          # save results
+    python benchmarks/startup.py --baseline startup.json  # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module -> import time is measured for each of these
+IMPORTS = ['engine', 'cli', 'downloader', 'yt_dlp', 'customtkinter']
+
+
+def import_time(module):
+    """Cumulative import time of module in microseconds (python -X importtime)"""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    for line in reversed(proc.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package"
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    return None
+
+
+def time_to_first_line(args, env=None, expect=None, timeout=60):
+    """Seconds from spawn until the child prints a (matching) line"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable] + args, cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    elapsed = None
+    try:
+        for line in proc.stdout:
+            if expect is None or expect in line:
+                elapsed = time.perf_counter() - start
+                break
+    finally:
+        proc.kill()
+        proc.wait(timeout=timeout)
+    return elapsed
+
+
+def has_display():
+    if platform.system() in ("Windows", "Darwin"):
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def summarize(samples):
+    samples = [s for s in samples if s is not None]
+    if not samples:
+        return None
+    return {'median': statistics.median(samples), 'min': min(samples), 'runs': len(samples)}
+
+
+def run(repeat):
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'import_us': {},
+        'wall_s': {},
+    }
+    for module in IMPORTS:
+        results['import_us'][module] = summarize([import_time(module) for _ in range(repeat)])
+
+    results['wall_s']['cli_first_output'] = summarize(
+        [time_to_first_line(['cli.py', '--help']) for _ in range(repeat)])
+
+    if has_display():
+        env = dict(os.environ, THEDOWNLOADER_STARTUP_BENCH='1')
+        results['wall_s']['gui_first_paint'] = summarize(
+            [time_to_first_line(['downloader.py'], env=env, expect='first-paint') for _ in range(repeat)])
+    else:
+        results['wall_s']['gui_first_paint'] = None  # no display here
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """Metrics whose median got slower than baseline by more than tolerance"""
+    found = []
+    for group in ('import_us', 'wall_s'):
+        for name, current in results.get(group, {}).items():
+            before = baseline.get(group, {}).get(name)
+            if not current or not before:
+                continue
+            if current['median'] > before['median'] * (1 + tolerance):
+                found.append(f"{group}.{name}: {before['median']:.4g} -> {current['median']:.4g}")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument('-n', '--repeat', type=int, default=5, help="runs per measurement (default 5)")
+    parser.add_argument('-o', '--output', help="write JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown vs baseline as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(max(1, args.repeat))
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+"""Offline benchmark suite against the local media server (benchmarks/mediaserver.py)
+
+Sections (all by default, pick with --only):
+  throughput      end-to-end MiB/s for 1..N concurrent jobs, progressive / split (DASH) / HLS
+  hooks           progress hook cost per call, and its share of a real run
+  postprocessing  merge and conversion time (needs ffmpeg)
+  clips           bytes fetched and time for a tenth of a video vs all of it (needs ffmpeg)
+  memory          Python heap peak and process RSS for a batch of jobs
+  sessions        time from job start to first byte with and without reused YoutubeDL sessions
+  lookup          bulk metadata lookup of a URL list, wall time by number of lookup workers
+  queue           Python heap held by a large queue of jobs that haven't started (benchmarks/queue_memory.py)
+  startup         benchmarks/startup.py (imports, time to first output)
+
+    python benchmarks/suite.py -o bench.json
+    python benchmarks/suite.py --only throughput --concurrency 1,2,4,8 --rate-kib 2048
+    python benchmarks/suite.py --baseline bench.json      # exit 1 on regression
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import queue_memory  # noqa: E402
+import startup  # noqa: E402
+from engine import DownloadEngine, DownloadJob, default_options  # noqa: E402
+from lookup import LOOKUP_WORKERS  # noqa: E402
+from mediaserver import MediaServer, make_media  # noqa: E402
+
+SECTIONS = ('throughput', 'hooks', 'postprocessing', 'clips', 'memory', 'sessions', 'lookup', 'queue', 'startup')
+SCENARIOS = ('progressive', 'split', 'hls')
+
+HOOK_CALLS = 200000
+
+
+class Bench:
+    """One media server + scratch folder shared by all sections"""
+    def __init__(self, args):
+        self.args = args
+        self.ffmpeg = args.ffmpeg
+        self.media = make_media(int(args.size_mib * 1024 * 1024), args.seconds, self.ffmpeg)
+        self.server = MediaServer(self.media, rate=args.rate_kib * 1024 if args.rate_kib else None,
+                                  latency=args.latency, error_rate=args.error_rate).start()
+        self.folder = tempfile.mkdtemp(prefix='bench-')
+        self.runs = 0
+
+    def close(self):
+        self.server.stop()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def engine(self, workers, **kwargs):
+        ffprobe = shutil.which('ffprobe', path=os.path.dirname(self.ffmpeg)) if self.ffmpeg else None
+        return DownloadEngine(max_workers=workers, host_limit=workers, cache_folder=self.folder,
+                              ffmpeg_path=self.ffmpeg if ffprobe else None, ffprobe_path=ffprobe, **kwargs)
+
+    def run_jobs(self, kind, count, workers=None, options=None, engine_hook=None, **engine_kwargs):
+        """Download count fresh items at once, returns (engine, jobs, seconds); the engine is closed"""
+        self.runs += 1
+        folder = os.path.join(self.folder, f'run{self.runs}')
+        options = options or default_options('video', 'mp4', 'Best', folder)
+        options['download_path'] = folder
+        engine = self.engine(workers or count, **engine_kwargs)
+        if engine_hook:
+            engine_hook(engine)
+        start = time.perf_counter()
+        jobs = [engine.submit(self.server.url(kind, f'{kind}-{self.runs}-{index}'), dict(options))
+                for index in range(count)]
+        engine.wait(poll=0.05)
+        elapsed = time.perf_counter() - start
+        engine.close()
+        shutil.rmtree(folder, ignore_errors=True)
+        return engine, jobs, elapsed
+
+
+def phase_medians(engine):
+    """Median seconds per phase over the jobs of one engine"""
+    phases = {}
+    for record in engine.metrics.snapshot()['recent_jobs']:
+        for phase, seconds in record['phases'].items():
+            phases.setdefault(phase, []).append(seconds)
+    return {phase: round(statistics.median(values), 4) for phase, values in phases.items()}
+
+
+def bench_throughput(bench):
+    results = {}
+    for kind in SCENARIOS:
+        if kind == 'split' and not bench.ffmpeg:
+            results[kind] = {'skipped': "merging needs ffmpeg"}
+            continue
+        results[kind] = {}
+        for count in bench.args.concurrency:
+            engine, jobs, elapsed = bench.run_jobs(kind, count)
+            moved = sum(job.bytes_moved() for job in jobs)
+            results[kind][str(count)] = {
+                'seconds': round(elapsed, 3),
+                'mib_per_s': round(moved / elapsed / 1024 ** 2, 3),
+                'done': sum(job.state == 'done' for job in jobs),
+                'failed': sum(job.state == 'failed' for job in jobs),
+                'phase_median_s': phase_medians(engine),
+            }
+    return results
+
+
+def bench_hooks(bench):
+    """Per-call cost of DownloadEngine.progress_hook, and its total share of a real run"""
+    engine = bench.engine(1)
+    job = DownloadJob('http://127.0.0.1/hook', default_options('video', 'mp4', 'Best', bench.folder))
+    total = 1024 ** 3
+    block = total // HOOK_CALLS
+
+    def per_call():
+        start = time.perf_counter()
+        for index in range(HOOK_CALLS):
+            engine.progress_hook(job, {
+                'status': 'downloading', 'filename': 'x.mp4', 'tmpfilename': 'x.mp4.part',
+                'downloaded_bytes': index * block, 'total_bytes': total, 'speed': 1e6, 'eta': 1})
+        return (time.perf_counter() - start) / HOOK_CALLS * 1e6
+
+    results = {'unlimited_us_per_call': round(per_call(), 3)}
+    job.file_bytes.clear()
+    engine.set_rate_limit(1024 ** 4)  # a limit that never sleeps: just the accounting
+    results['rate_limited_us_per_call'] = round(per_call(), 3)
+    engine.close()
+
+    spent = {'calls': 0, 'seconds': 0.0}
+
+    def timed(engine):
+        hook = engine.progress_hook
+
+        def progress_hook(job, d):
+            start = time.perf_counter()
+            try:
+                hook(job, d)
+            finally:
+                spent['calls'] += 1
+                spent['seconds'] += time.perf_counter() - start
+        engine.progress_hook = progress_hook
+
+    count = max(bench.args.concurrency)
+    _, _, elapsed = bench.run_jobs('progressive', count, engine_hook=timed)
+    results['in_run'] = {
+        'jobs': count,
+        'calls': spent['calls'],
+        'hook_seconds': round(spent['seconds'], 4),
+        'share_of_wall': round(spent['seconds'] / elapsed, 5),
+    }
+    return results
+
+
+def bench_postprocessing(bench):
+    if not bench.ffmpeg:
+        return {'skipped': "needs ffmpeg"}
+    results = {'real_media': bench.media['real']}
+    engine, jobs, _ = bench.run_jobs('split', 1)
+    results['merge'] = {'state': jobs[0].state, 'phase_median_s': phase_medians(engine)}
+    if bench.media['real']:
+        # synthetic bytes can be stream-copied but not decoded
+        engine, jobs, _ = bench.run_jobs('progressive', 1, options=default_options('audio', 'mp3', 'Best'))
+        results['convert_mp3'] = {'state': jobs[0].state, 'phase_median_s': phase_medians(engine)}
+    return results
+
+
+def bench_clips(bench):
+    """A 10% clip from the middle vs the whole video: server bytes and wall time"""
+    if not bench.ffmpeg or not bench.media['real']:
+        return {'skipped': "needs ffmpeg (real media to seek in)"}
+    seconds = bench.media['seconds']
+    clip = [round(seconds * 0.45, 2), round(seconds * 0.55, 2)]
+    results = {'clip': clip}
+    for kind in ('progressive', 'hls'):
+        results[kind] = {}
+        for name, sections in (('whole', None), ('clip', [clip])):
+            sent = bench.server.stats()['bytes_sent']
+            _, jobs, elapsed = bench.run_jobs(kind, 1, options=default_options('video', 'mp4', 'Best',
+                                                                                 sections=sections))
+            results[kind][name] = {
+                'state': jobs[0].state,
+                'seconds': round(elapsed, 3),
+                'bytes_fetched': bench.server.stats()['bytes_sent'] - sent,
+            }
+        whole, part = results[kind]['whole']['bytes_fetched'], results[kind]['clip']['bytes_fetched']
+        results[kind]['fetched_share'] = round(part / whole, 3) if whole else None
+    return results
+
+
+def bench_memory(bench):
+    count = bench.args.memory_jobs
+    tracemalloc.start()
+    try:
+        _, jobs, elapsed = bench.run_jobs('progressive', count, workers=max(bench.args.concurrency))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    results = {
+        'jobs': count,
+        'done': sum(job.state == 'done' for job in jobs),
+        'seconds': round(elapsed, 3),
+        'python_peak_mib': round(peak / 1024 ** 2, 3),
+        'python_peak_kib_per_job': round(peak / 1024 / count, 1),
+    }
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # KiB on Linux, bytes on macOS
+        results['max_rss_mib'] = round(rss / (1024 ** 2 if platform.system() == 'Darwin' else 1024), 1)
+    except ImportError:
+        results['max_rss_mib'] = None  # Windows
+    return results
+
+
+def bench_sessions(bench):
+    """Per-job setup cost: a fresh YoutubeDL per job vs warm ones from the pool"""
+    count = bench.args.session_jobs
+    workers = max(bench.args.concurrency)
+    results = {'jobs': count, 'workers': workers}
+    for name, reuse in (('fresh', False), ('pooled', True)):
+        engine, jobs, elapsed = bench.run_jobs('progressive', count, workers=workers, reuse_sessions=reuse)
+        first_bytes = [job.first_byte for job in jobs if job.first_byte is not None]
+        results[name] = {
+            'seconds': round(elapsed, 3),
+            'jobs_per_s': round(count / elapsed, 2),
+            'first_byte_median_s': round(statistics.median(first_bytes), 4) if first_bytes else None,
+            'sessions': engine.sessions.stats(),
+        }
+    fresh, pooled = results['fresh']['first_byte_median_s'], results['pooled']['first_byte_median_s']
+    results['first_byte_speedup'] = round(fresh / pooled, 2) if fresh and pooled else None
+    return results
+
+
+def bench_lookup(bench):
+    """Bulk info for a list of fresh URLs, 1 worker vs more"""
+    count = bench.args.lookup_urls
+    results = {'urls': count}
+    options = default_options('video', 'mp4', 'Best', bench.folder)
+    for workers in sorted({1, LOOKUP_WORKERS}):
+        bench.runs += 1
+        urls = [bench.server.url(SCENARIOS[index % len(SCENARIOS)], f'lookup-{bench.runs}-{index}')
+                for index in range(count)]
+        engine = bench.engine(1)
+        start = time.perf_counter()
+        rows = engine.lookup(urls, options, workers=workers).wait()
+        elapsed = time.perf_counter() - start
+        engine.close()
+        results[str(workers)] = {
+            'seconds': round(elapsed, 3),
+            'urls_per_s': round(count / elapsed, 2),
+            'failed': sum(1 for row in rows if row['error']),
+        }
+    single, parallel = results['1']['seconds'], results[str(LOOKUP_WORKERS)]['seconds']
+    results['speedup'] = round(single / parallel, 2) if parallel else None
+    return results
+
+
+BENCHES = {
+    'throughput': bench_throughput,
+    'hooks': bench_hooks,
+    'postprocessing': bench_postprocessing,
+    'clips': bench_clips,
+    'memory': bench_memory,
+    'sessions': bench_sessions,
+    'lookup': bench_lookup,
+}
+
+
+def summary(results):
+    """Flat {metric: (value, 'higher'|'lower' is better)} used for baseline comparison"""
+    found = {}
+    for kind, runs in results.get('throughput', {}).items():
+        for count, run in runs.items():
+            if isinstance(run, dict) and 'mib_per_s' in run:
+                found[f'throughput.{kind}.{count}.mib_per_s'] = (run['mib_per_s'], 'higher')
+    hooks = results.get('hooks', {})
+    for name in ('unlimited_us_per_call', 'rate_limited_us_per_call'):
+        if name in hooks:
+            found[f'hooks.{name}'] = (hooks[name], 'lower')
+    for name, step in results.get('postprocessing', {}).items():
+        if isinstance(step, dict) and 'process' in step.get('phase_median_s', {}):
+            found[f'postprocessing.{name}.process_s'] = (step['phase_median_s']['process'], 'lower')
+    for kind, runs in results.get('clips', {}).items():
+        if isinstance(runs, dict) and runs.get('fetched_share'):
+            found[f'clips.{kind}.fetched_share'] = (runs['fetched_share'], 'lower')
+    memory = results.get('memory', {})
+    sessions = results.get('sessions', {})
+    if (sessions.get('pooled') or {}).get('first_byte_median_s'):
+        found['sessions.pooled.first_byte_median_s'] = (sessions['pooled']['first_byte_median_s'], 'lower')
+    for workers, run in results.get('lookup', {}).items():
+        if isinstance(run, dict) and 'urls_per_s' in run:
+            found[f'lookup.{workers}.urls_per_s'] = (run['urls_per_s'], 'higher')
+    if 'kib_per_job' in results.get('queue', {}):
+        found['queue.kib_per_job'] = (results['queue']['kib_per_job'], 'lower')
+    if 'python_peak_kib_per_job' in memory:
+        found['memory.python_peak_kib_per_job'] = (memory['python_peak_kib_per_job'], 'lower')
+    for group in ('import_us', 'wall_s'):
+        for name, value in (results.get('startup') or {}).get(group, {}).items():
+            if value:
+                found[f'startup.{group}.{name}'] = (value['median'], 'lower')
+    return found
+
+
+def regressions(results, baseline, tolerance):
+    """Metrics that got worse than baseline by more than tolerance"""
+    before = summary(baseline)
+    found = []
+    for name, (value, better) in summary(results).items():
+        if name not in before or not before[name][0]:
+            continue
+        old = before[name][0]
+        worse = value < old * (1 - tolerance) if better == 'higher' else value > old * (1 + tolerance)
+        if worse:
+            found.append(f"{name}: {old:.4g} -> {value:.4g}")
+    return found
+
+
+def parse_counts(text):
+    return sorted({max(1, int(part)) for part in text.split(',') if part.strip()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument('--only', default=','.join(SECTIONS), help=f"sections to run (default: {','.join(SECTIONS)})")
+    parser.add_argument('--concurrency', type=parse_counts, default=[1, 2, 4], help="job counts (default 1,2,4)")
+    parser.add_argument('--size-mib', type=float, default=4, help="media size per job (default 4 MiB)")
+    parser.add_argument('--seconds', type=int, default=10, help="media duration (default 10)")
+    parser.add_argument('--rate-kib', type=int, default=4096,
+                        help="per connection rate limit in KiB/s, 0 for none (default 4096)")
+    parser.add_argument('--latency', type=float, default=0.02, help="server delay before each response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of media requests answering 503")
+    parser.add_argument('--memory-jobs', type=int, default=50, help="jobs for the memory section (default 50)")
+    parser.add_argument('--session-jobs', type=int, default=30, help="jobs for the sessions section (default 30)")
+    parser.add_argument('--lookup-urls', type=int, default=24, help="URLs for the lookup section (default 24)")
+    parser.add_argument('--queue-jobs', type=int, default=50000, help="jobs for the queue section (default 50000)")
+    parser.add_argument('--startup-repeat', type=int, default=3)
+    parser.add_argument('--ffmpeg', default=shutil.which('ffmpeg'), help="ffmpeg to use (default: PATH)")
+    parser.add_argument('-o', '--output', help="write JSON results to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed change for the worse vs baseline as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+    sections = [name.strip() for name in args.only.split(',') if name.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {'size_mib': args.size_mib, 'rate_kib': args.rate_kib, 'latency': args.latency,
+                   'error_rate': args.error_rate, 'concurrency': args.concurrency, 'ffmpeg': args.ffmpeg},
+    }
+    bench = Bench(args)
+    results['config']['real_media'] = bench.media['real']
+    try:
+        for name in sections:
+            if name == 'startup':
+                results[name] = startup.run(max(1, args.startup_repeat))
+            elif name == 'queue':
+                results[name] = queue_memory.run(max(1, args.queue_jobs))
+            else:
+                results[name] = BENCHES[name](bench)
+        results['server'] = bench.server.stats()
+    finally:
+        bench.close()
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Command line / headless batch mode
+
+    python cli.py URL [URL ...]
+    python cli.py -i urls.txt -t audio -f mp3 -q 192k -w 4
+    python cli.py -i urls.txt --info --info-out triage.csv --sort size
+    python cli.py URL --section 1:02:00+30 --section intro
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from engine import (DownloadEngine, PRIORITIES, VIDEO_FORMATS, AUDIO_FORMATS, PROCESS_WORKERS, HOST_LIMIT,
+                    VIDEO_QUALITIES, AUDIO_QUALITIES, app_data_dir, default_options, format_bytes, format_eta)
+from bandwidth import parse_rate
+from formats import parse_size
+from fragments import CONNECTION_BUDGET, FRAGMENT_WORKERS
+from lookup import LOOKUP_WORKERS, SORT_KEYS, ResultWriter, sort_rows
+from sections import parse_sections
+
+
+def read_url_file(path):
+    """URLs from a text file, one per line (blank lines and # comments skipped)"""
+    stream = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        urls = []
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                urls.append(line)
+        return urls
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="The Downloader - headless batch mode")
+    parser.add_argument('urls', nargs='*', metavar='URL', help="video URLs to download")
+    parser.add_argument('-i', '--input', metavar='FILE', help="file with one URL per line ('-' for stdin)")
+    parser.add_argument('-t', '--type', dest='download_type', choices=['video', 'audio'], default='video')
+    parser.add_argument('-f', '--format', dest='file_format',
+                        help=f"video: {', '.join(VIDEO_FORMATS)} | audio: {', '.join(AUDIO_FORMATS)}")
+    parser.add_argument('-q', '--quality', default='Best',
+                        help=f"video: {', '.join(VIDEO_QUALITIES)} | audio: {', '.join(AUDIO_QUALITIES)}")
+    parser.add_argument('-o', '--output', metavar='DIR', help="output folder (default ~/Downloads)")
+    parser.add_argument('-w', '--workers', type=int, default=3, help="parallel downloads (default 3)")
+    parser.add_argument('--per-host', type=int, default=HOST_LIMIT,
+                        help=f"max parallel downloads from one site (default {HOST_LIMIT})")
+    parser.add_argument('-c', '--convert-workers', type=int, default=PROCESS_WORKERS,
+                        help=f"parallel merges/conversions (default {PROCESS_WORKERS}, the CPU count)")
+    parser.add_argument('--fragments', type=int, default=FRAGMENT_WORKERS,
+                        help=f"max HLS/DASH fragments fetched at once per download, adapted to throughput "
+                             f"(default {FRAGMENT_WORKERS})")
+    parser.add_argument('--connections', type=int, default=CONNECTION_BUDGET,
+                        help=f"max fragments fetched at once over all downloads (default {CONNECTION_BUDGET})")
+    parser.add_argument('--chunk-size', type=int, metavar='MIB',
+                        help="fetch plain HTTP downloads in ranges of this many MiB (helps against throttling)")
+    parser.add_argument('-r', '--limit-rate', type=parse_rate, metavar='RATE',
+                        help="total download rate over all downloads, e.g. 500K or 2M (bytes/s)")
+    parser.add_argument('--max-size', type=parse_size, metavar='SIZE',
+                        help="best formats whose estimated size fits, e.g. 200M or 1.5G")
+    parser.add_argument('--max-time', type=int, metavar='SECONDS',
+                        help="best formats that download in this time at the measured (or limited) speed")
+    parser.add_argument('--avoid-codec', action='append', metavar='CODEC',
+                        help="skip video in this codec when there's another choice, e.g. av01 (repeatable)")
+    parser.add_argument('--section', action='append', metavar='RANGE',
+                        help="download only this part: START-END, START+LENGTH or START- (e.g. 1:02:00+30), "
+                             "or a chapter title pattern; repeatable, only these bytes are fetched")
+    parser.add_argument('--exact-cuts', action='store_true',
+                        help="with --section: re-encode the clips to cut on the exact frame "
+                             "(default: stream copy from the keyframe before the start)")
+    parser.add_argument('-p', '--priority', choices=list(PRIORITIES), default='Normal')
+    parser.add_argument('--playlist', action='store_true',
+                        help="download every entry of playlist/channel URLs (default: just the video)")
+    parser.add_argument('--journal', metavar='FILE',
+                        help="job journal (SQLite): resume unfinished jobs from it and skip finished ones")
+    parser.add_argument('--archive', metavar='FILE',
+                        help="download archive (SQLite) of finished videos, these are skipped "
+                             "(default: the one shared with the GUI)")
+    parser.add_argument('--no-archive', action='store_true', help="don't skip or record archived videos")
+    parser.add_argument('--verify', action='store_true',
+                        help="check finished files with ffprobe (container, duration, streams)")
+    parser.add_argument('--keep-partial', action='store_true',
+                        help="keep .part files of cancelled downloads (default: delete them)")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write job metrics at exit (.prom/.txt: Prometheus text, else JSON)")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="serve live metrics on http://127.0.0.1:PORT/metrics (and /metrics.json)")
+    parser.add_argument('--info', action='store_true',
+                        help="don't download, look up title, duration, heights and estimated size of every URL")
+    parser.add_argument('--info-out', metavar='FILE',
+                        help="with --info: write the results as they come in (.csv, .json or .jsonl)")
+    parser.add_argument('--info-workers', type=int, default=LOOKUP_WORKERS,
+                        help=f"with --info: URLs looked up at once (default {LOOKUP_WORKERS})")
+    parser.add_argument('--sort', choices=list(SORT_KEYS),
+                        help="with --info: print the results sorted by this column at the end")
+    parser.add_argument('--progress', action='store_true', help="print a progress line every second")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show yt-dlp's own output")
+    return parser
+
+
+def check_options(parser, args):
+    if args.download_type == 'audio':
+        formats, qualities = AUDIO_FORMATS, AUDIO_QUALITIES
+    else:
+        formats, qualities = VIDEO_FORMATS, VIDEO_QUALITIES
+    if args.file_format and args.file_format not in formats:
+        parser.error(f"format for {args.download_type} must be one of: {', '.join(formats)}")
+    if args.quality not in qualities:
+        parser.error(f"quality for {args.download_type} must be one of: {', '.join(qualities)}")
+    if args.workers < 1:
+        parser.error("workers must be at least 1")
+    if args.per_host < 1:
+        parser.error("per-host limit must be at least 1")
+    if args.convert_workers < 1:
+        parser.error("convert workers must be at least 1")
+    if args.fragments < 1 or args.connections < 1:
+        parser.error("fragments and connections must be at least 1")
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error("chunk size must be at least 1 MiB")
+    if args.max_time is not None and args.max_time < 1:
+        parser.error("max time must be at least 1 second")
+    if args.info_workers < 1:
+        parser.error("info workers must be at least 1")
+    if (args.info_out or args.sort) and not args.info:
+        parser.error("--info-out and --sort only work with --info")
+    args.sections, args.chapters = [], []
+    for text in args.section or ():
+        try:
+            ranges, chapters = parse_sections(text)
+        except ValueError as e:
+            parser.error(f"--section: {e}")
+        args.sections += ranges
+        args.chapters += chapters
+    if args.exact_cuts and not args.section:
+        parser.error("--exact-cuts only works with --section")
+
+
+def make_logger():
+    """Thread-safe log function printing like the GUI log"""
+    lock = threading.Lock()
+
+    def log(message, msg_type="info"):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        stream = sys.stderr if msg_type == "error" else sys.stdout
+        with lock:
+            print(f"[{timestamp}] {message}", file=stream, flush=True)
+    return log
+
+
+def print_progress(engine, log):
+    engine.apply_progress()
+    counts = engine.queue.counts()
+    running = [job for job in engine.queue.jobs.values() if job.state == 'running']
+    parts = []
+    for job in running:
+        speed = f"{format_bytes(job.speed)}/s" if job.speed else "N/A"
+        parts.append(f"#{job.id} {int(job.progress * 100)}% {speed} ETA {format_eta(job.eta)}")
+    log(f"{counts['done']} done, {counts['failed']} failed, {counts['running']} running, "
+        f"{counts['processing']} converting, {counts['queued']} queued" + (" | " + " | ".join(parts) if parts else ""))
+
+
+def describe_row(row):
+    """One line for a lookup result"""
+    if row['error']:
+        return f"{row['url']}: {row['error']}"
+    heights = '/'.join(f"{height}p" for height in row['heights']) or "no video"
+    size = f"~{format_bytes(row['estimated_bytes'])}" if row['estimated_bytes'] else "size unknown"
+    return f"{row['title']} | {format_eta(row['duration'])} | {heights} | {size} | {row['url']}"
+
+
+def run_lookup(engine, urls, options, args, log):
+    """--info: look every URL up, print (and write) rows as they arrive, 1 if any failed"""
+    writer = None
+    if args.info_out:
+        try:
+            writer = ResultWriter(args.info_out)
+        except OSError as e:
+            log(f"Could not write {args.info_out}: {e}", "error")
+            return 1
+
+    def on_result(row):
+        if writer:
+            writer.add(row)
+        log(describe_row(row), "error" if row['error'] else "info")
+
+    started = time.time()
+    log(f"Looking up {len(urls)} URL(s), {args.info_workers} at a time", "accent")
+    lookup = engine.lookup(urls, options, on_result, workers=args.info_workers)
+    try:
+        while not lookup.done():
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        log("Interrupted, stopping the lookup...", "warning")
+        lookup.cancel()
+    rows = lookup.wait()
+    if writer:
+        writer.close()
+    if args.sort:
+        print()
+        for row in sort_rows(rows, args.sort, reverse=args.sort in ('duration', 'height', 'size')):
+            print(describe_row(row))
+    failed = [row for row in rows if row['error']]
+    log(f"Looked up {len(rows) - len(failed)} of {len(urls)} URL(s) in {time.time() - started:.1f}s, "
+        f"{len(failed)} failed", "warning" if failed else "success")
+    return 1 if failed else 0
+
+
+def close(engine, args, log):
+    """Shut the engine down and write the metrics file if one was asked for"""
+    engine.close()
+    if args.metrics:
+        try:
+            engine.metrics.write(args.metrics)
+        except OSError as e:
+            log(f"Could not write metrics to {args.metrics}: {e}", "warning")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_options(parser, args)
+
+    urls = list(args.urls)
+    if args.input:
+        try:
+            urls += read_url_file(args.input)
+        except OSError as e:
+            parser.error(f"could not read {args.input}: {e}")
+    if not urls and (args.info or not args.journal):
+        parser.error("no URLs given")
+
+    log = make_logger()
+    archive_path = None
+    if not args.no_archive:
+        archive_path = args.archive or os.path.join(app_data_dir(), 'archive.sqlite3')
+    engine = DownloadEngine(log=log, max_workers=args.workers, quiet=not args.verbose,
+                            partial_policy='keep' if args.keep_partial else 'delete',
+                            journal_path=args.journal, process_workers=args.convert_workers,
+                            fragment_workers=args.fragments, connection_budget=args.connections,
+                            http_chunk_size=args.chunk_size * 1024 * 1024 if args.chunk_size else None,
+                            rate_limit=args.limit_rate, host_limit=args.per_host, archive_path=archive_path,
+                            verify=args.verify)
+    if args.metrics_port is not None:
+        try:
+            port = engine.metrics.serve(args.metrics_port)
+            log(f"Metrics on http://127.0.0.1:{port}/metrics")
+        except OSError as e:
+            log(f"Could not serve metrics on port {args.metrics_port}: {e}", "warning")
+    options = default_options(args.download_type, args.file_format, args.quality, args.output,
+                              playlist=args.playlist, size_budget=args.max_size, time_budget=args.max_time,
+                              avoid_codecs=[codec.lower() for codec in args.avoid_codec or []],
+                              sections=args.sections, chapters=args.chapters, exact_cuts=args.exact_cuts)
+    jobs = [] if args.info else engine.resume()
+    if jobs:
+        log(f"Resuming {len(jobs)} unfinished download(s) from {args.journal}", "accent")
+    # same video twice, or already resumed from the journal
+    urls, duplicates, queued = engine.ingest(urls, playlist=args.playlist)
+    if duplicates or queued:
+        log(f"Skipped {duplicates + queued} duplicate URL(s)", "secondary")
+    if args.info:
+        try:
+            return run_lookup(engine, urls, options, args, log)
+        finally:
+            close(engine, args, log)
+    if args.playlist:
+        # entries are queued while the lists are still being read
+        for url in urls:
+            engine.expand(url, options, PRIORITIES[args.priority])
+    else:
+        new_jobs = [engine.submit(url, options, PRIORITIES[args.priority]) for url in urls]
+        jobs += [job for job in new_jobs if job]
+        log(f"Queued {len(jobs)} download(s) with {args.workers} worker(s)", "accent")
+
+    try:
+        while engine.is_busy():
+            time.sleep(1)
+            if args.progress:
+                print_progress(engine, log)
+    except KeyboardInterrupt:
+        if engine.journal:
+            log("Interrupted, unfinished downloads resume on the next run", "warning")
+            close(engine, args, log)
+            return 130
+        log("Interrupted, cancelling downloads...", "warning")
+        engine.cancel_all()
+        engine.queue.join(timeout=10)
+        close(engine, args, log)
+        return 130
+    close(engine, args, log)
+
+    jobs = list(engine.queue.jobs.values())
+    failed = [job for job in jobs if job.state != 'done' or job.verified is False]
+    for job in failed:
+        log(f"FAILED {job.url}: {job.error or job.verify_error}", "error")
+    log(f"Finished: {len(jobs) - len(failed)} completed, {len(failed)} failed",
+        "warning" if failed else "success")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
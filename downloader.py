@@ -1,18 +1,322 @@
 import customtkinter as ctk
-from tkinter import filedialog, messagebox, scrolledtext
+from tkinter import filedialog, messagebox, scrolledtext, ttk
 import threading
 import os
-import sys
 import subprocess
-from urllib.parse import urlparse
-import yt_dlp
 import platform
-import re
+import queue
+import logging
+import logging.handlers
+import time
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from engine import (DownloadEngine, warm_up, PRIORITIES, FINISHED_STATES, VIDEO_FORMATS, AUDIO_FORMATS,
+                    VIDEO_QUALITIES, AUDIO_QUALITIES, SPEED_LIMITS, app_data_dir, archive_id_from_url,
+                    default_options, format_bytes, format_eta)
+from formats import CODEC_PREFERENCES, SIZE_BUDGETS, TIME_BUDGETS
+from ingest import unique_urls
+from sections import parse_sections
+from jobtable import JobTable
+from lookup import LOOKUP_WORKERS, ResultWriter, sort_rows
 
 # Set appearance and color theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
+# UI refresh interval for progress (10 Hz no matter how fast chunks arrive)
+UI_TICK_MS = 100
+
+# log viewer limits
+LOG_MAX_LINES = 2000
+LOG_BATCH_LIMIT = 500  # max messages moved into the widget per tick
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+# bulk info table: (column, heading, width, sort key from lookup.SORT_KEYS)
+BULK_COLUMNS = (
+    ('title', "Title", 300, 'title'),
+    ('duration', "Duration", 80, 'duration'),
+    ('heights', "Heights", 130, 'height'),
+    ('size', "Est. Size", 90, 'size'),
+    ('uploader', "Uploader", 140, 'uploader'),
+    ('url', "URL", 260, 'url'),
+)
+BULK_ROWS_PER_TICK = 200
+
+
+class LogBuffer:
+    """Thread-safe log: any thread pushes, the UI pulls batches"""
+    def __init__(self, max_lines=LOG_MAX_LINES):
+        self.max_lines = max_lines  # lines kept in the widget
+        # (timestamp, message, msg_type) not shown yet; if the UI falls behind the oldest are dropped
+        self._incoming = deque(maxlen=max_lines)
+        self._file_logger = None
+
+    def push(self, message, msg_type="info"):
+        """Queue a message (never touches Tk)"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self._incoming.append((timestamp, message, msg_type))
+        logger = self._file_logger
+        if logger:
+            logger.info("[%s] %s", msg_type, message)
+
+    def drain(self, limit=LOG_BATCH_LIMIT):
+        """Oldest messages not shown yet, at most limit"""
+        batch = []
+        try:
+            while len(batch) < limit:
+                batch.append(self._incoming.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def enable_file(self, path, max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS):
+        """Also stream messages to a rotating log file"""
+        logger = logging.getLogger('TheDownloader.log')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        for old in logger.handlers[:]:
+            logger.removeHandler(old)
+            old.close()
+        logger.addHandler(handler)
+        self._file_logger = logger
+
+    def disable_file(self):
+        logger, self._file_logger = self._file_logger, None
+        if logger:
+            for old in logger.handlers[:]:
+                logger.removeHandler(old)
+                old.close()
+
+
+class BulkInfoWindow:
+    """Looks up a list of URLs at once, results fill a sortable table as they arrive"""
+    def __init__(self, app):
+        self.app = app
+        self.engine = app.engine
+        colors = app.colors
+        self.lookup = None
+        self.rows = []
+        self.writer = None
+        self.sort_column = None
+        self.sort_reverse = False
+        self._incoming = queue.SimpleQueue()
+        self._after = None
+
+        self.window = ctk.CTkToplevel(app.root)
+        self.window.title("Bulk Info")
+        self.window.geometry("1000x600")
+        self.window.transient(app.root)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        top = ctk.CTkFrame(self.window, fg_color=colors['frame_bg'])
+        top.pack(fill="x", padx=10, pady=(10, 5))
+        ctk.CTkLabel(top, text="URLs (one per line):", font=("Segoe UI", 12, "bold"),
+                     text_color=colors['secondary']).pack(anchor="w", padx=10, pady=(10, 0))
+        self.urls_text = ctk.CTkTextbox(top, height=110, font=("Consolas", 10),
+                                        fg_color=colors['bg'], text_color=colors['fg'])
+        self.urls_text.pack(fill="x", padx=10, pady=5)
+
+        buttons = ctk.CTkFrame(top, fg_color="transparent")
+        buttons.pack(fill="x", padx=10, pady=(0, 10))
+        button_style = dict(height=32, fg_color=colors['frame_bg'], hover_color=colors['secondary'],
+                            text_color=colors['fg'])
+        self.start_btn = ctk.CTkButton(buttons, text="Look Up", command=self.start, width=110,
+                                       fg_color=colors['accent'], hover_color=colors['pink'], height=32)
+        self.start_btn.pack(side="left", padx=(0, 10))
+        self.stop_btn = ctk.CTkButton(buttons, text="Stop", command=self.stop, width=80, state='disabled',
+                                      **button_style)
+        self.stop_btn.pack(side="left", padx=(0, 10))
+        ctk.CTkButton(buttons, text="Load File", command=self.load_file, width=100,
+                      **button_style).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(buttons, text="Export", command=self.export, width=100,
+                      **button_style).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(buttons, text="Download Selected", command=self.download_selected, width=150,
+                      **button_style).pack(side="left")
+        self.status_var = ctk.StringVar(value="")
+        ctk.CTkLabel(buttons, textvariable=self.status_var, font=("Segoe UI", 11),
+                     text_color=colors['fg']).pack(side="right")
+
+        table_frame = ctk.CTkFrame(self.window, fg_color=colors['frame_bg'])
+        table_frame.pack(fill="both", expand=True, padx=10, pady=(5, 10))
+        style = ttk.Style(self.window)
+        style.theme_use('default')
+        style.configure("Bulk.Treeview", background=colors['bg'], fieldbackground=colors['bg'],
+                        foreground=colors['fg'], rowheight=22, borderwidth=0)
+        style.configure("Bulk.Treeview.Heading", background=colors['frame_bg'], foreground=colors['secondary'])
+        style.map("Bulk.Treeview", background=[('selected', colors['accent'])])
+        self.table = ttk.Treeview(table_frame, columns=[column for column, *_ in BULK_COLUMNS],
+                                  show="headings", style="Bulk.Treeview")
+        for column, heading, width, _ in BULK_COLUMNS:
+            self.table.heading(column, text=heading, command=lambda c=column: self.sort_by(c))
+            self.table.column(column, width=width, anchor="w")
+        self.table.tag_configure('error', foreground=colors['error'])
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
+        self.table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side="right", fill="y")
+        self.table.pack(side="left", fill="both", expand=True)
+
+        url = app.url_var.get().strip()
+        if url:
+            self.urls_text.insert("1.0", url + "\n")
+
+    def start(self):
+        lines = self.urls_text.get("1.0", "end").splitlines()
+        options = self.app.current_options(self.window)
+        if options is None:
+            return
+        self.start_btn.configure(state='disabled')
+
+        def checked(result):
+            if not self.window.winfo_exists():
+                return  # closed meanwhile
+            urls, duplicates, _ = result
+            if duplicates:
+                self.app.log_message(f"Bulk info: skipped {duplicates} duplicate URL(s)", "secondary")
+            if not urls:
+                self.start_btn.configure(state='normal')
+                messagebox.showwarning("No URLs", "Please enter at least one URL!", parent=self.window)
+                return
+            self.stop()
+            self.rows = []
+            self.table.delete(*self.table.get_children())
+            self.lookup = self.engine.lookup(urls, options, self._incoming.put, workers=LOOKUP_WORKERS)
+            self.stop_btn.configure(state='normal')
+            self.refresh()
+
+        self.app.in_background(lambda: unique_urls(lines, archive_id_from_url), checked)
+
+    def stop(self):
+        if self.lookup:
+            self.lookup.cancel()
+
+    def refresh(self):
+        """Move rows from the lookup threads into the table, runs every UI_TICK_MS while looking up"""
+        self._after = None
+        added = []
+        try:
+            while len(added) < BULK_ROWS_PER_TICK:
+                added.append(self._incoming.get_nowait())
+        except queue.Empty:
+            pass
+        for row in added:
+            self.rows.append(row)
+            if self.writer:
+                self.writer.add(row)
+        if added:
+            if self.sort_column:
+                self.show_rows()
+            else:
+                for row in added:
+                    self.insert_row(row)
+        lookup = self.lookup
+        finished = lookup is not None and lookup.done() and self._incoming.empty()
+        total = len(lookup.urls) if lookup else 0
+        failed = sum(1 for row in self.rows if row['error'])
+        self.status_var.set(f"{len(self.rows)}/{total} looked up" + (f", {failed} failed" if failed else ""))
+        if finished:
+            self.start_btn.configure(state='normal')
+            self.stop_btn.configure(state='disabled')
+            self.close_writer()
+        else:
+            self._after = self.window.after(UI_TICK_MS, self.refresh)
+
+    def insert_row(self, row):
+        if row['error']:
+            values = (row['error'], "", "", "", "", row['url'])
+        else:
+            size = format_bytes(row['estimated_bytes']) if row['estimated_bytes'] else "?"
+            values = (row['title'] or "", format_eta(row['duration']) if row['duration'] else "",
+                      '/'.join(f"{height}p" for height in row['heights']), size,
+                      row['uploader'] or "", row['url'])
+        self.table.insert("", "end", iid=row['url'], values=values, tags=('error',) if row['error'] else ())
+
+    def show_rows(self):
+        self.table.delete(*self.table.get_children())
+        rows = self.rows
+        if self.sort_column:
+            key = next(key for column, _, _, key in BULK_COLUMNS if column == self.sort_column)
+            rows = sort_rows(rows, key, self.sort_reverse)
+        for row in rows:
+            self.insert_row(row)
+
+    def sort_by(self, column):
+        """Heading clicked: sort by it, a second click flips the order"""
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column, self.sort_reverse = column, False
+        self.show_rows()
+
+    def load_file(self):
+        path = filedialog.askopenfilename(parent=self.window, title="URL list",
+                                          filetypes=[("Text files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.urls_text.insert("end", f.read().strip() + "\n")
+        except OSError as e:
+            messagebox.showerror("Load failed", str(e), parent=self.window)
+
+    def export(self):
+        """Write the rows so far; while the lookup runs, new rows keep going to the same file"""
+        path = filedialog.asksaveasfilename(parent=self.window, title="Export results", defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv"), ("JSON", "*.json"),
+                                                       ("JSON lines", "*.jsonl")])
+        if not path:
+            return
+        self.close_writer()
+        try:
+            self.writer = ResultWriter(path)
+            for row in self.rows:
+                self.writer.add(row)
+        except OSError as e:
+            self.writer = None
+            messagebox.showerror("Export failed", str(e), parent=self.window)
+            return
+        self.app.log_message(f"Exporting bulk info to {path}", "secondary")
+        if self.lookup is None or self.lookup.done():
+            self.close_writer()
+
+    def close_writer(self):
+        writer, self.writer = self.writer, None
+        if writer:
+            writer.close()
+
+    def download_selected(self):
+        """Queue the selected rows (info is cached, no second extraction)"""
+        options = self.app.current_options(self.window)
+        if options is None:
+            return
+        selection = self.table.selection()
+
+        def work():
+            urls, _, queued = self.engine.ingest(selection)
+            return queued, [job for job in (self.engine.submit(url, options) for url in urls) if job]
+
+        def queued_jobs(result):
+            queued, jobs = result
+            if queued:
+                self.app.log_message(f"Skipped {queued} already queued", "secondary")
+            if jobs:
+                self.app.track_jobs(jobs)
+                self.app.log_message(f"Queued {len(jobs)} download(s) | {self.app.queue_summary()}", "accent")
+
+        self.app.in_background(work, queued_jobs)
+
+    def close(self):
+        self.stop()
+        if self._after:
+            self.window.after_cancel(self._after)
+        self.close_writer()
+        self.window.destroy()
+
+
 class VideoDownloaderGUI:
     def __init__(self, root):
         self.root = root
@@ -49,22 +353,38 @@ class VideoDownloaderGUI:
         self.title_template = '%(title)s'
         self.downloading = False
         self.downloaded_file_path = None
-
-        if getattr(sys, 'frozen', False):
-            bundle_dir = sys._MEIPASS
-            self.ffmpeg_path = os.path.join(bundle_dir, 'ffmpeg.exe')
-            self.ffprobe_path = os.path.join(bundle_dir, 'ffprobe.exe')
-            if not os.path.exists(self.ffmpeg_path):
-                self.ffmpeg_path = None
-                self.ffprobe_path = None
-        else:
-            self.ffmpeg_path = None
-            self.ffprobe_path = None
+        self.max_workers = 3
+        self.batch = []  # jobs submitted since the queue was last idle
+        self.batch_ids = set()
+        self.job_updates = queue.SimpleQueue()  # jobs whose state changed, applied on the UI tick
+        # checking and queueing URLs, one batch at a time so a second click sees what the first queued
+        self.background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest')
+        self.ui_calls = queue.SimpleQueue()  # what to do with background results, run on the UI tick
+        self.log_buffer = LogBuffer()
+        try:
+            journal_path = os.path.join(app_data_dir(), 'jobs.sqlite3')
+            archive_path = os.path.join(app_data_dir(), 'archive.sqlite3')
+        except OSError:
+            journal_path = archive_path = None  # no journal, nothing survives a restart
+        self.engine = DownloadEngine(log=self.log_message, on_update=self.on_job_update,
+                                     max_workers=self.max_workers, quiet=self.quiet,
+                                     title_template=self.title_template, journal_path=journal_path,
+                                     archive_path=archive_path)
+        self.queue = self.engine.queue
         
         # Scrollable container
         self.create_scrollable_container()
         self.create_download_folder()
         
+        # progress refresh loop
+        self.root.after(UI_TICK_MS, self.ui_tick)
+        
+        # load yt-dlp once the window is up, not before
+        self.root.after(UI_TICK_MS, warm_up)
+        
+        # pick up where the last session stopped
+        self.root.after(UI_TICK_MS, self.resume_jobs)
+        
     def create_scrollable_container(self):
         # Main scrollable container
         self.main_container = ctk.CTkScrollableFrame(self.root, fg_color=self.colors['bg'])
@@ -197,7 +517,7 @@ class VideoDownloaderGUI:
         
         self.format_var = ctk.StringVar(value=self.file_format)
         self.format_combo = ctk.CTkComboBox(format_frame, variable=self.format_var,
-                                          values=['mp4', 'mkv', 'webm', 'avi'], 
+                                          values=VIDEO_FORMATS, 
                                           width=120, dropdown_fg_color=self.colors['frame_bg'],
                                           button_color=self.colors['accent'],
                                           button_hover_color=self.colors['pink'],
@@ -215,7 +535,7 @@ class VideoDownloaderGUI:
         
         self.quality_var = ctk.StringVar(value="Best")
         self.quality_combo = ctk.CTkComboBox(format_frame, variable=self.quality_var,
-                                           values=['Best', 'Worst', '1080p', '720p', '480p', '360p'], 
+                                           values=VIDEO_QUALITIES, 
                                            width=120, dropdown_fg_color=self.colors['frame_bg'],
                                            button_color=self.colors['accent'],
                                            button_hover_color=self.colors['pink'],
@@ -226,6 +546,173 @@ class VideoDownloaderGUI:
                                            dropdown_hover_color=self.colors['accent'])
         self.quality_combo.pack(side="left")
         
+        # Queue settings
+        queue_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
+        queue_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        workers_label = ctk.CTkLabel(queue_frame, text="Parallel Downloads:", 
+                                    font=("Segoe UI", 11),
+                                    text_color=self.colors['fg'])
+        workers_label.pack(side="left", padx=(0, 15))
+        
+        self.workers_var = ctk.StringVar(value=str(self.max_workers))
+        self.workers_combo = ctk.CTkComboBox(queue_frame, variable=self.workers_var,
+                                           values=[str(n) for n in range(1, 9)], 
+                                           command=self.on_workers_change,
+                                           width=80, dropdown_fg_color=self.colors['frame_bg'],
+                                           button_color=self.colors['accent'],
+                                           button_hover_color=self.colors['pink'],
+                                           fg_color=self.colors['frame_bg'],
+                                           border_color=self.colors['accent'],
+                                           text_color=self.colors['fg'],
+                                           dropdown_text_color=self.colors['fg'],
+                                           dropdown_hover_color=self.colors['accent'])
+        self.workers_combo.pack(side="left", padx=(0, 30))
+        
+        priority_label = ctk.CTkLabel(queue_frame, text="Priority:", 
+                                     font=("Segoe UI", 11),
+                                     text_color=self.colors['fg'])
+        priority_label.pack(side="left", padx=(0, 15))
+        
+        self.priority_var = ctk.StringVar(value="Normal")
+        self.priority_combo = ctk.CTkComboBox(queue_frame, variable=self.priority_var,
+                                            values=list(PRIORITIES), 
+                                            width=120, dropdown_fg_color=self.colors['frame_bg'],
+                                            button_color=self.colors['accent'],
+                                            button_hover_color=self.colors['pink'],
+                                            fg_color=self.colors['frame_bg'],
+                                            border_color=self.colors['accent'],
+                                            text_color=self.colors['fg'],
+                                            dropdown_text_color=self.colors['fg'],
+                                            dropdown_hover_color=self.colors['accent'])
+        self.priority_combo.pack(side="left", padx=(0, 30))
+        
+        self.playlist_var = ctk.BooleanVar(value=False)
+        playlist_check = ctk.CTkCheckBox(queue_frame, text="Whole playlist / channel",
+                                        variable=self.playlist_var,
+                                        font=("Segoe UI", 11),
+                                        text_color=self.colors['fg'],
+                                        fg_color=self.colors['accent'],
+                                        hover_color=self.colors['pink'])
+        playlist_check.pack(side="left")
+        
+        # Bandwidth
+        limit_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
+        limit_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        limit_label = ctk.CTkLabel(limit_frame, text="Speed Limit:", 
+                                  font=("Segoe UI", 11),
+                                  text_color=self.colors['fg'])
+        limit_label.pack(side="left", padx=(0, 15))
+        
+        self.limit_var = ctk.StringVar(value="Unlimited")
+        self.limit_combo = ctk.CTkComboBox(limit_frame, variable=self.limit_var,
+                                         values=list(SPEED_LIMITS), 
+                                         command=self.on_limit_change,
+                                         width=120, dropdown_fg_color=self.colors['frame_bg'],
+                                         button_color=self.colors['accent'],
+                                         button_hover_color=self.colors['pink'],
+                                         fg_color=self.colors['frame_bg'],
+                                         border_color=self.colors['accent'],
+                                         text_color=self.colors['fg'],
+                                         dropdown_text_color=self.colors['fg'],
+                                         dropdown_hover_color=self.colors['accent'])
+        self.limit_combo.pack(side="left", padx=(0, 30))
+        
+        self.verify_var = ctk.BooleanVar(value=False)
+        verify_check = ctk.CTkCheckBox(limit_frame, text="Verify files (ffprobe)",
+                                      variable=self.verify_var,
+                                      command=self.toggle_verify,
+                                      font=("Segoe UI", 11),
+                                      text_color=self.colors['fg'],
+                                      fg_color=self.colors['accent'],
+                                      hover_color=self.colors['pink'])
+        verify_check.pack(side="left")
+        
+        # Format budget
+        budget_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
+        budget_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        size_label = ctk.CTkLabel(budget_frame, text="Max Size:", 
+                                 font=("Segoe UI", 11),
+                                 text_color=self.colors['fg'])
+        size_label.pack(side="left", padx=(0, 15))
+        
+        self.size_budget_var = ctk.StringVar(value="No limit")
+        self.size_budget_combo = ctk.CTkComboBox(budget_frame, variable=self.size_budget_var,
+                                          values=list(SIZE_BUDGETS), 
+                                          width=110, dropdown_fg_color=self.colors['frame_bg'],
+                                          button_color=self.colors['accent'],
+                                          button_hover_color=self.colors['pink'],
+                                          fg_color=self.colors['frame_bg'],
+                                          border_color=self.colors['accent'],
+                                          text_color=self.colors['fg'],
+                                          dropdown_text_color=self.colors['fg'],
+                                          dropdown_hover_color=self.colors['accent'])
+        self.size_budget_combo.pack(side="left", padx=(0, 30))
+        
+        time_label = ctk.CTkLabel(budget_frame, text="Max Time:", 
+                                 font=("Segoe UI", 11),
+                                 text_color=self.colors['fg'])
+        time_label.pack(side="left", padx=(0, 15))
+        
+        self.time_budget_var = ctk.StringVar(value="No limit")
+        self.time_budget_combo = ctk.CTkComboBox(budget_frame, variable=self.time_budget_var,
+                                          values=list(TIME_BUDGETS), 
+                                          width=110, dropdown_fg_color=self.colors['frame_bg'],
+                                          button_color=self.colors['accent'],
+                                          button_hover_color=self.colors['pink'],
+                                          fg_color=self.colors['frame_bg'],
+                                          border_color=self.colors['accent'],
+                                          text_color=self.colors['fg'],
+                                          dropdown_text_color=self.colors['fg'],
+                                          dropdown_hover_color=self.colors['accent'])
+        self.time_budget_combo.pack(side="left", padx=(0, 30))
+        
+        codec_label = ctk.CTkLabel(budget_frame, text="Codec:", 
+                                 font=("Segoe UI", 11),
+                                 text_color=self.colors['fg'])
+        codec_label.pack(side="left", padx=(0, 15))
+        
+        self.codec_var = ctk.StringVar(value="Any codec")
+        self.codec_combo = ctk.CTkComboBox(budget_frame, variable=self.codec_var,
+                                          values=list(CODEC_PREFERENCES), 
+                                          width=140, dropdown_fg_color=self.colors['frame_bg'],
+                                          button_color=self.colors['accent'],
+                                          button_hover_color=self.colors['pink'],
+                                          fg_color=self.colors['frame_bg'],
+                                          border_color=self.colors['accent'],
+                                          text_color=self.colors['fg'],
+                                          dropdown_text_color=self.colors['fg'],
+                                          dropdown_hover_color=self.colors['accent'])
+        self.codec_combo.pack(side="left")
+        
+        # Clip: only part of each video (see sections.py)
+        clip_frame = ctk.CTkFrame(settings_frame, fg_color="transparent")
+        clip_frame.pack(fill="x", padx=20, pady=(0, 15))
+        
+        clip_label = ctk.CTkLabel(clip_frame, text="Clip:", 
+                                 font=("Segoe UI", 11),
+                                 text_color=self.colors['fg'])
+        clip_label.pack(side="left", padx=(0, 15))
+        
+        self.clip_var = ctk.StringVar()
+        self.clip_entry = ctk.CTkEntry(clip_frame, textvariable=self.clip_var,
+                                      placeholder_text="Whole video, or e.g. 1:02:00+30, 2:10-2:45, chapter name",
+                                      width=380, fg_color=self.colors['bg'],
+                                      border_color=self.colors['accent'],
+                                      text_color=self.colors['fg'])
+        self.clip_entry.pack(side="left", padx=(0, 30))
+        
+        self.exact_cuts_var = ctk.BooleanVar(value=False)
+        exact_cuts_check = ctk.CTkCheckBox(clip_frame, text="Exact cuts (re-encode)",
+                                          variable=self.exact_cuts_var,
+                                          font=("Segoe UI", 11),
+                                          text_color=self.colors['fg'],
+                                          fg_color=self.colors['accent'],
+                                          hover_color=self.colors['pink'])
+        exact_cuts_check.pack(side="left")
+        
         # Control buttons
         button_frame = ctk.CTkFrame(self.main_container, fg_color="transparent")
         button_frame.grid(row=4, column=0, sticky="ew", pady=(0, 10))
@@ -253,7 +740,15 @@ class VideoDownloaderGUI:
                                      fg_color=self.colors['frame_bg'],
                                      hover_color=self.colors['secondary'],
                                      text_color=self.colors['fg'])
-        self.info_btn.pack(side="left")
+        self.info_btn.pack(side="left", padx=(0, 10))
+        
+        self.bulk_info_btn = ctk.CTkButton(button_frame, text="Bulk Info", 
+                                          command=self.open_bulk_info, width=100, height=40,
+                                          font=("Segoe UI", 12),
+                                          fg_color=self.colors['frame_bg'],
+                                          hover_color=self.colors['secondary'],
+                                          text_color=self.colors['fg'])
+        self.bulk_info_btn.pack(side="left")
         
         # Progress
         progress_frame = ctk.CTkFrame(self.main_container, corner_radius=10, fg_color=self.colors['frame_bg'])
@@ -278,9 +773,13 @@ class VideoDownloaderGUI:
         self.progress_bar.pack(fill="x", padx=20, pady=(0, 15))
         self.progress_bar.set(0)
         
+        # Jobs (recycled rows, fine with thousands of jobs)
+        self.job_table = JobTable(self.main_container, self.colors, on_open=self.open_job)
+        self.job_table.grid(row=6, column=0, sticky="ew", pady=(0, 10))
+        
         # Log output
         log_frame = ctk.CTkFrame(self.main_container, corner_radius=10, fg_color=self.colors['frame_bg'])
-        log_frame.grid(row=6, column=0, sticky="nsew", pady=(0, 10))
+        log_frame.grid(row=7, column=0, sticky="nsew", pady=(0, 10))
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
@@ -301,15 +800,38 @@ class VideoDownloaderGUI:
                                                 highlightthickness=0)
         self.log_text.pack(fill="both", expand=True, padx=20, pady=(0, 10))
         
+        # tags
+        self.log_text.tag_configure("info", foreground=self.colors['blue'])
+        self.log_text.tag_configure("success", foreground=self.colors['success'])
+        self.log_text.tag_configure("error", foreground=self.colors['error'])
+        self.log_text.tag_configure("warning", foreground=self.colors['warning'])
+        self.log_text.tag_configure("accent", foreground=self.colors['accent'])
+        self.log_text.tag_configure("secondary", foreground=self.colors['secondary'])
+        self.log_text.tag_configure("purple", foreground=self.colors['purple'])
+        
+        log_button_frame = ctk.CTkFrame(log_frame, fg_color="transparent")
+        log_button_frame.pack(pady=(0, 15))
+        
         # Clear log button
-        clear_log_btn = ctk.CTkButton(log_frame, text="Clear Log", command=self.clear_log,
+        clear_log_btn = ctk.CTkButton(log_button_frame, text="Clear Log", command=self.clear_log,
                                      width=100, height=35,
                                      fg_color=self.colors['frame_bg'],
                                      hover_color=self.colors['warning'],
                                      text_color=self.colors['fg'],
                                      border_width=1,  # Black border
                                      border_color="#000000")
-        clear_log_btn.pack(pady=(0, 15))
+        clear_log_btn.pack(side="left", padx=(0, 15))
+        
+        # Log file toggle
+        self.log_file_var = ctk.BooleanVar(value=False)
+        log_file_check = ctk.CTkCheckBox(log_button_frame, text="Save log to file",
+                                        variable=self.log_file_var,
+                                        command=self.toggle_log_file,
+                                        font=("Segoe UI", 11),
+                                        text_color=self.colors['fg'],
+                                        fg_color=self.colors['accent'],
+                                        hover_color=self.colors['pink'])
+        log_file_check.pack(side="left")
         
         self.download_process = None
         self.update_format_options()
@@ -336,18 +858,36 @@ class VideoDownloaderGUI:
     def update_format_options(self):
         """Update format options"""
         if self.download_type == "audio":
-            self.format_combo.configure(values=['mp3', 'wav', 'aac', 'm4a', 'ogg', 'flac'])
+            self.format_combo.configure(values=AUDIO_FORMATS)
             self.format_var.set('mp3')
             self.download_btn.configure(text="Download Audio")
-            self.quality_combo.configure(values=['Best', '320k', '256k', '192k', '128k', '96k'])
+            self.quality_combo.configure(values=AUDIO_QUALITIES)
         else:
-            self.format_combo.configure(values=['mp4', 'mkv', 'webm', 'avi'])
+            self.format_combo.configure(values=VIDEO_FORMATS)
             self.format_var.set('mp4')
             self.download_btn.configure(text="Download Video")
-            self.quality_combo.configure(values=['Best', 'Worst', '1080p', '720p', '480p', '360p'])
+            self.quality_combo.configure(values=VIDEO_QUALITIES)
         
         self.quality_var.set('Best')
         
+    def on_workers_change(self, value):
+        """Resize worker pool"""
+        try:
+            self.max_workers = max(1, int(value))
+        except ValueError:
+            return
+        self.engine.set_max_workers(self.max_workers)
+        self.log_message(f"Parallel downloads set to {self.max_workers}", "info")
+        
+    def on_limit_change(self, value):
+        """Change the total speed limit, running downloads follow it"""
+        self.engine.set_rate_limit(SPEED_LIMITS.get(value))
+        self.log_message(f"Speed limit set to {value}", "info")
+        
+    def toggle_verify(self):
+        """Check finished files with ffprobe in the background"""
+        self.engine.verify = self.verify_var.get()
+        
     def create_download_folder(self):
         """Create download folder if doesn't exist"""
         try:
@@ -374,68 +914,41 @@ class VideoDownloaderGUI:
         self.log_text.delete(1.0, "end")
         self.log_message("Log cleared", "info")
         
-    def log_message(self, message, msg_type="info"):
-        """Add message to log text"""
-        timestamp = __import__('datetime').datetime.now().strftime("%H:%M:%S")
-        
-        # timestamp
-        self.log_text.insert("end", f"[{timestamp}] ")
+    def toggle_log_file(self):
+        """Start/stop writing the log to a rotating file"""
+        if self.log_file_var.get():
+            try:
+                path = os.path.join(app_data_dir('logs'), 'downloader.log')
+                self.log_buffer.enable_file(path)
+                self.log_message(f"Logging to file: {path}", "info")
+            except OSError as e:
+                self.log_file_var.set(False)
+                self.log_message(f"Could not open log file: {e}", "error")
+        else:
+            self.log_buffer.disable_file()
+            self.log_message("Stopped logging to file", "info")
         
-        # tags
-        if not hasattr(self, 'tags_configured'):
-            self.log_text.tag_configure("info", foreground=self.colors['blue'])
-            self.log_text.tag_configure("success", foreground=self.colors['success'])
-            self.log_text.tag_configure("error", foreground=self.colors['error'])
-            self.log_text.tag_configure("warning", foreground=self.colors['warning'])
-            self.log_text.tag_configure("accent", foreground=self.colors['accent'])
-            self.log_text.tag_configure("secondary", foreground=self.colors['secondary'])
-            self.log_text.tag_configure("purple", foreground=self.colors['purple'])
-            self.tags_configured = True
-        
-        # add message
-        start_pos = self.log_text.index("end-1c")
-        self.log_text.insert("end", message + "\n")
-        end_pos = self.log_text.index("end-1c")
-        self.log_text.tag_add(msg_type, start_pos, end_pos)
+    def log_message(self, message, msg_type="info"):
+        """Add message to log (safe from any thread)"""
+        self.log_buffer.push(message, msg_type)
         
+    def flush_log(self):
+        """Move queued log messages into the widget in one batch"""
+        batch = self.log_buffer.drain()
+        if not batch:
+            return
+        chunks = []
+        for timestamp, message, msg_type in batch:
+            chunks += [f"[{timestamp}] ", (), message + "\n", msg_type]
+        self.log_text.insert("end", *chunks)
+        
+        # keep the widget at most max_lines long
+        line_count = int(self.log_text.index("end-1c").split('.')[0]) - 1
+        excess = line_count - self.log_buffer.max_lines
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
         self.log_text.see("end")
-        self.root.update_idletasks()
-        
-    def get_format_selector(self):
-        """yt-dlp format selector"""
-        quality = self.quality_var.get()
         
-        if self.download_type == "audio":
-            if quality == "Best":
-                return 'bestaudio/best'
-            elif quality == "320k":
-                return 'bestaudio[abr<=320]/best'
-            elif quality == "256k":
-                return 'bestaudio[abr<=256]/best'
-            elif quality == "192k":
-                return 'bestaudio[abr<=192]/best'
-            elif quality == "128k":
-                return 'bestaudio[abr<=128]/best'
-            elif quality == "96k":
-                return 'bestaudio[abr<=96]/best'
-            else:
-                return 'bestaudio/best'
-        else:
-            if quality == "Best":
-                return 'bestvideo+bestaudio/best'
-            elif quality == "Worst":
-                return 'worstvideo+worstaudio/worst'
-            elif quality == "1080p":
-                return 'bestvideo[height<=1080]+bestaudio/best[height<=1080]'
-            elif quality == "720p":
-                return 'bestvideo[height<=720]+bestaudio/best[height<=720]'
-            elif quality == "480p":
-                return 'bestvideo[height<=480]+bestaudio/best[height<=480]'
-            elif quality == "360p":
-                return 'bestvideo[height<=360]+bestaudio/best[height<=360]'
-            else:
-                return 'bestvideo+bestaudio/best'
-                
     def get_video_info(self):
         """video info"""
         url = self.url_var.get().strip()
@@ -443,161 +956,77 @@ class VideoDownloaderGUI:
             messagebox.showwarning("No URL", "Please enter a video URL first!")
             return
             
+        options = self.current_options()
+        if options is None:
+            return
         self.log_message("Fetching video information...", "accent")
         
         def info_worker():
             try:
-                ydl_opts = {
-                    'quiet': True,
-                    'no_warnings': True,
-                }
+                info = self.engine.get_info(url)
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    
-                    title = info.get('title', 'Unknown')
-                    duration = info.get('duration_string', 'Unknown')
-                    uploader = info.get('uploader', 'Unknown')
-                    view_count = info.get('view_count', 0)
-                    upload_date = info.get('upload_date', 'Unknown')
-                    
-                    # view count formatting
-                    if view_count:
-                        if view_count >= 1000000:
-                            view_str = f"{view_count/1000000:.1f}M views"
-                        elif view_count >= 1000:
-                            view_str = f"{view_count/1000:.1f}K views"
-                        else:
-                            view_str = f"{view_count} views"
+                title = info.get('title', 'Unknown')
+                duration = info.get('duration_string', 'Unknown')
+                uploader = info.get('uploader', 'Unknown')
+                view_count = info.get('view_count', 0)
+                upload_date = info.get('upload_date', 'Unknown')
+                
+                # view count formatting
+                if view_count:
+                    if view_count >= 1000000:
+                        view_str = f"{view_count/1000000:.1f}M views"
+                    elif view_count >= 1000:
+                        view_str = f"{view_count/1000:.1f}K views"
                     else:
-                        view_str = "Unknown views"
-                    
-                    self.root.after(0, lambda: self.log_message(f"Title: {title}", "purple"))
-                    self.root.after(0, lambda: self.log_message(f"Duration: {duration}", "secondary"))
-                    self.root.after(0, lambda: self.log_message(f"Uploader: {uploader}", "info"))
-                    self.root.after(0, lambda: self.log_message(f"{view_str}", "info"))
-                    self.root.after(0, lambda: self.log_message(f"Upload Date: {upload_date}", "info"))
-                    
+                        view_str = f"{view_count} views"
+                else:
+                    view_str = "Unknown views"
+                
+                self.log_message(f"Title: {title}", "purple")
+                self.log_message(f"Duration: {duration}", "secondary")
+                self.log_message(f"Uploader: {uploader}", "info")
+                self.log_message(f"{view_str}", "info")
+                self.log_message(f"Upload Date: {upload_date}", "info")
+                
+                # what the current settings would download
+                _, selection = self.engine.estimate(info, options)
+                self.log_message(f"Would download: {selection}", "accent")
+                
             except Exception as e:
-                error_msg = f"Failed to get video info: {str(e)}"
-                self.root.after(0, lambda: self.log_message(error_msg, "error"))
+                self.log_message(f"Failed to get video info: {str(e)}", "error")
         
         # Start info fetch
         info_thread = threading.Thread(target=info_worker)
         info_thread.daemon = True
         info_thread.start()
     
-    def clean_ansi_codes(self, text):
-        """Remove ANSI"""
-        ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-        return ansi_escape.sub('', text)
-            
-    def download_progress_hook(self, d):
-        """Progress hook"""
-        if d['status'] == 'downloading':
-            try:
-                # progress percentage
-                if '_percent_str' in d and d['_percent_str'] != 'NA%':
-                    clean_percent = self.clean_ansi_codes(d['_percent_str'])
-                    percent = float(clean_percent.strip('%')) / 100.0
-                    
-                    # Update progress bar
-                    self.root.after(0, lambda: self.progress_bar.set(percent))
-                    
-                    # Update status label
-                    speed_str = d.get('_speed_str', 'N/A')
-                    if speed_str != 'N/A':
-                        speed_str = self.clean_ansi_codes(speed_str)
-                        
-                    eta_str = d.get('_eta_str', 'N/A')
-                    if eta_str != 'N/A':
-                        eta_str = self.clean_ansi_codes(eta_str)
-                        
-                    self.root.after(0, lambda: self.progress_var.set(
-                        f"Downloading: {int(float(clean_percent.strip('%')))}% | Speed: {speed_str} | ETA: {eta_str}"
-                    ))
-            except Exception as e:
-                # Log the error but don't break
-                self.log_message(f"Progress update error: {e}", "warning")
-        elif d['status'] == 'finished':
-            # Set progress to 100% when download completes
-            self.root.after(0, lambda: self.progress_bar.set(1.0))
-            
-    def dwn_vid(self, video_url):
-        """Download video or audio"""
+    def open_bulk_info(self):
+        """Window for looking up many URLs at once"""
+        BulkInfoWindow(self)
+    
+    def ui_tick(self):
+        """Apply coalesced progress + log updates, runs every UI_TICK_MS"""
+        start = time.perf_counter()
         try:
-            # Create download folder if doesn't exist
-            os.makedirs(self.download_path, exist_ok=True)
-            
-            if self.download_type == "audio":
-                ydl_opts = {
-                    'format': self.get_format_selector(),
-                    'outtmpl': os.path.join(self.download_path, self.title_template + '.%(ext)s'),
-                    'quiet': self.quiet,
-                    'noplaylist': True,
-                    'progress_hooks': [self.download_progress_hook],
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': self.format_var.get(),
-                        'preferredquality': '320' if self.quality_var.get() == 'Best' else self.quality_var.get().replace('k', ''),
-                    }],
-                }
-                if self.ffmpeg_path and self.ffprobe_path:
-                    ydl_opts['ffmpeg_location'] = self.ffmpeg_path
-                    ydl_opts['ffprobe_location'] = self.ffprobe_path
-            else:
-                ydl_opts = {
-                    'format': self.get_format_selector(),
-                    'outtmpl': os.path.join(self.download_path, self.title_template + '.%(ext)s'),
-                    'merge_output_format': self.format_var.get(),
-                    'quiet': self.quiet,
-                    'noplaylist': True,
-                    'progress_hooks': [self.download_progress_hook],
-                    'postprocessors': [{
-                        'key': 'FFmpegVideoConvertor',
-                        'preferedformat': self.format_var.get(),
-                    }],
-                }
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # get video info
-                self.log_message("Extracting video information...", "accent")
-                info = ydl.extract_info(video_url, download=False)
-                title = info.get('title', 'Unknown')
-                duration = info.get('duration_string', 'Unknown')
-                uploader = info.get('uploader', 'Unknown')
-                
-                self.log_message(f"Title: {title}", "purple")
-                self.log_message(f"Duration: {duration} | Uploader: {uploader}", "secondary")
-                
-                if self.download_type == "audio":
-                    self.log_message("Starting audio download...", "accent")
-                else:
-                    self.log_message("Starting video download...", "accent")
-                
-                # download
-                result = ydl.download([video_url])
-                
-                # get the actual file path
-                if result == 0:  # Success
-                    # find the downloaded file
-                    ext = self.format_var.get()
-                    filename = f"{title}.{ext}"
-                    self.downloaded_file_path = os.path.join(self.download_path, filename)
-                    
-                    if self.download_type == "audio":
-                        self.log_message("Audio download completed successfully!", "success")
-                    else:
-                        self.log_message("Video download completed successfully!", "success")
-                    return True
-                else:
-                    return False
-                
-        except Exception as e:
-            error_msg = f"Download failed: {str(e)}"
-            self.log_message(error_msg, "error")
-            messagebox.showerror("Download Error", error_msg)
-            return False
+            self.flush_log()
+            self.run_ui_calls()
+            self.apply_job_updates()
+            if self.downloading and not self.engine.is_busy():
+                self.batch_finished()
+            updated = self.engine.apply_progress()
+            if updated:
+                latest = updated[-1]
+                self.progress_bar.set(self.batch_progress())
+                if latest.progress < 1.0:
+                    speed_str = f"{format_bytes(latest.speed)}/s" if latest.speed else "N/A"
+                    self.progress_var.set(
+                        f"#{latest.id} Downloading: {int(latest.progress * 100)}% | Speed: {speed_str}"
+                        f" | ETA: {format_eta(latest.eta)} | {self.queue_summary()}"
+                    )
+            self.job_table.refresh()
+        finally:
+            self.engine.metrics.observe_ui_tick(time.perf_counter() - start)
+            self.root.after(UI_TICK_MS, self.ui_tick)
             
     def show_success_popup(self):
         """Show locator popup"""
@@ -678,6 +1107,11 @@ class VideoDownloaderGUI:
                                  hover_color=self.colors['secondary'])
         close_btn.pack(side="left")
         
+    def open_job(self, job):
+        """Double click in the job table: show the file of a finished job"""
+        if job.state == 'done' and job.file_path:
+            self.open_file_location(job.file_path)
+        
     def open_file_location(self, path):
         """Open file location in file explorer"""
         try:
@@ -692,61 +1126,193 @@ class VideoDownloaderGUI:
             messagebox.showerror("Error", f"Could not open file location:\n{str(e)}")
             
     def start_download(self):
-        """Start download in separate thread"""
-        if self.downloading:
+        """Queue every URL in the box for download"""
+        lines = self.url_var.get().split()
+        if not lines:
+            messagebox.showwarning("No URL", "Please enter a video URL first!")
             return
             
-        url = self.url_var.get().strip()
-        if not url:
-            messagebox.showwarning("No URL", "Please enter a video URL first!")
+        # snapshot options so later UI changes don't touch queued jobs
+        options = self.current_options()
+        if options is None:
             return
+        priority = PRIORITIES.get(self.priority_var.get(), PRIORITIES['Normal'])
+        playlist = self.playlist_var.get()
+        
+        def work():
+            urls, duplicates, queued = self.engine.ingest(lines, playlist=playlist)
+            if playlist:
+                for url in urls:
+                    self.engine.expand(url, options, priority)
+                return urls, duplicates, queued, []
+            jobs = [job for job in (self.engine.submit(url, options, priority) for url in urls) if job]
+            return urls, duplicates, queued, jobs
             
-        # reset progress bar
-        self.progress_bar.set(0)
+        def queued_jobs(result):
+            urls, duplicates, queued, jobs = result
+            if duplicates or queued:
+                self.log_message(f"Skipped {duplicates} duplicate URL(s) and {queued} already queued", "secondary")
+            if not urls:
+                if not (duplicates or queued):
+                    messagebox.showwarning("No URL", "Please enter a video URL first!")
+                return
+            if playlist:
+                # entries show up in the batch as the engine queues them
+                self.track_jobs([])
+                return
+            if jobs:
+                self.track_jobs(jobs)
+                self.log_message(f"Queued {len(jobs)} download(s) | {self.queue_summary()}", "accent")
+                
+        self.in_background(work, queued_jobs)
+            
+    def current_options(self, parent=None):
+        """Job options from the settings as they are now (None after telling the user the clip is invalid)"""
+        try:
+            sections, chapters = parse_sections(self.clip_var.get())
+        except ValueError as e:
+            messagebox.showwarning("Invalid clip", str(e), parent=parent or self.root)
+            return None
+        return default_options(self.download_type, self.format_var.get(), self.quality_var.get(),
+                               self.download_path,
+                               size_budget=SIZE_BUDGETS.get(self.size_budget_var.get()),
+                               time_budget=TIME_BUDGETS.get(self.time_budget_var.get()),
+                               avoid_codecs=CODEC_PREFERENCES.get(self.codec_var.get()),
+                               sections=sections, chapters=chapters, exact_cuts=self.exact_cuts_var.get())
+            
+    def resume_jobs(self):
+        """Re-queue downloads left unfinished by the last session"""
+        def resumed(jobs):
+            if jobs:
+                self.track_jobs(jobs)
+                self.log_message(f"Resuming {len(jobs)} unfinished download(s) from last session", "accent")
+                
+        self.in_background(self.engine.resume, resumed)
+            
+    def track_jobs(self, jobs):
+        """Add queued jobs to the current batch"""
+        # new batch once the previous one has drained
+        if not self.downloading:
+            self.batch = []
+            self.batch_ids = set()
+            self.progress_bar.set(0)
         
         # update UI for download state
         self.downloading = True
-        self.download_btn.configure(state='disabled')
         self.stop_btn.configure(state='normal')
-        self.info_btn.configure(state='disabled')
-        
-        if self.download_type == "audio":
-            self.progress_var.set("Downloading audio...")
-        else:
-            self.progress_var.set("Downloading video...")
+        for job in jobs:
+            if job.id not in self.batch_ids:
+                self.batch_ids.add(job.id)
+                self.batch.append(job)
+        self.job_table.add(jobs)
+        self.progress_var.set(f"Downloading... | {self.queue_summary()}")
+        
+    def on_close(self):
+        """Window closed: save job state, running jobs resume next start"""
+        self.background.shutdown(wait=False, cancel_futures=True)
+        self.engine.close()
+        try:
+            folder = app_data_dir()
+            self.engine.metrics.write(os.path.join(folder, 'metrics.json'))
+            self.engine.metrics.write(os.path.join(folder, 'metrics.prom'))
+        except OSError:
+            pass  # metrics are a nice-to-have
+        self.root.destroy()
+        
+    def in_background(self, work, done):
+        """Run work() off the UI thread (URL checks can take a while), then done(result) on the next UI tick"""
+        def run():
+            try:
+                result = work()
+            except Exception as e:
+                self.log_message(f"Background task failed: {e}", "error")
+                return
+            self.ui_calls.put(lambda: done(result))
             
-        # start download in separate thread
-        self.download_thread = threading.Thread(target=self.download_worker, args=(url,))
-        self.download_thread.daemon = True
-        self.download_thread.start()
+        self.background.submit(run)
         
-    def download_worker(self, url):
-        """Worker function for download thread"""
+    def run_ui_calls(self):
+        """Hand finished background work to the UI"""
         try:
-            success = self.dwn_vid(url)
-            if success:
-                if self.download_type == "audio":
-                    self.root.after(0, lambda: self.progress_var.set("Audio download completed!"))
-                else:
-                    self.root.after(0, lambda: self.progress_var.set("Video download completed!"))
-                    
-                # show success popup
-                self.root.after(0, self.show_success_popup)
-            else:
-                self.root.after(0, lambda: self.progress_var.set("Download failed"))
-        except Exception as e:
-            error_msg = f"Download error: {str(e)}"
-            self.root.after(0, lambda: self.progress_var.set("Download failed"))
-            self.root.after(0, lambda: self.log_message(error_msg, "error"))
-        finally:
-            self.root.after(0, self.reset_ui_after_download)
+            while True:
+                self.ui_calls.get_nowait()()
+        except queue.Empty:
+            pass
+        
+    def on_job_update(self, job):
+        """Job state changed (called from worker threads, applied on the next UI tick)"""
+        self.job_updates.put(job)
+        
+    def apply_job_updates(self):
+        """State changes since the last tick, once per job however often it changed"""
+        jobs = {}
+        try:
+            while True:
+                job = self.job_updates.get_nowait()
+                jobs[job.id] = job
+        except queue.Empty:
+            pass
+        for job in jobs.values():
+            self.job_state_changed(job)
+        
+    def job_state_changed(self, job):
+        """Reflect job state in the UI"""
+        if job.id not in self.batch_ids and (self.downloading or job.state not in FINISHED_STATES):
+            # queued by the engine itself (playlist entries), maybe already further along
+            self.track_jobs([job])
+            if job.state == 'queued':
+                return
+        self.job_table.changed()
+        if job.state == 'done' and job.file_path:
+            self.downloaded_file_path = job.file_path
+        if job.state in FINISHED_STATES:
+            job.progress = 1.0
+            self.progress_bar.set(self.batch_progress())
+            
+        if job.state == 'done':
+            self.progress_var.set(f"#{job.id} completed | {self.queue_summary()}")
+        elif job.state == 'failed':
+            self.progress_var.set(f"#{job.id} failed | {self.queue_summary()}")
+        elif job.state == 'cancelled':
+            self.progress_var.set(f"#{job.id} cancelled | {self.queue_summary()}")
+        elif job.state == 'running' and job.estimated_bytes and not job.downloaded_bytes:
+            self.progress_var.set(f"#{job.id} starting, ~{format_bytes(job.estimated_bytes)} to download"
+                                  f" | {self.queue_summary()}")
+            
+    def batch_finished(self):
+        """Everything queued has been processed"""
+        done = sum(1 for job in self.batch if job.state == 'done')
+        failed = sum(1 for job in self.batch if job.state == 'failed')
+        cancelled = sum(1 for job in self.batch if job.state == 'cancelled')
+        self.reset_ui_after_download()
+        summary = f"{done} completed"
+        if failed:
+            summary += f", {failed} failed"
+        if cancelled:
+            summary += f", {cancelled} cancelled"
+        self.progress_var.set(f"Finished: {summary}")
+        self.log_message(f"Queue finished: {summary}", "warning" if failed or cancelled else "success")
+        if done and not cancelled and self.downloaded_file_path:
+            self.show_success_popup()
+            
+    def queue_summary(self):
+        """Short queue status text"""
+        counts = self.queue.counts()
+        if counts['processing']:
+            return f"{counts['running']} running, {counts['processing']} converting, {counts['queued']} queued"
+        return f"{counts['running']} running, {counts['queued']} queued"
+        
+    def batch_progress(self):
+        """Overall progress of current batch (0..1)"""
+        if not self.batch:
+            return 0
+        return sum(job.progress for job in self.batch) / len(self.batch)
             
     def stop_download(self):
-        """Stop current download"""
-        # note: doesn't work :d
-        if hasattr(self, 'download_thread') and self.download_thread.is_alive():
-            self.log_message("Download stop requested...", "warning")
-            self.reset_ui_after_download()
+        """Cancel all queued and running downloads"""
+        if self.engine.is_busy():
+            cancelled = self.engine.cancel_all()
+            self.log_message(f"Stopped {len(cancelled)} download(s)", "warning")
             
     def reset_ui_after_download(self):
         """Reset UI elements after download completion"""
@@ -763,12 +1329,21 @@ def main():
     root = ctk.CTk()
     
     app = VideoDownloaderGUI(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     
     # Add startup messages cause otherwise the log would be empty and ugly 
     app.log_message("Modern Video Downloader started!", "success")
     app.log_message("Tip: You can download from YouTube, TikTok, Instagram, and many more platforms! ;) ", "info")
     app.log_message("Switch to Audio mode to download music files!", "secondary")
     
+    if os.environ.get('THEDOWNLOADER_STARTUP_BENCH'):
+        # benchmarks/startup.py: report first paint and quit
+        def painted():
+            root.update()
+            print("first-paint", flush=True)
+            root.destroy()
+        root.after(0, painted)
+    
     root.mainloop()
 
 
@@ -0,0 +1,1598 @@
+"""Download engine: everything that doesn't need a window
+
+Used by the GUI (downloader.py) and the command line (cli.py).
+"""
+import threading
+import os
+import sys
+import re
+import glob
+import weakref
+from urllib.parse import urlparse
+import platform
+import heapq
+import itertools
+import json
+import time
+import copy
+import hashlib
+import shutil
+import tempfile
+import uuid
+import random
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from archive import DownloadArchive
+from bandwidth import BandwidthManager, weight_for
+from formats import BudgetSelector, estimate_bytes, has_budget
+from fragments import (CONNECTION_BUDGET, CONTROLLER_PARAM, FRAGMENT_WORKERS, ConnectionBudget,
+                       FragmentController, install as install_fragment_gate)
+from ingest import dedup_key, normalize_url, unique_urls
+from journal import JobJournal
+from lookup import LOOKUP_WORKERS, BulkLookup
+from metrics import Metrics
+from postproc import codec_name, format_sort_for, plan_postprocessing, selected_formats
+from sections import clip_seconds, clip_share, describe_clips, has_clip, range_function
+from sessions import SessionPool
+from verify import expectations, find_ffprobe, verify_file
+
+# job priorities (lower runs first)
+PRIORITIES = {'High': 0, 'Normal': 1, 'Low': 2}
+
+# choices offered by the GUI and CLI
+VIDEO_FORMATS = ['mp4', 'mkv', 'webm', 'avi']
+AUDIO_FORMATS = ['mp3', 'wav', 'aac', 'm4a', 'ogg', 'flac']
+VIDEO_QUALITIES = ['Best', 'Worst', '1080p', '720p', '480p', '360p']
+AUDIO_QUALITIES = ['Best', '320k', '256k', '192k', '128k', '96k']
+SPEED_LIMITS = {'Unlimited': None, '500 KB/s': 500 * 1024, '1 MB/s': 1024 ** 2, '2 MB/s': 2 * 1024 ** 2,
+                '5 MB/s': 5 * 1024 ** 2, '10 MB/s': 10 * 1024 ** 2}
+
+# High priority jobs may run on this many workers beyond max_workers,
+# so a single urgent download doesn't wait for a slot in a long batch
+EXPRESS_WORKERS = 1
+
+# per-host scheduling: jobs running against one host at once, and how long a
+# host that answered 429/403 is left alone (doubling per throttled attempt, jittered)
+HOST_LIMIT = 3
+BACKOFF_BASE = 5
+BACKOFF_MAX = 300
+THROTTLE_RETRIES = 3
+THROTTLE_ERRORS = ('HTTP Error 429', 'HTTP Error 403', 'Too Many Requests')
+HOST_ALIASES = {'youtu.be': 'youtube.com', 'music.youtube.com': 'youtube.com'}
+
+# what happens to .part/fragment files of a cancelled job
+PARTIAL_POLICIES = ('delete', 'keep')
+
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+# file name suffix of clip jobs: "Title [00-01-00-00-01-30].mp4"
+CLIP_TEMPLATE = ' [%(section_start>%H-%M-%S)s-%(section_end>%H-%M-%S)s].%(ext)s'
+
+# playlist/channel expansion: how many lists are listed at once, and how far
+# the listing may run ahead of the downloads before it waits
+EXPANSION_WORKERS = 2
+EXPANSION_BACKLOG = 100
+EXPANSION_PAGE_SIZE = 50
+
+# job pipeline: extract + fetch run on the download workers (network), merge/convert
+# on a pool sized to the cores, so one job's ffmpeg overlaps the next job's transfer
+EXTRACT_CONCURRENCY = 4
+PROCESS_WORKERS = os.cpu_count() or 2
+VERIFY_WORKERS = 2  # ffprobe checks of finished files, in the background
+
+# how long extracted info stays valid (format URLs expire on most sites)
+INFO_CACHE_TTL = 30 * 60
+# info fields postprocessing doesn't read, dropped while a fetched job waits for a converter
+UNUSED_AFTER_FETCH = ('formats', 'thumbnails', 'subtitles', 'automatic_captions', 'heatmap', 'description')
+SHARED_OPTIONS_MAX = 64
+
+# URLs of a host no extractor claimed before ids from URLs stop being looked for there (generic sites)
+HOST_MISSES_BEFORE_SKIP = 3
+
+_yt_dlp = None
+_yt_dlp_lock = threading.Lock()
+_extractors = None  # extractor classes, for ids from URLs
+_matched_hosts = set()  # hosts some extractor claimed a URL of
+_host_misses = {}  # host -> distinct URLs of it no extractor claimed
+
+# worker thread ident -> subprocesses (ffmpeg) it started, so cancel can kill them
+_children = {}
+_children_lock = threading.Lock()
+
+
+def load_yt_dlp():
+    """Import yt-dlp on first use (its extractor registry is most of our startup time)"""
+    global _yt_dlp
+    if _yt_dlp is None:
+        with _yt_dlp_lock:
+            if _yt_dlp is None:
+                import yt_dlp
+                _track_child_processes(yt_dlp)
+                install_fragment_gate(yt_dlp)
+                _yt_dlp = yt_dlp
+    return _yt_dlp
+
+
+def _track_child_processes(yt_dlp):
+    """Remember which thread started each yt-dlp subprocess (ffmpeg postprocessors, ffmpeg downloader)"""
+    popen = yt_dlp.utils.Popen
+    original_init = popen.__init__
+
+    def __init__(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        with _children_lock:
+            _children.setdefault(threading.get_ident(), weakref.WeakSet()).add(self)
+
+    popen.__init__ = __init__
+
+
+def kill_child_processes(thread_ident):
+    """Kill subprocesses started by a worker thread that are still running"""
+    with _children_lock:
+        procs = list(_children.get(thread_ident, ()))
+    for proc in procs:
+        try:
+            if proc.poll() is None:
+                proc.kill()
+        except OSError:
+            pass
+
+
+def forget_child_processes(thread_ident):
+    with _children_lock:
+        _children.pop(thread_ident, None)
+
+
+def warm_up():
+    """Load yt-dlp and its extractors on a background thread"""
+    def work():
+        try:
+            yt_dlp = load_yt_dlp()
+            # first instance builds the extractor list, later ones reuse it
+            yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}).close()
+        except Exception:
+            pass  # real error shows up on first download
+    thread = threading.Thread(target=work, daemon=True)
+    thread.start()
+    return thread
+
+
+def app_data_dir(*parts):
+    """Per-user folder for caches and state"""
+    if platform.system() == "Windows":
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    path = os.path.join(base, 'TheDownloader', *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def format_bytes(num):
+    """Human readable byte count"""
+    if num is None:
+        return "N/A"
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(num) < 1024:
+            return f"{num:.1f}{unit}" if unit != 'B' else f"{int(num)}B"
+        num /= 1024
+    return f"{num:.1f}TiB"
+
+
+def format_eta(seconds):
+    """ETA as mm:ss / h:mm:ss"""
+    if seconds is None:
+        return "N/A"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+def host_key(url):
+    """Host a URL's downloads count against ('www.'/'m.' dropped, known aliases merged)"""
+    host = (urlparse(url.strip()).hostname or '').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return HOST_ALIASES.get(host, host)
+
+
+def archive_id_from_url(url):
+    """(extractor, video id) of a URL without any request, None if only extraction can tell"""
+    # a scan is ~1800 regexes: the same URL (in any spelling) is only scanned once, and hosts
+    # none of them ever claimed stop being scanned after a few URLs
+    url = normalize_url(url)
+    host = urlparse(url).hostname
+    if host and host not in _matched_hosts and _host_misses.get(host, 0) >= HOST_MISSES_BEFORE_SKIP:
+        return None
+    return _archive_id_from_url(url, host)
+
+
+@lru_cache(maxsize=4096)
+def _archive_id_from_url(url, host):
+    global _extractors
+    if _extractors is None:
+        _extractors = [ie for ie in load_yt_dlp().extractor.gen_extractor_classes() if ie.ie_key() != 'Generic']
+    # first suitable extractor in yt-dlp's own order, like extraction picks it
+    for ie in _extractors:
+        if ie.suitable(url):
+            _matched_hosts.add(host)
+            video_id = ie.get_temp_id(url)
+            return (ie.ie_key(), video_id) if video_id else None
+    if host:
+        _host_misses[host] = _host_misses.get(host, 0) + 1
+    return None
+
+
+def archive_id(info):
+    """(extractor, video id) of an info dict or flat playlist entry"""
+    extractor = info.get('extractor_key') or info.get('ie_key')
+    video_id = info.get('id')
+    if not extractor or not video_id:
+        return None
+    if extractor == 'Generic':
+        # generic ids are just file names, the URL is what identifies the video
+        url = info.get('webpage_url') or info.get('url')
+        return (extractor, canonical_url(url)) if url else None
+    return (extractor, video_id)
+
+
+def prune_info(info):
+    """Shallow copy of an info dict without the fields nothing reads after the transfer"""
+    return {key: value for key, value in info.items() if key not in UNUSED_AFTER_FETCH}
+
+
+def canonical_url(url):
+    """Normalize URL for use as a cache key"""
+    return normalize_url(url)
+
+
+class InfoCache:
+    """TTL-bounded cache of extracted info dicts, in memory and on disk"""
+    def __init__(self, folder=None, ttl=INFO_CACHE_TTL, max_entries=256):
+        if folder:
+            try:
+                os.makedirs(folder, exist_ok=True)
+            except OSError:
+                folder = None  # memory only
+        self.folder = folder
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._mem = OrderedDict()  # key -> (timestamp, info)
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.folder, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, url):
+        """Cached info for url or None"""
+        key = canonical_url(url)
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._mem.move_to_end(key)
+                # yt-dlp mutates the dict while processing it
+                return copy.deepcopy(entry[1])
+            self._mem.pop(key, None)
+        if not self.folder:
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - entry.get('time', 0) >= self.ttl:
+            return None
+        self._remember(key, entry['time'], entry['info'])
+        return copy.deepcopy(entry['info'])
+
+    def put(self, url, info):
+        """Store a (sanitized, JSON-safe) info dict"""
+        now = time.time()
+        keys = {canonical_url(url)}
+        if info.get('webpage_url'):
+            keys.add(canonical_url(info['webpage_url']))
+        for key in keys:
+            self._remember(key, now, info)
+            if self.folder:
+                self._write(key, {'time': now, 'url': url, 'info': info})
+
+    def drop(self, url):
+        """Forget url (e.g. its format URLs expired)"""
+        key = canonical_url(url)
+        with self._lock:
+            self._mem.pop(key, None)
+        if self.folder:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def prune(self):
+        """Delete expired files from disk"""
+        if not self.folder:
+            return
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key, stamp, info):
+        with self._lock:
+            self._mem[key] = (stamp, info)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _write(self, key, entry):
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(entry))
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+class InfoSpill:
+    """Info dicts of queued jobs, on disk until the job runs
+
+    A resolved playlist entry carries its formats, thumbnails and subtitles;
+    thousands of queued ones would otherwise all sit in memory. Files live in
+    a private temp folder removed on close (memory only if it can't be made).
+    """
+    def __init__(self):
+        try:
+            self.folder = tempfile.mkdtemp(prefix='thedownloader-spill-')
+        except OSError:
+            self.folder = None
+        self._mem = {}
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + '.json')
+
+    def put(self, key, info):
+        if self.folder:
+            try:
+                with open(self._path(key), 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(info))  # the C encoder, json.dump streams in Python
+                return
+            except (OSError, TypeError, ValueError):
+                self.drop(key)
+        with self._lock:
+            self._mem[key] = info
+
+    def take(self, key):
+        """The info stored for key (None if there's none), removed from the spill"""
+        with self._lock:
+            info = self._mem.pop(key, None)
+        if info is not None or not self.folder:
+            return info
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.drop(key)
+        return info
+
+    def drop(self, key):
+        with self._lock:
+            self._mem.pop(key, None)
+        if self.folder:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            self._mem.clear()
+        if self.folder:
+            shutil.rmtree(self.folder, ignore_errors=True)
+
+
+class DownloadJob:
+    """One queued download + its state
+
+    Queues can hold tens of thousands of these, so the record is slotted and
+    keeps no info dict: a resolved playlist entry waits on disk (InfoSpill)
+    and only the few fields the UI and logs need are copied out.
+    """
+    __slots__ = (
+        'id', 'key', 'created', 'url', 'host', 'options', 'priority', 'state', 'stage', 'phase_times',
+        '_stage_start', '_cancelled', 'worker', 'temp_files', 'spilled', 'archive_key', 'dedup_key', 'title',
+        'duration',
+        'format_id', 'pp_path', 'progress', 'downloaded_bytes', 'total_bytes', 'estimated_bytes', 'speed',
+        'peak_speed', 'started_at', 'first_byte', 'eta', 'file_path', 'error', 'expected', 'verified',
+        'verify_error', 'file_bytes', 'fragment_controller', 'throttled', 'attempts', 'retry_delay',
+    )
+    _ids = itertools.count(1)
+
+    def __init__(self, url, options, priority=PRIORITIES['Normal'], key=None):
+        self.id = next(self._ids)
+        self.key = key or uuid.uuid4().hex  # stable across restarts (journal)
+        self.created = time.time()
+        self.url = url
+        self.host = sys.intern(host_key(url))
+        self.options = options  # snapshot of type/format/quality/path at submit time, shared, read-only
+        self.priority = priority
+        self.state = 'queued'  # queued, running, processing, done, failed, cancelled
+        self.stage = None      # extract, fetch, process_queue, process, finalize (None: queued/finished)
+        self.phase_times = {}  # phase -> seconds spent in it (see metrics.PHASES)
+        self._stage_start = self.created
+        self._cancelled = False
+        self.worker = None      # thread running the job
+        self.temp_files = None   # files yt-dlp wrote for this job, for cleanup on cancel (set once there are any)
+        self.spilled = False     # resolved info (playlist entry) waits in the engine's spill, skips extraction
+        self.archive_key = None  # (extractor, id) when known without extracting
+        self.dedup_key = None    # ingest.dedup_key of the URL while the job is unfinished (engine.ingest skips it)
+        self.title = None
+        self.duration = None
+        self.format_id = None    # chosen format(s), e.g. '137+140'
+        self.pp_path = None      # postprocessing plan taken: none, remux or transcode
+        self.progress = 0.0
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.estimated_bytes = None  # size of the chosen formats, known before the transfer starts
+        self.speed = None
+        self.peak_speed = None
+        self.started_at = None   # when the current attempt left the queue
+        self.first_byte = None   # seconds from started_at to the first transferred byte
+        self.eta = None
+        self.file_path = None    # final file, as reported by yt-dlp
+        self.error = None
+        self.expected = None     # what verification compares the file against
+        self.verified = None     # True/False once checked with ffprobe
+        self.verify_error = None
+        self.file_bytes = {}  # file -> bytes transferred so far
+        self.fragment_controller = None
+        self.throttled = False   # last attempt failed with 429/403, queue retries after a backoff
+        self.attempts = 0        # throttled attempts so far
+        self.retry_delay = None  # seconds the last backoff waits
+
+    def enter_stage(self, stage):
+        """Close the running phase's timer and start the next (None = left the pipeline)"""
+        now = time.time()
+        phase = self.stage or 'queue'
+        self.phase_times[phase] = self.phase_times.get(phase, 0) + now - self._stage_start
+        self.stage = stage
+        self._stage_start = now
+
+    def bytes_moved(self):
+        return sum(self.file_bytes.values())
+
+    def add_temp_file(self, path):
+        if self.temp_files is None:
+            self.temp_files = set()
+        self.temp_files.add(path)
+
+    def describe(self, info):
+        """Copy what the record keeps from an info dict"""
+        self.title = info.get('title') or self.title
+        self.duration = info.get('duration') or self.duration
+        if info.get('format_id'):
+            self.format_id = info['format_id']
+
+    def sort_key(self):
+        # priority first, then submission order
+        return (self.priority, self.id)
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+
+class ProgressBoard:
+    """Latest progress per job: hooks overwrite, the UI drains on its own clock"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def update(self, job_id, d):
+        """Record a yt-dlp progress dict (numeric fields only)"""
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        sample = (d.get('status'), d.get('downloaded_bytes') or 0, total, d.get('speed'), d.get('eta'))
+        with self._lock:
+            self._pending[job_id] = sample
+
+    def drain(self):
+        """All updates since last drain, newest per job"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class DownloadQueue:
+    """Priority job queue served by a pool of worker threads
+
+    Jobs are queued per host: at most host_limit run against one host at a
+    time, and a host that throttles us (see DownloadJob.throttled) is left
+    alone for a growing, jittered delay while other hosts keep going.
+    """
+    def __init__(self, run_job, on_update=None, max_workers=3, host_limit=HOST_LIMIT):
+        self.run_job = run_job      # run_job(job) -> True/False, called on a worker thread
+                                    # (None after hand_off(job), finish(job, ok) comes later)
+        self.on_update = on_update  # on_update(job), called on a worker thread
+        self.max_workers = max(1, max_workers)
+        self.host_limit = max(1, host_limit)
+        self.jobs = {}
+        self._queues = {}        # host -> heap of (sort key, job)
+        self._queued = 0
+        self._queued_high = 0    # queued High priority jobs, they get the express workers
+        self._host_running = {}  # host -> running jobs
+        self._backoff = {}       # host -> (retry after, throttled attempts in a row)
+        self._cond = threading.Condition()
+        self._workers = []
+        self._detached = []  # workers still winding down a cancelled job
+        self._active = set()
+        self._running = 0
+        self._processing = 0  # jobs handed off to postprocessing
+        self._closed = False
+
+    def submit(self, job):
+        """Add job to the queue"""
+        with self._cond:
+            self.jobs[job.id] = job
+            self._push(job)
+            self._spawn_workers()
+            self._cond.notify()
+        self._notify(job)
+        return job
+
+    def set_max_workers(self, count):
+        """Change pool size, extra workers exit once their current job is done"""
+        with self._cond:
+            self.max_workers = max(1, count)
+            self._spawn_workers()
+            self._cond.notify_all()
+
+    def set_host_limit(self, count):
+        """Change how many jobs may run against one host at once"""
+        with self._cond:
+            self.host_limit = max(1, count)
+            self._cond.notify_all()
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job, its slot goes to the next job right away"""
+        with self._cond:
+            job = self.jobs.get(job_id)
+            if job is None or job.state in FINISHED_STATES:
+                return False
+            job.cancel()
+            if job.state == 'queued':
+                # its heap entry is skipped when it comes up (cancelling a big queue stays linear)
+                self._queued -= 1
+                self._queued_high -= job.priority == PRIORITIES['High']
+            elif job.state == 'processing':
+                self._processing -= 1
+            else:
+                # the worker keeps the thread until yt-dlp unwinds, but no longer counts
+                self._running -= 1
+                self._active.discard(job)
+                self._release_host(job)
+                if job.worker in self._workers:
+                    self._workers.remove(job.worker)
+                    self._detached.append(job.worker)
+                self._spawn_workers()
+                self._cond.notify_all()
+            job.state = 'cancelled'
+        self._notify(job)
+        return True
+
+    def hand_off(self, job):
+        """Free a running job's worker slot while the job goes on elsewhere
+
+        Returns False if the job was cancelled meanwhile.
+        """
+        with self._cond:
+            if job.state != 'running':
+                return False
+            job.state = 'processing'
+            job.worker = None
+            self._active.discard(job)
+            self._running -= 1
+            self._release_host(job)
+            self._backoff.pop(job.host, None)
+            self._processing += 1
+            self._cond.notify_all()
+        self._notify(job)
+        return True
+
+    def finish(self, job, ok):
+        """Final state of a job that was handed off"""
+        with self._cond:
+            if job.state != 'processing':
+                return  # cancelled
+            job.state = 'done' if ok else 'failed'
+            self._processing -= 1
+        self._notify(job)
+
+    def cancel_all(self):
+        """Cancel everything not finished yet, returns the cancelled jobs"""
+        return [job for job in self.pending_jobs() if self.cancel(job.id)]
+
+    def pending_jobs(self):
+        """Jobs queued, running or being processed"""
+        with self._cond:
+            return [job for job in self.jobs.values() if job.state not in FINISHED_STATES]
+
+    def join(self, timeout=None):
+        """Wait for worker threads, including ones finishing cancelled jobs"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            threads = self._workers + self._detached
+        for thread in threads:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if thread is not threading.current_thread():
+                thread.join(remaining)
+
+    def counts(self):
+        """Number of jobs per state"""
+        with self._cond:
+            counts = {'queued': 0, 'running': 0, 'processing': 0, 'done': 0, 'failed': 0, 'cancelled': 0}
+            for job in self.jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return counts
+
+    def running_jobs(self):
+        with self._cond:
+            return list(self._active)
+
+    def queued_count(self):
+        with self._cond:
+            return self._queued
+
+    def is_busy(self):
+        with self._cond:
+            return self._queued > 0 or self._running > 0 or self._processing > 0
+
+    def shutdown(self):
+        """Stop handing out jobs and let idle workers exit"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _push(self, job):
+        # caller holds the lock
+        heapq.heappush(self._queues.setdefault(job.host, []), (job.sort_key(), job))
+        self._queued += 1
+        self._queued_high += job.priority == PRIORITIES['High']
+
+    def _release_host(self, job):
+        # caller holds the lock
+        running = self._host_running.get(job.host, 0) - 1
+        if running > 0:
+            self._host_running[job.host] = running
+        else:
+            self._host_running.pop(job.host, None)
+
+    def _back_off(self, host):
+        """Keep away from a throttling host for a while, returns the delay"""
+        # caller holds the lock
+        attempts = self._backoff.get(host, (0, 0))[1] + 1
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        self._backoff[host] = (time.monotonic() + delay, attempts)
+        return delay
+
+    def _pick(self):
+        """Host of the best job that may start now (or None), and seconds until a backoff ends"""
+        # caller holds the lock
+        now = time.monotonic()
+        best, wait = None, None
+        for host, heap in self._queues.items():
+            while heap and heap[0][1].state != 'queued':
+                heapq.heappop(heap)  # cancelled while queued
+            if not heap:
+                continue
+            until = self._backoff.get(host, (0, 0))[0]
+            if until > now:
+                wait = until - now if wait is None else min(wait, until - now)
+                continue
+            if self._host_running.get(host, 0) >= self.host_limit:
+                continue
+            if best is None or heap[0][0] < self._queues[best][0][0]:
+                best = host
+        return best, wait
+
+    def _worker_limit(self):
+        # caller holds the lock
+        if self._queued_high:
+            return self.max_workers + EXPRESS_WORKERS
+        return self.max_workers
+
+    def _spawn_workers(self):
+        # caller holds the lock
+        self._workers = [w for w in self._workers if w.is_alive()]
+        self._detached = [w for w in self._detached if w.is_alive()]
+        limit = self._worker_limit()
+        while len(self._workers) < limit and len(self._workers) < self._queued + self._running:
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._closed or len(self._workers) > self._worker_limit():
+                    self._workers.remove(threading.current_thread())
+                    return None
+                host, wait = self._pick()
+                if host is not None:
+                    _, job = heapq.heappop(self._queues[host])
+                    if not self._queues[host]:
+                        del self._queues[host]
+                    self._queued -= 1
+                    self._queued_high -= job.priority == PRIORITIES['High']
+                    self._host_running[host] = self._host_running.get(host, 0) + 1
+                    job.state = 'running'
+                    job.worker = threading.current_thread()
+                    self._active.add(job)
+                    self._running += 1
+                    return job
+                # nothing startable: empty, every host busy, or backing off
+                if not self._cond.wait(timeout=min(wait, 30) if wait else 30) and not self._queued:
+                    # idle for a while, give the thread back
+                    self._workers.remove(threading.current_thread())
+                    return None
+
+    def _worker_loop(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._notify(job)
+            try:
+                ok = self.run_job(job)
+            except Exception as e:
+                job.error = str(e)
+                ok = False
+            if ok is None:
+                continue  # handed off, the slot is already free
+            with self._cond:
+                if job.state == 'cancelled':
+                    # cancel() already gave our slot away, this thread is done
+                    return
+                self._active.discard(job)
+                self._running -= 1
+                self._release_host(job)
+                if not ok and job.throttled and job.attempts < THROTTLE_RETRIES:
+                    # back in the queue, other hosts go first meanwhile
+                    job.attempts += 1
+                    job.retry_delay = self._back_off(job.host)
+                    job.throttled = False
+                    job.state = 'queued'
+                    self._push(job)
+                else:
+                    if ok:
+                        self._backoff.pop(job.host, None)
+                    job.state = 'done' if ok else 'failed'
+                self._cond.notify_all()
+            self._notify(job)
+
+    def _notify(self, job):
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception:
+                pass
+
+
+def default_options(download_type='video', file_format=None, quality='Best', download_path=None,
+                    playlist=False, size_budget=None, time_budget=None, avoid_codecs=None, sections=None,
+                    chapters=None, exact_cuts=False):
+    """Per-job options dict"""
+    if file_format is None:
+        file_format = 'mp3' if download_type == 'audio' else 'mp4'
+    options = {
+        'download_type': download_type,
+        'file_format': file_format,
+        'quality': quality,
+        'download_path': download_path or os.path.expanduser('~/Downloads'),
+        'playlist': playlist,  # expand playlist/channel URLs into one job per entry
+    }
+    # format budget (see formats.py), only present when set so journal keys of plain jobs don't change
+    if size_budget:
+        options['size_budget'] = size_budget  # bytes
+    if time_budget:
+        options['time_budget'] = time_budget  # seconds at the expected bandwidth
+    if avoid_codecs:
+        options['avoid_codecs'] = list(avoid_codecs)
+    # clips (see sections.py), same: only when set
+    if sections:
+        options['sections'] = [list(span) for span in sections]  # [start, end or None] seconds
+    if chapters:
+        options['chapters'] = list(chapters)  # title patterns
+    if exact_cuts and (sections or chapters):
+        options['exact_cuts'] = True
+    return options
+
+
+def find_bundled_ffmpeg():
+    """ffmpeg/ffprobe shipped next to a frozen build, or (None, None)"""
+    if getattr(sys, 'frozen', False):
+        bundle_dir = sys._MEIPASS
+        ffmpeg_path = os.path.join(bundle_dir, 'ffmpeg.exe')
+        ffprobe_path = os.path.join(bundle_dir, 'ffprobe.exe')
+        if os.path.exists(ffmpeg_path):
+            return ffmpeg_path, ffprobe_path
+    return None, None
+
+
+def expose_ffmpeg(ffmpeg_path):
+    """Put ffmpeg's folder on PATH: yt-dlp's ffmpeg downloader (clips) only looks there, not at ffmpeg_location"""
+    folder = os.path.dirname(os.path.abspath(ffmpeg_path))
+    paths = os.environ.get('PATH', '').split(os.pathsep)
+    if folder not in paths:
+        os.environ['PATH'] = os.pathsep.join([folder] + paths)
+
+
+def get_format_selector(download_type, quality):
+    """yt-dlp format selector"""
+    if download_type == "audio":
+        if quality == "Best":
+            return 'bestaudio/best'
+        elif quality == "320k":
+            return 'bestaudio[abr<=320]/best'
+        elif quality == "256k":
+            return 'bestaudio[abr<=256]/best'
+        elif quality == "192k":
+            return 'bestaudio[abr<=192]/best'
+        elif quality == "128k":
+            return 'bestaudio[abr<=128]/best'
+        elif quality == "96k":
+            return 'bestaudio[abr<=96]/best'
+        else:
+            return 'bestaudio/best'
+    else:
+        if quality == "Best":
+            return 'bestvideo+bestaudio/best'
+        elif quality == "Worst":
+            return 'worstvideo+worstaudio/worst'
+        elif quality == "1080p":
+            return 'bestvideo[height<=1080]+bestaudio/best[height<=1080]'
+        elif quality == "720p":
+            return 'bestvideo[height<=720]+bestaudio/best[height<=720]'
+        elif quality == "480p":
+            return 'bestvideo[height<=480]+bestaudio/best[height<=480]'
+        elif quality == "360p":
+            return 'bestvideo[height<=360]+bestaudio/best[height<=360]'
+        else:
+            return 'bestvideo+bestaudio/best'
+
+
+class DownloadEngine:
+    """Queue + workers + yt-dlp, driven through plain Python calls"""
+    def __init__(self, log=None, on_update=None, max_workers=3, quiet=True,
+                 title_template='%(title)s', ffmpeg_path=None, ffprobe_path=None, cache_folder=None,
+                 partial_policy='delete', journal_path=None, process_workers=PROCESS_WORKERS,
+                 fragment_workers=FRAGMENT_WORKERS, connection_budget=CONNECTION_BUDGET, http_chunk_size=None,
+                 rate_limit=None, host_limit=HOST_LIMIT, archive_path=None, verify=False, reuse_sessions=True):
+        self.log = log or (lambda message, msg_type="info": None)
+        self.on_update = on_update
+        self.quiet = quiet
+        self.partial_policy = partial_policy
+        self.title_template = title_template
+        if ffmpeg_path is None:
+            ffmpeg_path, ffprobe_path = find_bundled_ffmpeg()
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path
+        if ffmpeg_path:
+            expose_ffmpeg(ffmpeg_path)
+        self.fragment_workers = max(1, fragment_workers)
+        self.connections = ConnectionBudget(connection_budget)  # fragment fetches in flight, all jobs
+        self.http_chunk_size = http_chunk_size  # bytes per range request for plain HTTP, None = one request
+        self.bandwidth = BandwidthManager(rate_limit)  # bytes/s over all jobs, None = unlimited
+        self.progress = ProgressBoard()
+        self.metrics = Metrics()
+        self.spill = InfoSpill()  # resolved playlist entries of queued jobs
+        self._shared_options = OrderedDict()  # jobs with equal options share one dict
+        self._options_lock = threading.Lock()
+        self._active_keys = {}  # dedup key -> unfinished jobs with it
+        self._keys_lock = threading.Lock()
+        self.queue = DownloadQueue(self.run_job, self._job_updated, max_workers=max_workers, host_limit=host_limit)
+        # warm YoutubeDL instances, about one per download worker (0 kept = a fresh one per job)
+        self.reuse_sessions = reuse_sessions
+        self.sessions = SessionPool(max_idle=max_workers + EXPRESS_WORKERS if reuse_sessions else 0)
+        self.extract_slots = threading.BoundedSemaphore(EXTRACT_CONCURRENCY)
+        self.processor = ThreadPoolExecutor(max_workers=max(1, process_workers), thread_name_prefix='process')
+        self.verify = verify  # ffprobe every finished file
+        self.verifier = ThreadPoolExecutor(max_workers=VERIFY_WORKERS, thread_name_prefix='verify')
+        self._verifying = 0
+        self._verify_lock = threading.Lock()
+        self._no_ffprobe_logged = False
+        self.expander = ThreadPoolExecutor(max_workers=EXPANSION_WORKERS, thread_name_prefix='expand')
+        self._expansions = set()  # cancel events of playlists being listed
+        self._expanding_lock = threading.Lock()
+        self.archive = DownloadArchive(archive_path) if archive_path else None
+        self.journal = None
+        if journal_path:
+            self.journal = JobJournal(journal_path, active_jobs=self.queue.running_jobs)
+        try:
+            self.info_cache = InfoCache(cache_folder or app_data_dir('info'))
+            threading.Thread(target=self.info_cache.prune, daemon=True).start()
+        except OSError:
+            self.info_cache = InfoCache()  # memory only
+
+    def submit(self, url, options=None, priority=PRIORITIES['Normal'], key=None):
+        """Queue url for download, returns the job (None if it was already downloaded)"""
+        options = self.share_options(dict(options or default_options(), playlist=False))
+        if self.journal and key is None:
+            done_path = self.journal.find_done(url, options)
+            if done_path and os.path.exists(done_path):
+                self.log(f"Already downloaded, skipping: {url}", "secondary")
+                return None
+        return self._enqueue(DownloadJob(url, options, priority, key=key))
+
+    def _enqueue(self, job):
+        """Queue a new job, its URL counts as queued for ingest until the job finishes"""
+        job.dedup_key = dedup_key(job.url, archive_id_from_url)
+        with self._keys_lock:
+            self._active_keys[job.dedup_key] = self._active_keys.get(job.dedup_key, 0) + 1
+        return self.queue.submit(job)
+
+    def _release_key(self, job):
+        with self._keys_lock:
+            key, job.dedup_key = job.dedup_key, None
+            if key is None:
+                return
+            count = self._active_keys.get(key, 0) - 1
+            if count > 0:
+                self._active_keys[key] = count
+            else:
+                self._active_keys.pop(key, None)
+
+    def share_options(self, options):
+        """One dict per distinct set of job options (never changed after submit), not one per job"""
+        key = repr(sorted(options.items()))
+        with self._options_lock:
+            shared = self._shared_options.get(key)
+            if shared is None:
+                shared = self._shared_options[key] = options
+                while len(self._shared_options) > SHARED_OPTIONS_MAX:
+                    self._shared_options.popitem(last=False)
+            else:
+                self._shared_options.move_to_end(key)
+        return shared
+
+    def ingest(self, lines, playlist=False):
+        """Normalized URLs from pasted/loaded lines, without duplicates or ones already queued/running
+
+        playlist: the URLs will be expanded, so a watch?v=X&list=Y URL counts as list Y.
+        Returns (urls, duplicates in lines, already queued) - no network access.
+        """
+        # keys of queued jobs are worked out once when they're queued (single videos, expanded entries included)
+        with self._keys_lock:
+            active = set(self._active_keys)
+        return unique_urls(lines, archive_id_from_url, active, playlist)
+
+    def expand(self, url, options=None, priority=PRIORITIES['Normal']):
+        """List a playlist/channel in the background, queueing entries as they are found"""
+        cancelled = threading.Event()
+        with self._expanding_lock:
+            self._expansions.add(cancelled)
+        return self.expander.submit(self._expand, url, dict(options or default_options()), priority, cancelled)
+
+    def _expand(self, url, options, priority, cancelled):
+        count = skipped = 0
+        try:
+            self.log(f"Expanding playlist: {url}", "accent")
+            ydl_opts = {
+                'quiet': True,
+                'no_warnings': True,
+                'extract_flat': 'in_playlist',
+            }
+            load_yt_dlp()
+            with self.sessions.session(ydl_opts) as ydl:
+                result = ydl.extract_info(url, download=False, process=False)
+                if result.get('_type') not in ('playlist', 'multi_video'):
+                    # not a list after all, download it as a single video
+                    if self.submit(url, options, priority):
+                        count = 1
+                    return count
+                for entry in self._iter_entries(result):
+                    if self.find_archived(archive_id(entry), options) is not None:
+                        skipped += 1
+                        continue
+                    # don't let the listing run far ahead of the downloads
+                    while self.queue.queued_count() >= EXPANSION_BACKLOG and not cancelled.is_set():
+                        time.sleep(0.2)
+                    if cancelled.is_set():
+                        break
+                    job = self._submit_entry(ydl, result, entry, options, priority, count + 1)
+                    if job:
+                        count += 1
+            self.log(f"Playlist {result.get('title') or url}: {count} item(s) queued"
+                     + (f", {skipped} already downloaded" if skipped else ""), "success")
+        except Exception as e:
+            self.log(f"Playlist expansion failed ({url}): {str(e)}", "error")
+        finally:
+            with self._expanding_lock:
+                self._expansions.discard(cancelled)
+        return count
+
+    def _iter_entries(self, result):
+        """Entries of a flat playlist result, fetched page by page where the site pages them"""
+        entries = result.get('entries') or []
+        if hasattr(entries, 'getslice'):  # yt-dlp PagedList
+            start = 0
+            while True:
+                page = entries.getslice(start, start + EXPANSION_PAGE_SIZE)
+                if not page:
+                    return
+                for entry in page:
+                    yield from self._flatten(entry)
+                start += len(page)
+        else:
+            for entry in entries:
+                yield from self._flatten(entry)
+
+    def _flatten(self, entry):
+        if not entry:
+            return
+        if entry.get('_type') == 'playlist':
+            yield from self._iter_entries(entry)
+        else:
+            yield entry
+
+    def _submit_entry(self, ydl, playlist, entry, options, priority, index):
+        if entry.get('_type') in ('url', 'url_transparent') or not entry.get('formats') and not entry.get('url'):
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if not entry_url:
+                return None
+            return self.submit(entry_url, options, priority)
+        # the extractor already resolved this entry, download it from the info we have
+        for key in ('extractor', 'extractor_key', 'webpage_url', 'webpage_url_basename', 'webpage_url_domain'):
+            if playlist.get(key) is not None:
+                entry.setdefault(key, playlist[key])
+        entry.setdefault('playlist', playlist.get('title'))
+        entry.setdefault('playlist_index', index)
+        entry_url = entry.get('webpage_url') or playlist.get('webpage_url') or playlist.get('original_url')
+        job = DownloadJob(entry_url, self.share_options(dict(options, playlist=False)), priority)
+        info = ydl.sanitize_info(entry)
+        job.describe(info)
+        job.archive_key = archive_id(info)
+        self.spill.put(job.key, info)
+        job.spilled = True
+        return self._enqueue(job)
+
+    def is_busy(self):
+        """Jobs queued/running/being verified or playlists still being listed"""
+        with self._expanding_lock:
+            if self._expansions:
+                return True
+        with self._verify_lock:
+            if self._verifying:
+                return True
+        return self.queue.is_busy()
+
+    def resume(self):
+        """Re-queue jobs the journal says were unfinished at last shutdown"""
+        if not self.journal:
+            return []
+        jobs = []
+        for row in self.journal.unfinished():
+            # yt-dlp picks up the .part file left behind (continuedl)
+            jobs.append(self.submit(row['url'], row['options'], row['priority'], key=row['key']))
+        return jobs
+
+    def close(self):
+        """Flush the journal and stop postprocessing, call on exit"""
+        if self.journal:
+            self.journal.close()
+        if self.archive:
+            self.archive.close()
+            self.archive = None
+        self.metrics.close()
+        self.sessions.close()
+        self.spill.close()
+        # unfinished conversions start over next time, don't hold up exit for them
+        self.processor.shutdown(wait=False, cancel_futures=True)
+        self.verifier.shutdown(wait=False, cancel_futures=True)
+        for job in list(self.queue.jobs.values()):
+            if job.state == 'processing' and job.worker is not None:
+                kill_child_processes(job.worker.ident)
+
+    def _job_updated(self, job):
+        if self.journal:
+            self.journal.record(job)
+        if job.state in FINISHED_STATES:
+            self._release_key(job)
+            self.metrics.job_finished(job)
+            job.fragment_controller = None
+            if job.spilled:
+                self.spill.drop(job.key)  # cancelled before it ran
+        if job.state == 'queued' and job.retry_delay:
+            self.log(f"Retrying #{job.id} in {job.retry_delay:.0f}s, other sites continue meanwhile", "secondary")
+        if self.on_update:
+            self.on_update(job)
+
+    def set_max_workers(self, count):
+        self.queue.set_max_workers(count)
+        if self.reuse_sessions:
+            self.sessions.max_idle = max(1, count) + EXPRESS_WORKERS
+
+    def set_host_limit(self, count):
+        self.queue.set_host_limit(count)
+
+    def set_rate_limit(self, rate):
+        """Change the total download rate (bytes/s, None = unlimited), applies to running jobs too"""
+        self.bandwidth.set_rate(rate)
+
+    def set_connection_budget(self, count):
+        """Change how many fragments may be fetched at once over all jobs"""
+        self.connections.set_total(count)
+
+    def cancel(self, job_id):
+        """Cancel one job: aborts its transfer and kills its ffmpeg"""
+        job = self.queue.jobs.get(job_id)
+        if job is None or not self.queue.cancel(job_id):
+            return False
+        if job.worker is not None:
+            kill_child_processes(job.worker.ident)
+        return True
+
+    def cancel_all(self):
+        """Cancel every queued and running job, and stop listing playlists"""
+        with self._expanding_lock:
+            for event in self._expansions:
+                event.set()
+        cancelled = self.queue.cancel_all()
+        for job in cancelled:
+            if job.worker is not None:
+                kill_child_processes(job.worker.ident)
+        return cancelled
+
+    def find_archived(self, key, options):
+        """Output path ('' if unknown) when key was downloaded with these options and
+        the file is still there, else None"""
+        archive = self.archive
+        if archive is None or key is None:
+            return None
+        found, path = archive.find(key[0], key[1], options)
+        if not found or (path and not os.path.exists(path)):
+            return None
+        return path or ''
+
+    def skip_archived(self, job, key):
+        """Finish job without downloading if the archive has it"""
+        path = self.find_archived(key, job.options)
+        if path is None:
+            return False
+        job.file_path = path or None
+        self.log(f"Already downloaded, skipping: {job.url}", "secondary")
+        return True
+
+    def check_cancelled(self, job):
+        """Abort the job's yt-dlp call if it was cancelled"""
+        if job.cancelled:
+            raise load_yt_dlp().utils.DownloadCancelled(f"Job #{job.id} cancelled")
+
+    def remove_partial_files(self, job):
+        """Delete .part/fragment/intermediate files a cancelled job left behind"""
+        removed = 0
+        for path in list(job.temp_files or ()):
+            base = path[:-len('.part')] if path.endswith('.part') else path
+            # title.f137.mp4 -> title, for ffmpeg's title.temp.mp4
+            stem = re.sub(r'\.f[\w-]+$', '', os.path.splitext(base)[0])
+            candidates = {base, base + '.part', base + '.ytdl'}
+            candidates.update(glob.glob(glob.escape(base) + '.part-Frag*'))
+            candidates.update(glob.glob(glob.escape(base) + '-Frag*'))
+            candidates.update(glob.glob(glob.escape(stem) + '.temp.*'))
+            for candidate in candidates:
+                try:
+                    os.remove(candidate)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def wait(self, poll=0.2):
+        """Block until the queue is idle"""
+        while self.is_busy():
+            time.sleep(poll)
+
+    def progress_hook(self, job, d):
+        """Progress hook (worker thread, keep it cheap)"""
+        if job.cancelled:
+            # raising here is how yt-dlp lets us abort a transfer
+            self.check_cancelled(job)
+        if d['status'] in ('downloading', 'finished'):
+            self.progress.update(job.id, d)
+            job.downloaded_bytes = d.get('downloaded_bytes') or 0
+            tmp = d.get('tmpfilename') or d.get('filename')
+            if tmp and (job.temp_files is None or tmp not in job.temp_files):
+                job.add_temp_file(tmp)
+            # keyed by final name: the 'finished' call has no tmpfilename
+            name = d.get('filename') or tmp
+            downloaded = d.get('downloaded_bytes') or 0
+            previous = job.file_bytes.get(name, 0)
+            if downloaded > previous:
+                if job.first_byte is None and job.started_at:
+                    job.first_byte = time.time() - job.started_at
+                job.file_bytes[name] = downloaded
+                if self.bandwidth.rate and d['status'] == 'downloading':
+                    # pay for the new bytes, blocks while the job is over its share
+                    self.bandwidth.consume(job.key, weight_for(job.priority), downloaded - previous,
+                                           lambda: job.cancelled)
+            speed = d.get('speed')
+            if speed and (job.peak_speed is None or speed > job.peak_speed):
+                job.peak_speed = speed
+
+    def postprocessor_hook(self, job, d):
+        """Postprocessor hook: abort if cancelled, follow the file through each step"""
+        self.check_cancelled(job)
+        if d['status'] == 'finished':
+            job.file_path = d.get('info_dict', {}).get('filepath') or job.file_path
+
+    def apply_progress(self):
+        """Copy coalesced progress samples onto their jobs, returns updated jobs"""
+        updated = []
+        for job_id, (status, downloaded, total, speed, eta) in self.progress.drain().items():
+            job = self.queue.jobs.get(job_id)
+            if job is None:
+                continue
+            job.downloaded_bytes = downloaded
+            job.total_bytes = total
+            job.speed = speed
+            job.eta = eta
+            if status == 'finished':
+                job.progress = 1.0
+            elif total:
+                job.progress = min(downloaded / total, 1.0)
+            updated.append(job)
+        return updated
+
+    def build_ydl_opts(self, job):
+        """yt-dlp options for a job (postprocessors are added once the plan is known)"""
+        job.fragment_controller = FragmentController(self.connections, self.fragment_workers)
+        download_type = job.options['download_type']
+        quality = job.options['quality']
+        ydl_opts = {
+            'format': get_format_selector(download_type, quality),
+            'format_sort': format_sort_for(job.options),
+            'outtmpl': os.path.join(job.options['download_path'], self.title_template + '.%(ext)s'),
+            'quiet': self.quiet,
+            'noprogress': self.quiet,
+            'noplaylist': True,
+            'continuedl': True,
+            'progress_hooks': [lambda d: self.progress_hook(job, d)],
+            'postprocessor_hooks': [lambda d: self.postprocessor_hook(job, d)],
+            'post_hooks': [lambda path: setattr(job, 'file_path', path)],
+            # segmented streams: yt-dlp gets the max, the controller decides how many run
+            'concurrent_fragment_downloads': self.fragment_workers,
+            CONTROLLER_PARAM: job.fragment_controller,
+        }
+        if self.http_chunk_size:
+            ydl_opts['http_chunk_size'] = self.http_chunk_size
+        if has_clip(job.options):
+            # ffmpeg fetches just the clips; file names get the clip times so they don't collide
+            ydl_opts['download_ranges'] = range_function(job.options)
+            ydl_opts['force_keyframes_at_cuts'] = bool(job.options.get('exact_cuts'))
+            ydl_opts['outtmpl'] = os.path.join(job.options['download_path'], self.title_template + CLIP_TEMPLATE)
+        if self.ffmpeg_path and self.ffprobe_path:
+            ydl_opts['ffmpeg_location'] = self.ffmpeg_path
+            ydl_opts['ffprobe_location'] = self.ffprobe_path
+        return ydl_opts
+
+    def apply_plan(self, ydl, plan):
+        """Install the postprocessors a plan calls for on a job's YoutubeDL"""
+        get_postprocessor = load_yt_dlp().postprocessor.get_postprocessor
+        if plan['merge_output_format']:
+            ydl.params['merge_output_format'] = plan['merge_output_format']
+        for pp_def in plan['postprocessors']:
+            pp_args = dict(pp_def)
+            pp_class = get_postprocessor(pp_args.pop('key'))
+            ydl.add_post_processor(pp_class(ydl, **pp_args), when='post_process')
+
+    def expected_bandwidth(self, host):
+        """Bytes/s a new download from host will likely get (None if there's nothing to go on)
+
+        Measured on recent jobs, capped by its share of the speed limit.
+        """
+        speed = self.metrics.throughput(host)
+        rate = self.bandwidth.rate
+        if rate:
+            share = rate / (self.bandwidth.active_count() + 1)
+            speed = min(speed, share) if speed else share
+        return speed
+
+    def use_budget(self, job, ydl, info):
+        """Swap in the budget selector if the job has a budget, returns it (or None)"""
+        if not has_budget(job.options):
+            return None
+        selector = BudgetSelector(job.options, ydl.params, self.expected_bandwidth(job.host))
+        selector.duration = info.get('duration')
+        selector.share = clip_share(info, job.options)
+        merger = load_yt_dlp().postprocessor.FFmpegMergerPP(ydl)
+        selector.can_merge = merger.available and merger.can_merge()
+        if job.options.get('time_budget') and not selector.bandwidth:
+            self.log("No bandwidth measured yet, the time budget is not applied", "warning")
+        ydl.format_selector = selector
+        return selector
+
+    def describe_selection(self, info, selector=None, options=None):
+        """(estimated bytes, one line about the chosen formats) for a processed info dict
+
+        With options of a clip job the size is the clips' share of the file.
+        """
+        formats = selected_formats(info)
+        size = estimate_bytes(formats, info.get('duration'))
+        codecs = '+'.join(c for c in (codec_name(f.get('vcodec')) or codec_name(f.get('acodec'))
+                                      for f in formats) if c)
+        text = f"{info.get('resolution') or info.get('format_id', '?')} {codecs}".strip()
+        if options and has_clip(options):
+            if size:
+                size = int(size * clip_share(info, options))
+            seconds = clip_seconds(info, options)
+            if seconds is not None:
+                text += f", {format_eta(seconds)} of {format_eta(info.get('duration'))}"
+        text += f", ~{format_bytes(size)}" if size else ", size unknown"
+        choice = selector and selector.choice
+        if choice and choice['limit']:
+            if choice['fits'] is False:
+                text += f" (nothing fits {format_bytes(choice['limit'])}, took the smallest)"
+            elif choice['fits'] is None:
+                text += f" (sizes unknown, budget {format_bytes(choice['limit'])} not checked)"
+            else:
+                text += f" (budget {format_bytes(choice['limit'])})"
+        return size, text
+
+    def estimate(self, info, options):
+        """(estimated bytes, description) of what downloading info with options would fetch"""
+        job = DownloadJob(info.get('webpage_url') or info.get('url') or '', options)
+        ydl_opts = dict(self.build_ydl_opts(job), quiet=True, no_warnings=True)
+        load_yt_dlp()
+        with self.sessions.session(ydl_opts) as ydl:
+            selector = self.use_budget(job, ydl, info)
+            processed = ydl.process_ie_result(copy.deepcopy(info), download=False)
+        return self.describe_selection(processed, selector, options)
+
+    def extract(self, ydl, url):
+        """Info dict for url, extracted at most once per cache TTL"""
+        info = self.info_cache.get(url)
+        if info is None:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+            # formats picked with the default selector, each job makes its own pick
+            info.pop('requested_formats', None)
+            self.info_cache.put(url, info)
+        return info
+
+    def get_info(self, url):
+        """Metadata only, no download"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+        }
+        load_yt_dlp()
+        with self.sessions.session(ydl_opts) as ydl:
+            return self.extract(ydl, url)
+
+    def lookup(self, urls, options=None, on_result=None, workers=LOOKUP_WORKERS):
+        """Metadata (and, with options, the estimated size) of many URLs on `workers` threads
+
+        Returns the started BulkLookup; on_result(row) is called from its threads.
+        """
+        return BulkLookup(self, urls, options, on_result, workers).start()
+
+    def run_job(self, job):
+        """Extract and fetch a job (runs on a queue worker)
+
+        Merging/converting is handed to the postprocessing pool so this worker
+        can start on the next download; returns None when that happened.
+        """
+        video_url = job.url
+        download_type = job.options['download_type']
+        download_path = job.options['download_path']
+        ydl = None
+        failed = False
+        job.started_at, job.first_byte = time.time(), None
+        try:
+            # Create download folder if doesn't exist
+            os.makedirs(download_path, exist_ok=True)
+
+            yt_dlp = load_yt_dlp()
+            # archived ids known from the URL are skipped before any request
+            key = job.archive_key or archive_id_from_url(video_url)
+            if self.skip_archived(job, key):
+                return True
+
+            ydl = self.sessions.acquire(self.build_ydl_opts(job))
+            # get video info, once
+            job.enter_stage('extract')
+            info = None
+            if job.spilled:
+                info, job.spilled = self.spill.take(job.key), False
+            if info is None:
+                info = self.info_cache.get(video_url)
+                if info is None:
+                    self.log("Extracting video information...", "accent")
+                    with self.extract_slots:
+                        info = self.extract(ydl, video_url)
+                else:
+                    self.log("Using cached video information", "accent")
+            if archive_id(info) != key and self.skip_archived(job, archive_id(info)):
+                return True
+            job.describe(info)
+            title = info.get('title', 'Unknown')
+            duration = info.get('duration_string', 'Unknown')
+            uploader = info.get('uploader', 'Unknown')
+
+            self.log(f"Title: {title}", "purple")
+            self.log(f"Duration: {duration} | Uploader: {uploader}", "secondary")
+
+            if download_type == "audio":
+                self.log("Starting audio download...", "accent")
+            else:
+                self.log("Starting video download...", "accent")
+            self.check_cancelled(job)
+
+            # pick formats first (no network), then decide copy vs transcode
+            selector = self.use_budget(job, ydl, info)
+            info = ydl.process_ie_result(info, download=False)
+            job.estimated_bytes, selection = self.describe_selection(info, selector, job.options)
+            job.describe(info)
+            self.log(f"Format: {selection}", "secondary")
+            if has_clip(job.options):
+                cuts = "exact cuts (re-encoded)" if job.options.get('exact_cuts') else "cut at keyframes"
+                self.log(f"Clips: {describe_clips(job.options)}, {cuts}", "secondary")
+            self._job_updated(job)
+            plan = plan_postprocessing(info, job.options)
+            job.pp_path = plan['path']
+            if self.verify:
+                job.expected = expectations(info, job.options)
+            self.log(f"Postprocessing: {plan['description']}", "secondary")
+            self.apply_plan(ydl, plan)
+
+            # yt-dlp calls post_process right after the transfer, take it off this thread
+            deferred = []
+            run_postprocessors = ydl.post_process
+
+            def post_process(filename, pp_info, files_to_move=None):
+                if not pp_info.get('__postprocessors') and not plan['postprocessors']:
+                    return run_postprocessors(filename, pp_info, files_to_move)
+                # copy: yt-dlp strips fields shared with the parent info once this returns;
+                # it may wait a while for a converter, without what postprocessing never reads
+                deferred.append((filename, prune_info(pp_info), dict(files_to_move or {})))
+                pp_info['filepath'] = filename
+                return pp_info
+            ydl.post_process = post_process
+
+            # download from the info we already have instead of extracting again
+            job.enter_stage('fetch')
+            try:
+                info = ydl.process_ie_result(info, download=True)
+            except yt_dlp.utils.DownloadError as e:
+                if 'HTTP Error 403' in str(e) or 'HTTP Error 410' in str(e):
+                    # stale format URLs, next attempt must extract fresh
+                    self.info_cache.drop(video_url)
+                raise
+
+            if deferred:
+                job.enter_stage('process_queue')
+                if not self.queue.hand_off(job):
+                    self.check_cancelled(job)
+                    return False
+                self.processor.submit(self.process_job, job, ydl, run_postprocessors, deferred)
+                ydl = None  # the postprocessing stage releases it
+                return None
+            return self.finalize_job(job, info)
+
+        except Exception as e:
+            failed = True
+            return self.job_failed(job, e)
+        finally:
+            if ydl is not None:
+                self.sessions.release(ydl, reusable=not failed)
+                job.enter_stage(None)
+            self.bandwidth.forget(job.key)
+            forget_child_processes(threading.get_ident())
+
+    def process_job(self, job, ydl, run_postprocessors, deferred):
+        """Merge/convert a fetched job (runs on the postprocessing pool)
+
+        deferred holds a (filename, info, files to move) per file yt-dlp fetched.
+        """
+        job.worker = threading.current_thread()
+        ok = False
+        try:
+            job.enter_stage('process')
+            for filename, info, files_to_move in deferred:
+                self.check_cancelled(job)
+                self.log(f"Processing: {info.get('title', job.url)}", "secondary")
+                info = run_postprocessors(filename, info, files_to_move)
+                job.file_path = info.get('filepath') or job.file_path
+            ok = self.finalize_job(job, info)
+        except Exception as e:
+            ok = self.job_failed(job, e)
+        finally:
+            self.sessions.release(ydl, reusable=ok is True)
+            job.enter_stage(None)
+            forget_child_processes(threading.get_ident())
+        self.queue.finish(job, ok)
+
+    def finalize_job(self, job, info):
+        """Record where the file ended up"""
+        job.enter_stage('finalize')
+        if not job.file_path:
+            downloads = info.get('requested_downloads') or [info]
+            job.file_path = downloads[-1].get('filepath')
+
+        key = archive_id(info)
+        archive = self.archive
+        if archive and key:
+            try:
+                archive.add(key[0], key[1], job.options, job.file_path)
+            except sqlite3.Error as e:
+                self.log(f"Could not update download archive: {e}", "warning")
+
+        if job.options['download_type'] == "audio":
+            self.log("Audio download completed successfully!", "success")
+        else:
+            self.log("Video download completed successfully!", "success")
+        if self.verify and job.file_path and job.expected:
+            with self._verify_lock:
+                self._verifying += 1
+            self.verifier.submit(self.verify_job, job)
+        return True
+
+    def verify_job(self, job):
+        """Check a finished file with ffprobe (runs on the verify pool)"""
+        try:
+            ffprobe = find_ffprobe(self.ffprobe_path)
+            if ffprobe is None:
+                if not self._no_ffprobe_logged:
+                    self._no_ffprobe_logged = True
+                    self.log("ffprobe not found, files are not verified", "warning")
+                return
+            problems = verify_file(job.file_path, job.expected, ffprobe)
+            job.verified = not problems
+            if problems:
+                job.verify_error = '; '.join(problems)
+                self.log(f"Verification failed for {os.path.basename(job.file_path)}: {job.verify_error}", "warning")
+            else:
+                self.log(f"Verified {os.path.basename(job.file_path)}", "secondary")
+        finally:
+            job.expected = None
+            with self._verify_lock:
+                self._verifying -= 1
+
+    def job_failed(self, job, error):
+        """Log a failed or cancelled job, clean up after a cancel"""
+        if job.cancelled:
+            self.log(f"Download cancelled ({job.url})", "warning")
+            if self.partial_policy == 'delete':
+                self.remove_partial_files(job)
+            return False
+        job.error = str(error)
+        if any(text in job.error for text in THROTTLE_ERRORS) and job.attempts < THROTTLE_RETRIES:
+            job.throttled = True
+            self.log(f"Throttled by {job.host} ({job.url}): {job.error}", "warning")
+            return False
+        self.log(f"Download failed ({job.url}): {str(error)}", "error")
+        return False
@@ -0,0 +1,182 @@
+"""Format selection under a size / download-time budget and a codec preference
+
+yt-dlp's selector strings can filter on a field but can't pick "the best
+combination that fits". For jobs with a budget yt-dlp gets a selector
+function instead: it walks the (already sorted) formats list once, estimates
+the size of every video+audio combination from filesize, filesize_approx or
+bitrate x duration and takes the best one that fits.
+"""
+from postproc import codec_name
+
+MB = 1024 ** 2
+
+# UI labels -> values stored in the job options
+SIZE_BUDGETS = {'No limit': None, '25 MB': 25 * MB, '50 MB': 50 * MB, '100 MB': 100 * MB,
+                '250 MB': 250 * MB, '500 MB': 500 * MB, '1 GB': 1024 * MB}
+TIME_BUDGETS = {'No limit': None, '30 sec': 30, '1 min': 60, '5 min': 300, '15 min': 900}
+# codecs to stay away from, e.g. AV1 is slow to decode on older hardware
+CODEC_PREFERENCES = {'Any codec': [], 'Avoid AV1': ['av01'], 'Avoid AV1/VP9': ['av01', 'vp9', 'vp09']}
+
+VIDEO_HEIGHTS = {'1080p': 1080, '720p': 720, '480p': 480, '360p': 360}
+AUDIO_BITRATES = {'320k': 320, '256k': 256, '192k': 192, '128k': 128, '96k': 96}
+
+
+def parse_size(text):
+    """'500M', '1.5G', '800K', '1000000' -> bytes (None for '0'/'none')"""
+    text = text.strip().upper().rstrip('B')
+    if text in ('', '0', 'NONE'):
+        return None
+    multiplier = {'K': 1024, 'M': MB, 'G': 1024 * MB}.get(text[-1], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    size = float(text) * multiplier
+    return int(size) if size > 0 else None
+
+
+def has_budget(options):
+    return bool(options.get('size_budget') or options.get('time_budget') or options.get('avoid_codecs'))
+
+
+def estimate_size(fmt, duration=None):
+    """Bytes for one format: exact size, yt-dlp's estimate, or bitrate x duration (None if unknown)"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if size:
+        return int(size)
+    kbps = fmt.get('tbr') or (fmt.get('vbr') or 0) + (fmt.get('abr') or 0)
+    if kbps and duration:
+        return int(kbps * 1000 / 8 * duration)
+    return None
+
+
+def estimate_bytes(formats, duration=None):
+    """Total bytes for formats downloaded together (None if any is unknown)"""
+    sizes = [estimate_size(fmt, duration) for fmt in formats]
+    if not sizes or None in sizes:
+        return None
+    return sum(sizes)
+
+
+def scaled(size, share):
+    return int(size * share) if size is not None else None
+
+
+def candidates(formats, options, can_merge=True):
+    """Combinations that match the job's type and quality: [(rank, formats tuple)]
+
+    formats is yt-dlp's sorted list (worst first) so the index is the rank.
+    """
+    ranked = list(enumerate(formats))
+    if options['download_type'] == 'audio':
+        cap = AUDIO_BITRATES.get(options['quality'])
+        audio = [(rank, f) for rank, f in ranked if f.get('acodec') != 'none'
+                 and (cap is None or not f.get('abr') or f['abr'] <= cap)]
+        only_audio = [(rank, (f,)) for rank, f in audio if f.get('vcodec') == 'none']
+        return only_audio or [(rank, (f,)) for rank, f in audio]
+
+    cap = VIDEO_HEIGHTS.get(options['quality'])
+    video = [(rank, f) for rank, f in ranked if f.get('vcodec') != 'none'
+             and (cap is None or not f.get('height') or f['height'] <= cap)]
+    audio_only = [(rank, f) for rank, f in ranked if f.get('acodec') != 'none' and f.get('vcodec') == 'none']
+    found = [((rank, rank), (f,)) for rank, f in video if f.get('acodec') != 'none']
+    if can_merge:
+        found += [((v_rank, a_rank), (v, a)) for v_rank, v in video if v.get('acodec') == 'none'
+                  for a_rank, a in audio_only]
+    return found or [((rank, rank), (f,)) for rank, f in video]
+
+
+def avoids(combo, codecs):
+    return any(codec_name(f.get('vcodec')) in codecs for f in combo)
+
+
+def choose(formats, options, duration=None, can_merge=True, bandwidth=None, share=1.0):
+    """Pick formats for a job's budget, returns a choice dict or None if nothing matches
+
+    share is the part of the video downloaded (clips, see sections.py), sizes are scaled by it.
+
+    {'formats', 'bytes' (estimate or None), 'limit' (bytes or None),
+     'fits' (False: nothing fit, this is the smallest; None: sizes unknown)}
+    """
+    found = candidates(formats, options, can_merge)
+    if not found:
+        return None
+    avoid = set(options.get('avoid_codecs') or [])
+    found = [item for item in found if not avoids(item[1], avoid)] or found
+
+    limit = options.get('size_budget')
+    if options.get('time_budget') and bandwidth:
+        by_time = int(options['time_budget'] * bandwidth)
+        limit = min(limit, by_time) if limit else by_time
+
+    pick = min if options['quality'] == 'Worst' else max
+    sized = [(rank, combo, scaled(estimate_bytes(combo, duration), share)) for rank, combo in found]
+    known = [item for item in sized if item[2] is not None]
+    fitting = [item for item in known if limit and item[2] <= limit]
+    if not limit:
+        fits = True
+    elif fitting:
+        sized, fits = fitting, True
+    elif known:
+        # nothing fits: the smallest one
+        rank, combo, size = min(known, key=lambda item: item[2])
+        return {'formats': combo, 'bytes': size, 'limit': limit, 'fits': False}
+    else:
+        fits = None
+    rank, combo, size = pick(sized, key=lambda item: item[0])
+    return {'formats': combo, 'bytes': size, 'limit': limit, 'fits': fits}
+
+
+def merged_format(video, audio, merge_output_format=None):
+    """One format dict for a video+audio pair, like yt-dlp builds for 'bv+ba'"""
+    from yt_dlp.utils import determine_protocol, get_compatible_ext
+    ext = get_compatible_ext(vcodecs=[video.get('vcodec')], acodecs=[audio.get('acodec')],
+                             vexts=[video['ext']], aexts=[audio['ext']],
+                             preferences=merge_output_format.split('/') if merge_output_format else None)
+    sizes = [size for size in (f.get('filesize') or f.get('filesize_approx') for f in (video, audio)) if size]
+    return {
+        'requested_formats': [video, audio],
+        'format': f"{video.get('format')}+{audio.get('format')}",
+        'format_id': f"{video['format_id']}+{audio['format_id']}",
+        'ext': ext,
+        'protocol': f"{determine_protocol(video)}+{determine_protocol(audio)}",
+        'filesize_approx': sum(sizes) or None,
+        'tbr': (video.get('tbr') or 0) + (audio.get('tbr') or 0) or None,
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'resolution': video.get('resolution'),
+        'fps': video.get('fps'),
+        'dynamic_range': video.get('dynamic_range'),
+        'vcodec': video.get('vcodec'),
+        'vbr': video.get('vbr'),
+        'acodec': audio.get('acodec'),
+        'abr': audio.get('abr'),
+        'asr': audio.get('asr'),
+        'audio_channels': audio.get('audio_channels'),
+    }
+
+
+class BudgetSelector:
+    """yt-dlp `format` callable that picks with choose()
+
+    duration (from the info dict), share (of it downloaded) and can_merge are
+    set by the engine before formats are selected; the last choice is kept for
+    logging.
+    """
+    def __init__(self, options, params, bandwidth=None):
+        self.options = options
+        self.params = params  # the YoutubeDL's params, merge_output_format changes once planned
+        self.bandwidth = bandwidth
+        self.duration = None
+        self.share = 1.0
+        self.can_merge = True
+        self.choice = None
+
+    def __call__(self, ctx):
+        self.choice = choose(ctx['formats'], self.options, self.duration, self.can_merge, self.bandwidth,
+                             self.share)
+        if self.choice is None:
+            return
+        combo = self.choice['formats']
+        if len(combo) == 1:
+            yield combo[0]
+        else:
+            yield merged_format(combo[0], combo[1], self.params.get('merge_output_format'))
@@ -0,0 +1,134 @@
+"""Adaptive fragment concurrency for segmented (HLS/DASH) downloads
+
+yt-dlp fetches fragments on a pool of concurrent_fragment_downloads threads.
+We give it the per-job maximum and gate each fragment through the job's
+FragmentController, which moves the number actually in flight up or down
+with the measured throughput and errors. All jobs share one ConnectionBudget.
+"""
+import os
+import threading
+import time
+
+# ydl param carrying the job's controller to the patched fragment downloader
+CONTROLLER_PARAM = 'fragment_controller'
+
+FRAGMENT_WORKERS = 8      # max fragments in flight per job
+CONNECTION_BUDGET = 16    # max fragments in flight over all jobs
+START_WORKERS = 2
+
+# a window is this many fragments (at least), throughput is compared window to window
+MIN_WINDOW = 4
+GAIN = 1.1  # more workers must buy 10% more throughput to stay
+
+
+class ConnectionBudget:
+    """Counting semaphore whose size can change at runtime"""
+    def __init__(self, total=CONNECTION_BUDGET):
+        self.total = max(1, total)
+        self._used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._used >= self.total:
+                self._cond.wait()
+            self._used += 1
+
+    def release(self):
+        with self._cond:
+            self._used -= 1
+            self._cond.notify()
+
+    def set_total(self, total):
+        with self._cond:
+            self.total = max(1, total)
+            self._cond.notify_all()
+
+
+class FragmentController:
+    """Per-job fragment worker limit, tuned by hill climbing on throughput
+
+    Errors (throttling, resets) halve the limit; otherwise the limit grows by
+    one as long as the last step up paid off and steps back when it didn't.
+    """
+    def __init__(self, budget, max_workers=FRAGMENT_WORKERS, start=START_WORKERS):
+        self.budget = budget
+        self.max_workers = max(1, max_workers)
+        self.limit = max(1, min(start, self.max_workers))
+        self._active = 0
+        self.errors = 0  # failed fetches, for metrics
+        self._cond = threading.Condition()
+        self._window_start = None
+        self._window_bytes = 0
+        self._window_count = 0
+        self._window_errors = 0
+        self._last_rate = None
+        self._last_limit = None
+
+    def acquire(self):
+        """Wait for a slot of this job, then for a global connection"""
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+            if self._window_start is None:
+                self._window_start = time.monotonic()
+        self.budget.acquire()
+
+    def release(self, nbytes, error=False):
+        """Fragment finished (nbytes fetched) or failed"""
+        self.budget.release()
+        with self._cond:
+            self._active -= 1
+            self._record(nbytes, error)
+            self._cond.notify_all()
+
+    def _record(self, nbytes, error):
+        # caller holds the lock
+        now = time.monotonic()
+        self._window_bytes += nbytes
+        self._window_count += 1
+        self._window_errors += bool(error)
+        self.errors += bool(error)
+        if self._window_count < max(MIN_WINDOW, 2 * self.limit):
+            return
+        rate = self._window_bytes / max(now - self._window_start, 1e-6)
+        limit = self.limit
+        if self._window_errors:
+            new_limit = max(1, limit // 2)
+        elif self._last_rate is None or rate > self._last_rate * GAIN:
+            new_limit = limit + 1
+        elif self._last_limit is not None and self._last_limit < limit:
+            new_limit = limit - 1  # the last step up didn't help
+        else:
+            new_limit = limit
+        self._last_rate, self._last_limit = rate, limit
+        self.limit = max(1, min(new_limit, self.max_workers, self.budget.total))
+        self._window_start = now
+        self._window_bytes = self._window_count = self._window_errors = 0
+
+
+def install(yt_dlp):
+    """Route yt-dlp's fragment fetches through the job's FragmentController"""
+    fragment_fd = yt_dlp.downloader.fragment.FragmentFD
+    original = fragment_fd._download_fragment
+
+    def _download_fragment(self, ctx, frag_url, info_dict, headers=None, request_data=None):
+        controller = self.params.get(CONTROLLER_PARAM)
+        if controller is None:
+            return original(self, ctx, frag_url, info_dict, headers, request_data)
+        controller.acquire()
+        nbytes, error = 0, True
+        try:
+            ok = original(self, ctx, frag_url, info_dict, headers, request_data)
+            if ok:
+                error = False
+                try:
+                    nbytes = os.path.getsize(ctx['fragment_filename_sanitized'])
+                except (KeyError, OSError):
+                    pass
+            return ok
+        finally:
+            controller.release(nbytes, error)
+
+    fragment_fd._download_fragment = _download_fragment
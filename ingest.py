@@ -0,0 +1,167 @@
+"""URL ingestion: clean up pasted URLs, normalize them per site and drop duplicates
+
+Runs before anything is queued or looked up and never touches the network:
+`youtu.be/X`, `youtube.com/watch?v=X&t=30` and `...&utm_source=...` all become
+one URL, and with an identify function (engine.archive_id_from_url) URLs the
+extractors know are compared by (extractor, video id). A `watch?v=X&list=Y` URL
+is video X unless whole playlists are wanted, then it is list Y.
+"""
+import re
+from functools import lru_cache
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+# query parameters that only say where a link was shared from
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'msclkid', 'yclid', 'twclid', 'ttclid', 'mc_cid', 'mc_eid',
+    'igshid', 'igsh', 'si', 'feature', 'ref_src', 'ref_url', '_hsenc', '_hsmi', 'mkt_tok', 'spm',
+    'share_source', 'share_medium', 'utm_id',
+})
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# which playlist a /watch URL was opened from, not which video it is
+LIST_PARAMS = ('list', 'index')
+
+_SCHEME = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*://')
+_BARE_HOST = re.compile(r'^[\w-]+(\.[\w-]+)+(:\d+)?(/|$)')
+_YOUTUBE_PATH = re.compile(r'^/(?:shorts|live|embed|v|e)/([\w-]{11})(?:[/?]|$)')
+
+
+def _youtube(host, path, params):
+    """watch?v=ID (+ list) for every video URL form, timestamps and share ids dropped"""
+    if host == 'youtu.be':
+        video_id = path.strip('/').split('/')[0]
+        if video_id:
+            return 'www.youtube.com', '/watch', [('v', video_id)] + [(k, v) for k, v in params if k == 'list']
+        return host, path, params
+    match = _YOUTUBE_PATH.match(path)
+    if match:
+        return 'www.youtube.com', '/watch', [('v', match.group(1))]
+    if host == 'youtube.com':
+        host = 'www.youtube.com'
+    if path == '/watch':
+        return host, path, [(k, v) for k, v in params if k in ('v', 'list')]
+    return host, path, [(k, v) for k, v in params if k not in ('pp', 'ab_channel')]
+
+
+def _no_query(host, path, params):
+    """Video pages where the query is only ever share/tracking data"""
+    return host, path, []
+
+
+def _vimeo(host, path, params):
+    # h= is the hash of unlisted videos
+    return host, path, [(k, v) for k, v in params if k == 'h']
+
+
+# host ('www.'/'m.' dropped) -> rule(host, path, params) returning the same three
+SITE_RULES = {
+    'youtube.com': _youtube,
+    'music.youtube.com': _youtube,
+    'youtu.be': _youtube,
+    'twitter.com': _no_query,
+    'x.com': _no_query,
+    'instagram.com': _no_query,
+    'tiktok.com': _no_query,
+    'vimeo.com': _vimeo,
+}
+
+
+def clean_line(text):
+    """URL part of a pasted line ('' for blank lines and # comments)"""
+    text = text.strip().strip('<>"\'').rstrip(',;')
+    if not text or text.startswith('#'):
+        return ''
+    return text
+
+
+@lru_cache(maxsize=4096)
+def normalize_url(url):
+    """Same URL in one spelling: scheme added, host lowercased, fragment and tracking parameters dropped
+
+    Things that aren't web URLs (yt-dlp search prefixes, bare ids) come back unchanged.
+    """
+    url = url.strip()
+    if not _SCHEME.match(url):
+        if not _BARE_HOST.match(url):
+            return url
+        url = 'https://' + url
+    parts = urlparse(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+    host = (parts.hostname or '').lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return url
+    original = parse_qsl(parts.query, keep_blank_values=True)
+    params = [(k, v) for k, v in original if k not in TRACKING_PARAMS and not k.startswith(TRACKING_PREFIXES)]
+    site = host
+    for prefix in ('www.', 'm.', 'mobile.'):
+        if site.startswith(prefix):
+            site = site[len(prefix):]
+            break
+    path = parts.path or '/'
+    rule = SITE_RULES.get(site)
+    if rule:
+        # mobile hosts serve the same pages
+        host, path, params = rule(site if host.startswith(('m.', 'mobile.')) else host, path, params)
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f'{host}:{port}'
+    if parts.username:
+        netloc = parts.netloc.rsplit('@', 1)[0] + '@' + netloc
+    # untouched queries keep their original encoding
+    query = parts.query if params == original else urlencode(params)
+    return parts._replace(scheme=scheme, netloc=netloc, path=path, query=query, fragment='').geturl()
+
+
+def video_url(url):
+    """A normalized YouTube /watch URL without the playlist it was opened from"""
+    parts = urlparse(url)
+    if parts.path != '/watch' or SITE_RULES.get(parts.netloc.replace('www.', '', 1)) is not _youtube:
+        return url
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    if not any(k == 'v' for k, v in params) or not any(k in LIST_PARAMS for k, v in params):
+        return url
+    return parts._replace(query=urlencode([(k, v) for k, v in params if k not in LIST_PARAMS])).geturl()
+
+
+def dedup_key(url, identify=None, playlist=False):
+    """What two URLs share if they're the same video: (extractor, id), else the normalized URL
+
+    With playlist, URLs are keyed by the whole list they name (what gets downloaded then).
+    """
+    return _key(normalize_url(url), identify, playlist)
+
+
+def _key(url, identify, playlist=False):
+    if not playlist:
+        url = video_url(url)
+    identity = identify(url) if identify else None
+    return identity or ('url', url)
+
+
+def unique_urls(lines, identify=None, seen=(), playlist=False):
+    """Normalized URLs from pasted lines, each video (or list, with playlist) once and none whose key is in seen
+
+    Returns (urls, duplicates, already seen) - the last two are counts.
+    """
+    urls = []
+    keys = set(seen)
+    duplicates = known = 0
+    for line in lines:
+        text = clean_line(line)
+        if not text:
+            continue
+        url = normalize_url(text)
+        key = _key(url, identify, playlist)
+        if key in keys:
+            if key in seen:
+                known += 1
+            else:
+                duplicates += 1
+            continue
+        keys.add(key)
+        urls.append(url)
+    return urls, duplicates, known
@@ -0,0 +1,299 @@
+"""Job table for big queues: widgets only for the rows on screen
+
+CTk widgets are canvases and all of them redraw, so one widget row per job
+stops working long before 10,000 jobs. JobView filters and sorts the jobs
+themselves (plain Python, no Tk); JobTable keeps a fixed pool of row widgets
+and, when scrolled or ticked, fills them with whatever jobs are at that
+position, touching a cell only if its text changed.
+"""
+import time
+
+import customtkinter as ctk
+
+from engine import FINISHED_STATES, format_bytes
+
+ROW_HEIGHT = 26
+VISIBLE_ROWS = 12
+RESORT_INTERVAL = 1.0  # seconds between re-sorts on columns that change while downloading
+
+# (column, heading, width in px)
+COLUMNS = (
+    ('id', "#", 60),
+    ('title', "Title / URL", 330),
+    ('state', "Status", 110),
+    ('progress', "Progress", 80),
+    ('speed', "Speed", 100),
+    ('size', "Size", 100),
+)
+DYNAMIC_COLUMNS = ('state', 'progress', 'speed', 'size')
+
+STATE_FILTERS = {
+    'All': None,
+    'Active': ('queued', 'running', 'processing'),
+    'Queued': ('queued',),
+    'Running': ('running', 'processing'),
+    'Done': ('done',),
+    'Failed': ('failed',),
+    'Cancelled': ('cancelled',),
+}
+STATE_ORDER = {'running': 0, 'processing': 1, 'queued': 2, 'failed': 3, 'cancelled': 4, 'done': 5}
+
+
+def job_name(job):
+    return job.title or job.url
+
+
+def job_size(job):
+    return job.total_bytes or job.estimated_bytes
+
+
+SORT_KEYS = {
+    'id': lambda job: job.id,
+    'title': lambda job: job_name(job).lower(),
+    'state': lambda job: (STATE_ORDER.get(job.state, 9), job.id),
+    'progress': lambda job: job.progress,
+    'speed': lambda job: job.speed or 0 if job.state == 'running' else -1,
+    'size': lambda job: job_size(job) or 0,
+}
+
+
+def cells(job):
+    """Text of each column for a job"""
+    state = job.state
+    if state == 'running' and job.stage == 'extract':
+        state = 'extracting'
+    elif state == 'queued' and job.attempts:
+        state = 'retry queued'
+    speed = f"{format_bytes(job.speed)}/s" if job.state == 'running' and job.speed else ""
+    size = job_size(job)
+    return (
+        str(job.id),
+        job_name(job),
+        state,
+        f"{int(job.progress * 100)}%" if job.state != 'queued' else "",
+        speed,
+        ("~" if not job.total_bytes else "") + format_bytes(size) if size else "",
+    )
+
+
+class JobView:
+    """Filtered, sorted list of jobs; works on the job records, never on widgets"""
+    def __init__(self):
+        self.jobs = []
+        self._ids = set()
+        self.rows = []  # jobs shown, in order
+        self.states = None
+        self.text = ''
+        self.sort_column = 'id'
+        self.reverse = False
+        self.dirty = True
+        self._sorted_at = 0.0
+
+    def add(self, jobs):
+        for job in jobs:
+            if job.id not in self._ids:
+                self._ids.add(job.id)
+                self.jobs.append(job)
+                self.dirty = True
+
+    def remove_finished(self):
+        self.jobs = [job for job in self.jobs if job.state not in FINISHED_STATES]
+        self._ids = {job.id for job in self.jobs}
+        self.dirty = True
+
+    def set_filter(self, states=None, text=''):
+        self.states = set(states) if states else None
+        self.text = text.strip().lower()
+        self.dirty = True
+
+    def sort_by(self, column):
+        """Sort by column, the same column again flips the order"""
+        if self.sort_column == column:
+            self.reverse = not self.reverse
+        else:
+            self.sort_column, self.reverse = column, column in DYNAMIC_COLUMNS
+        self.dirty = True
+
+    def refresh(self, now=None):
+        """Recompute rows if anything changed (or, for live columns, every RESORT_INTERVAL), True if it did"""
+        now = time.monotonic() if now is None else now
+        if not self.dirty and (self.sort_column not in DYNAMIC_COLUMNS or now - self._sorted_at < RESORT_INTERVAL):
+            return False
+        rows = self.jobs
+        if self.states is not None:
+            rows = [job for job in rows if job.state in self.states]
+        if self.text:
+            text = self.text
+            rows = [job for job in rows if text in job_name(job).lower() or text in job.url.lower()]
+        if self.sort_column != 'id' or self.reverse:
+            rows = sorted(rows, key=SORT_KEYS[self.sort_column], reverse=self.reverse)
+        elif rows is self.jobs:
+            rows = list(rows)
+        self.rows = rows
+        self.dirty = False
+        self._sorted_at = now
+        return True
+
+
+class JobTable(ctk.CTkFrame):
+    """Header, filter bar and VISIBLE_ROWS recycled rows over a JobView"""
+    def __init__(self, master, colors, rows=VISIBLE_ROWS, on_open=None, **kwargs):
+        super().__init__(master, corner_radius=10, fg_color=colors['frame_bg'], **kwargs)
+        self.colors = colors
+        self.view = JobView()
+        self.first = 0  # index in view.rows of the top row
+        self.on_open = on_open  # on_open(job), double click on a row
+        self._shown = []  # per row: (job id, cell texts) last drawn
+
+        bar = ctk.CTkFrame(self, fg_color="transparent")
+        bar.pack(fill="x", padx=20, pady=(15, 5))
+        ctk.CTkLabel(bar, text="Jobs:", font=("Segoe UI", 12, "bold"),
+                     text_color=colors['secondary']).pack(side="left", padx=(0, 15))
+        self.state_var = ctk.StringVar(value="All")
+        ctk.CTkComboBox(bar, variable=self.state_var, values=list(STATE_FILTERS), width=120,
+                        command=lambda _: self.apply_filter(), fg_color=colors['frame_bg'],
+                        border_color=colors['accent'], button_color=colors['accent'],
+                        button_hover_color=colors['pink'], dropdown_fg_color=colors['frame_bg'],
+                        text_color=colors['fg'], dropdown_text_color=colors['fg'],
+                        dropdown_hover_color=colors['accent']).pack(side="left", padx=(0, 10))
+        self.search_var = ctk.StringVar()
+        search = ctk.CTkEntry(bar, textvariable=self.search_var, placeholder_text="Filter by title or URL",
+                              width=240, fg_color=colors['bg'], border_color=colors['accent'],
+                              text_color=colors['fg'])
+        search.pack(side="left", padx=(0, 10))
+        self._search_after = None
+        search.bind("<KeyRelease>", self._search_changed)
+        self.count_var = ctk.StringVar(value="")
+        ctk.CTkButton(bar, text="Clear Finished", command=self.clear_finished, width=110, height=28,
+                      fg_color=colors['frame_bg'], hover_color=colors['secondary'],
+                      text_color=colors['fg']).pack(side="right")
+        ctk.CTkLabel(bar, textvariable=self.count_var, font=("Segoe UI", 11),
+                     text_color=colors['fg']).pack(side="right", padx=10)
+
+        body = ctk.CTkFrame(self, fg_color="transparent")
+        body.pack(fill="x", padx=20, pady=(0, 15))
+        grid = ctk.CTkFrame(body, fg_color=colors['bg'])
+        grid.pack(side="left", fill="x", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(body, command=self._scrollbar_moved, height=ROW_HEIGHT * (rows + 1))
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.headers = {}
+        for index, (column, heading, width) in enumerate(COLUMNS):
+            grid.columnconfigure(index, minsize=width, weight=1 if column == 'title' else 0)
+            button = ctk.CTkButton(grid, text=heading, width=width, height=ROW_HEIGHT, corner_radius=0,
+                                   fg_color=colors['frame_bg'], hover_color=colors['pink'],
+                                   text_color=colors['secondary'], anchor="w",
+                                   command=lambda c=column: self.sort_by(c))
+            button.grid(row=0, column=index, sticky="ew")
+            self.headers[column] = button
+        self.cells = []  # per row: [label per column]
+        for row in range(rows):
+            labels = []
+            for index, (column, _, width) in enumerate(COLUMNS):
+                label = ctk.CTkLabel(grid, text="", width=width, height=ROW_HEIGHT, anchor="w",
+                                     font=("Segoe UI", 11), text_color=colors['fg'], fg_color=colors['bg'])
+                label.grid(row=row + 1, column=index, sticky="ew", padx=(6, 0))
+                label.bind("<Double-Button-1>", lambda e, r=row: self._double_clicked(r))
+                labels.append(label)
+            self.cells.append(labels)
+            self._shown.append((None, None))
+        for widget in [grid] + [label for labels in self.cells for label in labels]:
+            widget.bind("<MouseWheel>", self._wheel)
+            widget.bind("<Button-4>", lambda e: self.scroll(-3))
+            widget.bind("<Button-5>", lambda e: self.scroll(3))
+        self._show_sort()
+
+    # data side
+    def add(self, jobs):
+        self.view.add(jobs)
+
+    def changed(self):
+        """A job's state changed (filters/sorting may move it)"""
+        self.view.dirty = True
+
+    def clear_finished(self):
+        self.view.remove_finished()
+        self.refresh()
+
+    def apply_filter(self):
+        self._search_after = None
+        self.view.set_filter(STATE_FILTERS.get(self.state_var.get()), self.search_var.get())
+        self.first = 0
+        self.refresh()
+
+    def sort_by(self, column):
+        self.view.sort_by(column)
+        self._show_sort()
+        self.refresh()
+
+    # widgets
+    def refresh(self):
+        """Redraw the visible rows (call on every UI tick, cost doesn't depend on the number of jobs)"""
+        if self.view.refresh():
+            self.count_var.set(f"{len(self.view.rows)} of {len(self.view.jobs)}")
+        rows = self.view.rows
+        count = len(self.cells)
+        self.first = max(0, min(self.first, len(rows) - count))
+        for row, labels in enumerate(self.cells):
+            index = self.first + row
+            job = rows[index] if index < len(rows) else None
+            texts = cells(job) if job else ("",) * len(COLUMNS)
+            shown_id, shown = self._shown[row]
+            job_id = job.id if job else None
+            if shown_id == job_id and shown == texts:
+                continue
+            recolor = shown is None or shown[2] != texts[2]
+            for column, (label, text) in enumerate(zip(labels, texts)):
+                if recolor:
+                    label.configure(text=text, text_color=self._color(job))
+                elif shown[column] != text:
+                    label.configure(text=text)
+            self._shown[row] = (job_id, texts)
+        if rows:
+            self.scrollbar.set(self.first / len(rows), min(1.0, (self.first + count) / len(rows)))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll(self, rows):
+        self.first = max(0, self.first + rows)
+        self.refresh()
+
+    def _color(self, job):
+        if job is None:
+            return self.colors['fg']
+        return {'done': self.colors['success'], 'failed': self.colors['error'],
+                'cancelled': self.colors['secondary'], 'running': self.colors['blue']}.get(job.state, self.colors['fg'])
+
+    def _show_sort(self):
+        for column, heading, _ in COLUMNS:
+            mark = (" ▼" if self.view.reverse else " ▲") if column == self.view.sort_column else ""
+            self.headers[column].configure(text=heading + mark)
+
+    def _job_at(self, row):
+        index = self.first + row
+        return self.view.rows[index] if index < len(self.view.rows) else None
+
+    def _double_clicked(self, row):
+        job = self._job_at(row)
+        if job and self.on_open:
+            self.on_open(job)
+
+    def _wheel(self, event):
+        # Windows: multiples of 120, macOS: small deltas
+        steps = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        self.scroll(steps * 3 if abs(event.delta) >= 120 else steps)
+
+    def _scrollbar_moved(self, action, amount, unit=None):
+        rows = len(self.view.rows)
+        if action == 'moveto':
+            self.first = int(float(amount) * rows)
+        elif action == 'scroll':
+            step = len(self.cells) if unit == 'pages' else 1
+            self.first += int(amount) * step
+        self.refresh()
+
+    def _search_changed(self, event=None):
+        # typing: filter once the keys stop for a moment, not per key over 10,000 jobs
+        if self._search_after:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(150, self.apply_filter)
@@ -0,0 +1,142 @@
+"""Job journal: every job's URL, options and phase in SQLite so a batch survives a crash or restart"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key         TEXT PRIMARY KEY,
+    url         TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    priority    INTEGER NOT NULL,
+    phase       TEXT NOT NULL,
+    bytes_done  INTEGER NOT NULL DEFAULT 0,
+    total_bytes INTEGER,
+    output_path TEXT,
+    error       TEXT,
+    created     REAL NOT NULL,
+    updated     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_phase ON jobs (phase);
+CREATE INDEX IF NOT EXISTS jobs_url ON jobs (url);
+"""
+
+UPSERT = """
+INSERT INTO jobs (key, url, options, priority, phase, bytes_done, total_bytes, output_path, error, created, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    phase = excluded.phase,
+    bytes_done = excluded.bytes_done,
+    total_bytes = excluded.total_bytes,
+    output_path = excluded.output_path,
+    error = excluded.error,
+    updated = excluded.updated
+"""
+
+# phases that get picked up again after a restart
+UNFINISHED_PHASES = ('queued', 'running', 'processing')
+PHASE_PARAMS = ', '.join('?' * len(UNFINISHED_PHASES))
+
+# finished rows older than this are dropped when the journal is opened
+KEEP_DAYS = 30
+
+
+def options_key(options):
+    """Stable text form of a job's options dict"""
+    return json.dumps(options, sort_keys=True)
+
+
+class JobJournal:
+    """SQLite (WAL) journal, written in batches from its own thread"""
+    def __init__(self, path, flush_interval=1.0, active_jobs=None, keep_days=KEEP_DAYS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.active_jobs = active_jobs  # callable -> running jobs, their byte counts get saved every flush
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f"DELETE FROM jobs WHERE phase NOT IN ({PHASE_PARAMS}) AND updated < ?",
+                           UNFINISHED_PHASES + (time.time() - keep_days * 86400,))
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._pending = {}  # key -> job, newest state wins
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def record(self, job):
+        """Mark job as changed; written on the next flush, never blocks"""
+        with self._lock:
+            self._pending[job.key] = job
+
+    def unfinished(self):
+        """Rows of jobs that were queued, running or processing when we last stopped"""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT key, url, options, priority, phase, bytes_done, output_path FROM jobs "
+                f"WHERE phase IN ({PHASE_PARAMS}) ORDER BY priority, created", UNFINISHED_PHASES).fetchall()
+        return [{'key': key, 'url': url, 'options': json.loads(options), 'priority': priority,
+                 'phase': phase, 'bytes_done': bytes_done, 'output_path': output_path}
+                for key, url, options, priority, phase, bytes_done, output_path in rows]
+
+    def find_done(self, url, options):
+        """Output path of the newest completed job for url+options, or None"""
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT output_path FROM jobs WHERE url = ? AND options = ? AND phase = 'done' "
+                "ORDER BY updated DESC LIMIT 1", (url, options_key(options))).fetchone()
+        return row[0] if row else None
+
+    def flush(self):
+        """Write all pending changes in one transaction"""
+        with self._lock:
+            jobs = list(self._pending.values())
+            self._pending.clear()
+        if self.active_jobs:
+            seen = {job.key for job in jobs}
+            jobs += [job for job in self.active_jobs() if job.key not in seen]
+        if not jobs:
+            return
+        now = time.time()
+        rows = [(job.key, job.url, options_key(job.options), job.priority, job.state,
+                 job.downloaded_bytes or 0, job.total_bytes, job.file_path, job.error, job.created, now)
+                for job in jobs]
+        try:
+            with self._db_lock:
+                with self._conn:
+                    self._conn.executemany(UPSERT, rows)
+        except sqlite3.Error:
+            # keep them for the next round
+            with self._lock:
+                for job in jobs:
+                    self._pending.setdefault(job.key, job)
+            raise
+
+    def close(self):
+        """Flush and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # try again next round
@@ -0,0 +1,167 @@
+"""Bulk metadata lookup: title, duration, heights and estimated size for many URLs at once
+
+URLs are looked up on a bounded pool so a list of hundreds takes about
+len(urls) / workers lookups' time; each result is handed to a callback as
+soon as it's in (any order) and can be streamed to a CSV / JSON file. The
+info lands in the engine's info cache, so downloading afterwards doesn't
+extract again.
+"""
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+LOOKUP_WORKERS = 8
+
+# result row columns, in table/CSV order
+FIELDS = ('url', 'title', 'uploader', 'duration', 'max_height', 'heights', 'estimated_bytes', 'format',
+          'extractor', 'id', 'error')
+
+# sortable columns: how to compare rows (missing values sort last)
+SORT_KEYS = {
+    'title': lambda row: (row['title'] or '').lower(),
+    'uploader': lambda row: (row['uploader'] or '').lower(),
+    'duration': lambda row: row['duration'],
+    'height': lambda row: row['max_height'],
+    'size': lambda row: row['estimated_bytes'],
+    'url': lambda row: row['url'],
+}
+
+
+def summarize(url, info, estimate=None):
+    """Result row for an extracted info dict; estimate is engine.estimate()'s (bytes, description)"""
+    heights = sorted({f['height'] for f in info.get('formats') or [] if f.get('height')}, reverse=True)
+    if not heights and info.get('height'):
+        heights = [info['height']]
+    size, selection = estimate or (None, None)
+    return {
+        'url': url,
+        'title': info.get('title'),
+        'uploader': info.get('uploader') or info.get('channel'),
+        'duration': info.get('duration'),
+        'max_height': heights[0] if heights else None,
+        'heights': heights,
+        'estimated_bytes': size,
+        'format': selection,
+        'extractor': info.get('extractor_key') or info.get('extractor'),
+        'id': info.get('id'),
+        'error': None,
+    }
+
+
+def failed_row(url, error):
+    row = dict.fromkeys(FIELDS)
+    row.update(url=url, heights=[], error=str(error))
+    return row
+
+
+def sort_rows(rows, column, reverse=False):
+    """rows sorted by a SORT_KEYS column, rows without a value always last"""
+    key = SORT_KEYS[column]
+    present = [row for row in rows if key(row) not in (None, '')]
+    missing = [row for row in rows if key(row) in (None, '')]
+    return sorted(present, key=key, reverse=reverse) + missing
+
+
+class ResultWriter:
+    """Streams result rows to .csv, .jsonl (a row per line) or .json (one array, valid once closed)"""
+    def __init__(self, path):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.kind = os.path.splitext(path)[1].lower().lstrip('.')
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._lock = threading.Lock()
+        self._count = 0
+        if self.kind == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            self._csv.writeheader()
+        elif self.kind == 'json':
+            self._file.write('[')
+
+    def add(self, row):
+        with self._lock:
+            if self.kind == 'csv':
+                self._csv.writerow(dict(row, heights='/'.join(map(str, row['heights']))))
+            elif self.kind == 'json':
+                self._file.write((',\n' if self._count else '\n') + json.dumps(row))
+            else:
+                self._file.write(json.dumps(row) + '\n')
+            self._count += 1
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            if self.kind == 'json':
+                self._file.write('\n]\n')
+            self._file.close()
+
+
+def write_results(path, rows):
+    """Write finished rows in one go (format from the extension)"""
+    writer = ResultWriter(path)
+    try:
+        for row in rows:
+            writer.add(row)
+    finally:
+        writer.close()
+
+
+class BulkLookup:
+    """Looks up urls on `workers` threads, on_result(row) is called from those threads
+
+    options (job options) also gets each URL an estimated download size.
+    """
+    def __init__(self, engine, urls, options=None, on_result=None, workers=LOOKUP_WORKERS):
+        self.engine = engine
+        self.urls = list(dict.fromkeys(urls))  # duplicates looked up once
+        self.options = options
+        self.on_result = on_result
+        self.results = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='lookup')
+        self._futures = []
+
+    def start(self):
+        self._futures = [self._pool.submit(self._lookup, url) for url in self.urls]
+        self._pool.shutdown(wait=False)
+        return self
+
+    def cancel(self):
+        """Drop lookups that haven't started, running ones finish"""
+        self._cancelled.set()
+        for future in self._futures:
+            future.cancel()
+
+    def wait(self, timeout=None):
+        """Wait for every lookup that wasn't cancelled, returns the rows (arrival order)"""
+        for future in self._futures:
+            if not future.cancelled():
+                try:
+                    future.result(timeout=timeout)
+                except Exception:
+                    pass  # already a failed row
+        return list(self.results)
+
+    def done(self):
+        return all(future.done() for future in self._futures)
+
+    def _lookup(self, url):
+        if self._cancelled.is_set():
+            return None
+        try:
+            info = self.engine.get_info(url)
+            estimate = self.engine.estimate(info, self.options) if self.options else None
+            row = summarize(url, info, estimate)
+        except Exception as e:
+            row = failed_row(url, e)
+        with self._lock:
+            self.results.append(row)
+        if self.on_result:
+            self.on_result(row)
+        return row
@@ -0,0 +1,229 @@
+"""Job metrics: per-phase timings, bytes and throughput, rolled up per phase and per host
+
+Exported as a JSON snapshot or Prometheus text, to files or on a local
+HTTP endpoint (/metrics and /metrics.json).
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+PREFIX = 'thedownloader'
+
+# job phases in order; 'queue' is time waiting for a worker, 'process_queue' for the postprocessing pool
+PHASES = ('queue', 'extract', 'fetch', 'process_queue', 'process', 'finalize')
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+THROUGHPUT_BUCKETS = (64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2)
+UI_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+RECENT_JOBS = 200  # per-job records kept for the snapshot
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds (+Inf implied)"""
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(self.buckets)
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        return {'buckets': cumulative, 'sum': self.sum, 'count': self.count}
+
+
+def job_record(job):
+    """Per-job numbers: phase seconds, bytes, average/peak throughput, retries"""
+    fetch = job.phase_times.get('fetch', 0)
+    moved = job.bytes_moved()
+    controller = job.fragment_controller
+    return {
+        'id': job.id,
+        'host': job.host,
+        'state': job.state,
+        'phases': {phase: round(seconds, 3) for phase, seconds in job.phase_times.items()},
+        'bytes': moved,
+        'avg_bytes_per_s': moved / fetch if fetch and moved else None,
+        'peak_bytes_per_s': job.peak_speed,
+        'first_byte_s': round(job.first_byte, 3) if job.first_byte is not None else None,
+        'retries': job.attempts,
+        'fragment_errors': controller.errors if controller else 0,
+        'postprocessing': job.pp_path,
+    }
+
+
+class Metrics:
+    """Rolling aggregates over finished jobs, thread-safe"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.phases = {phase: Histogram(SECONDS_BUCKETS) for phase in PHASES}
+        self.hosts = {}  # host -> {'jobs': {state: n}, 'bytes': n, 'throughput': Histogram}
+        self.outcomes = {}
+        self.retries = 0
+        self.fragment_errors = 0
+        self.first_byte = Histogram(SECONDS_BUCKETS)
+        self.ui_tick = Histogram(UI_BUCKETS)
+        self.recent = deque(maxlen=RECENT_JOBS)
+        self._server = None
+
+    def job_finished(self, job):
+        """Fold a finished (done/failed/cancelled) job into the aggregates"""
+        record = job_record(job)
+        with self._lock:
+            self.outcomes[job.state] = self.outcomes.get(job.state, 0) + 1
+            for phase, seconds in job.phase_times.items():
+                if phase in self.phases:
+                    self.phases[phase].observe(seconds)
+            host = self.hosts.setdefault(job.host or 'unknown', {
+                'jobs': {}, 'bytes': 0, 'throughput': Histogram(THROUGHPUT_BUCKETS)})
+            host['jobs'][job.state] = host['jobs'].get(job.state, 0) + 1
+            host['bytes'] += record['bytes']
+            if record['avg_bytes_per_s']:
+                host['throughput'].observe(record['avg_bytes_per_s'])
+            if record['first_byte_s'] is not None:
+                self.first_byte.observe(record['first_byte_s'])
+            self.retries += record['retries']
+            self.fragment_errors += record['fragment_errors']
+            self.recent.append(record)
+
+    def throughput(self, host=None):
+        """Median fetch throughput (bytes/s) of recent finished jobs from host, else from any host"""
+        with self._lock:
+            records = [r for r in self.recent if r['state'] == 'done' and r['avg_bytes_per_s']]
+        speeds = ([r['avg_bytes_per_s'] for r in records if r['host'] == host]
+                  or [r['avg_bytes_per_s'] for r in records])
+        if not speeds:
+            return None
+        return statistics.median(speeds)
+
+    def observe_ui_tick(self, seconds):
+        with self._lock:
+            self.ui_tick.observe(seconds)
+
+    def snapshot(self):
+        """Everything as a JSON-able dict"""
+        with self._lock:
+            return {
+                'uptime_s': round(time.time() - self.started, 1),
+                'jobs': dict(self.outcomes),
+                'retries': self.retries,
+                'fragment_errors': self.fragment_errors,
+                'phase_seconds': {phase: hist.to_dict() for phase, hist in self.phases.items()},
+                'hosts': {host: {'jobs': dict(data['jobs']), 'bytes': data['bytes'],
+                                 'throughput_bytes_per_s': data['throughput'].to_dict()}
+                          for host, data in self.hosts.items()},
+                'first_byte_seconds': self.first_byte.to_dict(),
+                'ui_tick_seconds': self.ui_tick.to_dict(),
+                'recent_jobs': list(self.recent),
+            }
+
+    def prometheus(self):
+        """Prometheus text exposition format"""
+        snap = self.snapshot()
+        lines = []
+
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} histogram")
+            for labels, hist in series:
+                for bound, count in hist['buckets'].items():
+                    lines.append(f'{PREFIX}_{name}_bucket{{{labels}le="{bound}"}} {count}')
+                plain = _labels(labels.rstrip(','))
+                lines.append(f"{PREFIX}_{name}_sum{plain} {hist['sum']}")
+                lines.append(f"{PREFIX}_{name}_count{plain} {hist['count']}")
+
+        def counter(name, help_text, series):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            for labels, value in series:
+                lines.append(f"{PREFIX}_{name}{_labels(labels)} {value}")
+
+        counter('jobs_total', "Finished jobs by outcome",
+                [(f'state="{state}"', n) for state, n in snap['jobs'].items()])
+        counter('retries_total', "Jobs requeued after throttling", [('', snap['retries'])])
+        counter('fragment_errors_total', "Failed fragment fetches", [('', snap['fragment_errors'])])
+        counter('host_bytes_total', "Bytes downloaded per host",
+                [(f'host="{_escape(host)}"', data['bytes']) for host, data in snap['hosts'].items()])
+        histogram('phase_seconds', "Time jobs spent in each phase",
+                  [(f'phase="{phase}",', hist) for phase, hist in snap['phase_seconds'].items()])
+        histogram('host_throughput_bytes_per_second', "Average fetch throughput of jobs per host",
+                  [(f'host="{_escape(host)}",', data['throughput_bytes_per_s'])
+                   for host, data in snap['hosts'].items()])
+        histogram('first_byte_seconds', "Time from a job leaving the queue to its first byte",
+                  [('', snap['first_byte_seconds'])])
+        histogram('ui_tick_seconds', "Time spent in one GUI refresh tick", [('', snap['ui_tick_seconds'])])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write a snapshot; .prom/.txt files get Prometheus text, anything else JSON"""
+        if path.endswith(('.prom', '.txt')):
+            text = self.prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=2) + '\n'
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics (Prometheus) and /metrics.json on a local port, returns the bound port"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only when serving, it's slow to import
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.prometheus(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot()), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _labels(labels):
+    return f"{{{labels}}}" if labels else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
@@ -0,0 +1,160 @@
+"""Postprocessing planner: decide no-op / stream copy / transcode per job before downloading
+
+Re-encoding is by far the most expensive thing we do to a file, so we only
+do it when the chosen source formats can't simply be copied into the target.
+"""
+
+# what each target container can hold without re-encoding (None = anything)
+CONTAINER_CODECS = {
+    'mp4': ({'avc1', 'avc3', 'h264', 'hev1', 'hvc1', 'h265', 'hevc', 'av01', 'mp4v'},
+            {'mp4a', 'aac', 'mp3', 'opus', 'flac', 'ac-3', 'ec-3', 'alac'}),
+    'webm': ({'vp8', 'vp9', 'vp09', 'av01'}, {'opus', 'vorbis'}),
+    'mkv': (None, None),
+    'avi': (set(), set()),  # never copy into avi, old behaviour: always convert
+}
+
+# our audio format -> (yt-dlp preferredcodec, file ext, source codecs that can be copied)
+AUDIO_TARGETS = {
+    'mp3': ('mp3', 'mp3', {'mp3'}),
+    'aac': ('aac', 'aac', {'mp4a', 'aac'}),  # raw ADTS stream, an m4a source is copied out of its container
+    'm4a': ('m4a', 'm4a', {'mp4a', 'aac'}),
+    'ogg': ('vorbis', 'ogg', {'vorbis'}),
+    'flac': ('flac', 'flac', {'flac'}),
+    'wav': ('wav', 'wav', set()),
+}
+
+# format sort that makes yt-dlp prefer sources we won't have to re-encode,
+# after resolution so quality isn't traded away for it
+VIDEO_FORMAT_SORT = {
+    'mp4': ['res', 'fps', 'ext:mp4:m4a'],
+    'webm': ['res', 'fps', 'ext:webm:webm'],
+}
+# for audio the bitrate comes first too: the codec only decides between equal qualities
+AUDIO_FORMAT_SORT = {
+    'mp3': ['abr', 'acodec:mp3'],
+    'aac': ['abr', 'acodec:aac'],
+    'm4a': ['abr', 'acodec:aac'],
+    'ogg': ['abr', 'acodec:vorbis'],
+    'flac': ['abr', 'acodec:flac'],
+}
+
+STANDARD_BITRATES = [96, 128, 192, 256, 320]
+
+# plan paths, in order of cost
+NOOP, REMUX, TRANSCODE = 'none', 'remux', 'transcode'
+
+# codec of a stream the extractor gave no codec for: in no container's list, so never copied but into mkv
+UNKNOWN = 'unknown'
+
+
+def codec_name(codec):
+    """'avc1.64001F' -> 'avc1', None/'none' -> None"""
+    if not codec or codec == 'none':
+        return None
+    return codec.split('.')[0].lower()
+
+
+def format_sort_for(options):
+    """yt-dlp format_sort preferring sources that fit the target as-is"""
+    if options['download_type'] == 'audio':
+        return list(AUDIO_FORMAT_SORT.get(options['file_format'], []))
+    return list(VIDEO_FORMAT_SORT.get(options['file_format'], []))
+
+
+def stream_codec(formats, field):
+    """Codec of the first format with a `field` ('vcodec'/'acodec') stream
+
+    None if none has such a stream ('none'), UNKNOWN if the extractor didn't say.
+    """
+    for f in formats:
+        name = codec_name(f.get(field))
+        if name:
+            return name
+    return UNKNOWN if any(f.get(field) is None for f in formats) else None
+
+
+def selected_formats(info):
+    """Formats yt-dlp picked for a processed info dict"""
+    return info.get('requested_formats') or [info]
+
+
+def fits(container, vcodec, acodec):
+    """True if the streams can be copied into container (None: no such stream, UNKNOWN only fits mkv)"""
+    video_ok, audio_ok = CONTAINER_CODECS.get(container, (set(), set()))
+    if vcodec and video_ok is not None and vcodec not in video_ok:
+        return False
+    if acodec and audio_ok is not None and acodec not in audio_ok:
+        return False
+    return True
+
+
+def audio_quality(quality, source_abr):
+    """preferredquality for a lossy encode: the asked bitrate, or for Best the source's (rounded up)"""
+    if quality != 'Best':
+        return quality.replace('k', '')
+    if not source_abr:
+        return '320'
+    for bitrate in STANDARD_BITRATES:
+        if source_abr <= bitrate:
+            return str(bitrate)
+    return '320'
+
+
+def plan_postprocessing(info, options):
+    """Pick the cheapest path for a processed info dict
+
+    Returns {'path', 'postprocessors', 'merge_output_format', 'description'}
+    """
+    formats = selected_formats(info)
+    if options['download_type'] == 'audio':
+        return plan_audio(formats, options)
+    return plan_video(formats, options)
+
+
+def plan_video(formats, options):
+    target = options['file_format']
+    vcodec = stream_codec(formats, 'vcodec')
+    acodec = stream_codec(formats, 'acodec')
+    codecs = '/'.join(c for c in (vcodec, acodec) if c) or 'unknown codecs'
+    merging = len(formats) > 1
+    source_ext = formats[0].get('ext') if not merging else None
+
+    if fits(target, vcodec, acodec):
+        if merging:
+            return {'path': REMUX, 'postprocessors': [], 'merge_output_format': target,
+                    'description': f"stream copy: merge {codecs} into {target}"}
+        if source_ext == target:
+            return {'path': NOOP, 'postprocessors': [], 'merge_output_format': target,
+                    'description': f"no conversion needed ({codecs} already in {target})"}
+        return {'path': REMUX,
+                'postprocessors': [{'key': 'FFmpegVideoRemuxer', 'preferedformat': target}],
+                'merge_output_format': target,
+                'description': f"stream copy: remux {source_ext} ({codecs}) into {target}"}
+
+    # merge into mkv (takes any codec) and convert from there
+    return {'path': TRANSCODE,
+            'postprocessors': [{'key': 'FFmpegVideoConvertor', 'preferedformat': target}],
+            'merge_output_format': 'mkv',
+            'description': f"transcode: {codecs} can't go into {target} as-is"}
+
+
+def plan_audio(formats, options):
+    target = options['file_format']
+    preferred, ext, copyable = AUDIO_TARGETS.get(target, (target, target, set()))
+    audio = next((f for f in formats if codec_name(f.get('acodec'))), formats[0])
+    acodec = codec_name(audio.get('acodec'))
+
+    if acodec in copyable:
+        if audio.get('ext') == ext and len(formats) == 1:
+            return {'path': NOOP, 'postprocessors': [], 'merge_output_format': None,
+                    'description': f"no conversion needed ({acodec} already in {ext})"}
+        return {'path': REMUX,
+                'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': preferred}],
+                'merge_output_format': None,
+                'description': f"stream copy: {acodec} into {ext}"}
+
+    return {'path': TRANSCODE,
+            'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': preferred,
+                                'preferredquality': audio_quality(options['quality'], audio.get('abr'))}],
+            'merge_output_format': None,
+            'description': f"transcode: {acodec or 'unknown codec'} -> {target}"}
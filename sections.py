@@ -0,0 +1,142 @@
+"""Clip downloads: time ranges or chapters of a video instead of the whole file
+
+Jobs with `sections` (time ranges) or `chapters` (title patterns) in their
+options hand yt-dlp a `download_ranges` function. yt-dlp then fetches each
+clip with ffmpeg, which seeks in the source before reading it: HTTP range
+requests into a progressive file, only the segments covering the range of an
+HLS/DASH stream. Bytes fetched and any conversion afterwards scale with the
+clip, not with the source.
+
+Cuts are stream copies, so a clip starts at the keyframe at or before the
+asked start (usually a few seconds early); `exact_cuts` re-encodes the clip
+to cut on the exact frame.
+"""
+import re
+
+_CLOCK = re.compile(r'^(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d+)?)$')
+_UNITS = re.compile(r'^(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s)?$')
+# START-END, START+LENGTH, START- (to the end)
+_RANGE = re.compile(r'^([\d:.hms]+)\s*([-+])\s*([\d:.hms]*)$')
+
+
+def parse_time(text):
+    """'90', '1:30', '1:02:03.5', '1h2m3s' -> seconds (ValueError otherwise)"""
+    text = text.strip().lower()
+    match = _CLOCK.match(text)
+    if match:
+        hours, minutes, seconds = match.groups()
+        return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds)
+    match = _UNITS.match(text)
+    if text and match:
+        hours, minutes, seconds = (float(value or 0) for value in match.groups())
+        return hours * 3600 + minutes * 60 + seconds
+    raise ValueError(f"not a time: {text!r}")
+
+
+def parse_range(text):
+    """'1:00-1:30', '1:00:00+30', '45:00-' -> [start, end] (end None: to the end), None if text isn't a range"""
+    match = _RANGE.match(text.strip().lower())
+    if not match:
+        return None
+    start, sign, end = match.groups()
+    start = parse_time(start)
+    if not end:
+        if sign == '+':
+            raise ValueError(f"no length after '+' in {text!r}")
+        return [start, None]
+    end = parse_time(end) + (start if sign == '+' else 0)
+    if end <= start:
+        raise ValueError(f"range ends before it starts: {text!r}")
+    return [start, end]
+
+
+def parse_sections(text):
+    """'1:00-1:30, 2:00:00+30' and chapter title patterns -> (ranges, chapter patterns)
+
+    Parts are separated by commas or new lines. Anything that isn't a range is
+    a regular expression searched (ignoring case) in chapter titles.
+    """
+    ranges, chapters = [], []
+    for part in re.split(r'[,\n]', text):
+        part = part.strip()
+        if not part:
+            continue
+        span = parse_range(part)
+        if span:
+            ranges.append(span)
+            continue
+        try:
+            re.compile(part)
+        except re.error as e:
+            raise ValueError(f"bad chapter pattern {part!r}: {e}")
+        chapters.append(part)
+    return ranges, chapters
+
+
+def has_clip(options):
+    return bool(options.get('sections') or options.get('chapters'))
+
+
+def clip_ranges(info, options):
+    """[(start, end, title)] to download from a video, within its duration and in order
+
+    end is None when a range runs to the end of a video of unknown length.
+    """
+    duration = info.get('duration')
+    found = []
+    for pattern in options.get('chapters') or ():
+        for chapter in info.get('chapters') or ():
+            if re.search(pattern, chapter.get('title') or '', re.IGNORECASE):
+                found.append((chapter['start_time'], chapter.get('end_time', duration), chapter.get('title')))
+    for start, end in options.get('sections') or ():
+        if duration:
+            end = min(end, duration) if end is not None else duration
+            if start >= end:
+                continue  # starts after the video ends
+        found.append((start, end, None))
+    return sorted(dict.fromkeys(found), key=lambda clip: clip[0])
+
+
+def clip_seconds(info, options):
+    """Total length of the clips (None if one runs to an unknown end)"""
+    clips = clip_ranges(info, options)
+    if any(end is None for _, end, _ in clips):
+        return None
+    return sum(end - start for start, end, _ in clips)
+
+
+def clip_share(info, options):
+    """Share of the source the clips cover (1.0 for whole-file jobs or when it's unknown)"""
+    duration = info.get('duration')
+    if not has_clip(options) or not duration:
+        return 1.0
+    seconds = clip_seconds(info, options)
+    return min(seconds / duration, 1.0) if seconds is not None else 1.0
+
+
+def describe_clips(options):
+    """'1:00-1:30, chapter "intro"' for logs"""
+    parts = [f"{format_time(start)}-{format_time(end) if end is not None else 'end'}"
+             for start, end in options.get('sections') or ()]
+    parts += [f'chapter "{pattern}"' for pattern in options.get('chapters') or ()]
+    return ', '.join(parts)
+
+
+def format_time(seconds):
+    seconds = round(seconds, 1)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    text = f"{hours}:{minutes:02d}:" if hours else f"{minutes}:"
+    return text + (f"{seconds:04.1f}" if seconds % 1 else f"{int(seconds):02d}")
+
+
+def range_function(options):
+    """yt-dlp `download_ranges` callable for a job's options"""
+    def download_ranges(info, ydl):
+        clips = clip_ranges(info, options)
+        if not clips:
+            raise ValueError(f"nothing to download for {describe_clips(options)} "
+                             f"({len(info.get('chapters') or [])} chapters, duration {info.get('duration')})")
+        return [{'start_time': start, 'end_time': float('inf') if end is None else end, 'title': title,
+                 'index': index} for index, (start, end, title) in enumerate(clips, 1)]
+    return download_ranges
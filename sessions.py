@@ -0,0 +1,131 @@
+"""Pool of long-lived YoutubeDL instances shared by jobs
+
+Building a YoutubeDL sets up extractor instances, the cookie jar and the HTTP
+handlers with their connection pools. A job that gets a warm instance skips
+all of that and reuses keep-alive connections and extractor state (player
+caches, site tokens) from the jobs before it.
+
+An instance serves one job at a time. On acquire the job's options are
+swapped in; what a job attached (hooks, postprocessors, patched methods,
+format selector) is replaced, never carried over to the next job.
+"""
+import threading
+from contextlib import contextmanager
+
+from fragments import CONTROLLER_PARAM
+
+# options read when used, so they can change per job; every other option is
+# fixed when the instance is built and only jobs that agree on it share one
+JOB_OPTIONS = frozenset({
+    'format', 'format_sort', 'outtmpl', 'merge_output_format',
+    'progress_hooks', 'post_hooks', 'postprocessor_hooks',
+    'quiet', 'no_warnings', 'noprogress', 'noplaylist', 'continuedl', 'extract_flat',
+    'concurrent_fragment_downloads', 'http_chunk_size', CONTROLLER_PARAM,
+    'ffmpeg_location', 'ffprobe_location', 'download_ranges', 'force_keyframes_at_cuts',
+})
+
+HOOK_OPTIONS = (
+    ('progress_hooks', 'add_progress_hook'),
+    ('post_hooks', 'add_post_hook'),
+    ('postprocessor_hooks', 'add_postprocessor_hook'),
+)
+
+
+def session_key(params):
+    """Hashable form of the build-time options"""
+    return tuple(sorted((name, repr(value)) for name, value in params.items() if name not in JOB_OPTIONS))
+
+
+class SessionPool:
+    """Idle YoutubeDL instances by build-time options, most recently used first
+
+    max_idle: instances kept between jobs (0 = build one per job, like before)
+    """
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._idle = {}      # session key -> [YoutubeDL]
+        self._sessions = {}  # YoutubeDL -> (key, params right after it was built, format selector cache)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, params):
+        """A YoutubeDL set up with params, exclusive to the caller until release()"""
+        key = session_key(params)
+        with self._lock:
+            idle = self._idle.get(key)
+            ydl = idle.pop() if idle else None
+            if ydl is not None:
+                self.reused += 1
+        if ydl is None:
+            from yt_dlp import YoutubeDL
+            ydl = YoutubeDL({name: value for name, value in params.items() if name not in JOB_OPTIONS})
+            with self._lock:
+                self._sessions[ydl] = (key, dict(ydl.params), {})
+                self.created += 1
+        self._prepare(ydl, params)
+        return ydl
+
+    def release(self, ydl, reusable=True):
+        """Return an instance; broken ones (failed/cancelled job) are closed instead of kept"""
+        with self._lock:
+            key = self._sessions[ydl][0]
+            idle = self._idle.setdefault(key, [])
+            keep = reusable and not self._closed and sum(map(len, self._idle.values())) < self.max_idle
+            if keep:
+                idle.append(ydl)
+            else:
+                del self._sessions[ydl]
+        if not keep:
+            ydl.close()
+
+    @contextmanager
+    def session(self, params):
+        ydl = self.acquire(params)
+        try:
+            yield ydl
+        except BaseException:
+            self.release(ydl, reusable=False)
+            raise
+        self.release(ydl)
+
+    def stats(self):
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused,
+                    'idle': sum(map(len, self._idle.values()))}
+
+    def close(self):
+        """Close idle instances; ones in use are closed when released"""
+        with self._lock:
+            self._closed = True
+            idle = [ydl for sessions in self._idle.values() for ydl in sessions]
+            self._idle.clear()
+            for ydl in idle:
+                del self._sessions[ydl]
+        for ydl in idle:
+            ydl.close()
+
+    def _prepare(self, ydl, params):
+        """Swap in a job's options and drop whatever the previous job attached"""
+        from yt_dlp.utils import POSTPROCESS_WHEN
+        _, base, selectors = self._sessions[ydl]
+        ydl.params = dict(base, **params)
+        ydl._parse_outtmpl()
+        spec = ydl.params.get('format')
+        if spec in (None, '-') or callable(spec):
+            ydl.format_selector = spec
+        else:
+            if spec not in selectors:
+                selectors[spec] = ydl.build_format_selector(spec)
+            ydl.format_selector = selectors[spec]
+        ydl._progress_hooks, ydl._post_hooks, ydl._postprocessor_hooks = [], [], []
+        for option, add_hook in HOOK_OPTIONS:
+            for hook in params.get(option, ()):
+                getattr(ydl, add_hook)(hook)
+        ydl._pps = {when: [] for when in POSTPROCESS_WHEN}
+        ydl._num_downloads = 0
+        ydl._download_retcode = 0
+        ydl._playlist_level = 0
+        ydl._playlist_urls = set()
+        ydl.__dict__.pop('post_process', None)  # the engine defers postprocessing per job
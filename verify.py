@@ -0,0 +1,97 @@
+"""Post-download verification: probe a finished file with ffprobe and compare it to what was extracted"""
+import json
+import shutil
+import subprocess
+
+from sections import clip_ranges, has_clip
+
+# our file format -> ffprobe format_name parts any of which is fine
+CONTAINERS = {
+    'mp4': {'mp4', 'mov'},
+    'm4a': {'mp4', 'mov', 'm4a'},
+    'aac': {'aac', 'mp4', 'mov', 'm4a'},
+    'mkv': {'matroska'},
+    'webm': {'webm', 'matroska'},
+    'avi': {'avi'},
+    'mp3': {'mp3'},
+    'ogg': {'ogg'},
+    'flac': {'flac'},
+    'wav': {'wav'},
+}
+
+# allowed duration difference: this many seconds or this fraction, whichever is larger
+DURATION_SLACK = 2.0
+DURATION_SLACK_RATIO = 0.02
+
+PROBE_TIMEOUT = 60
+
+
+def find_ffprobe(ffprobe_path=None):
+    """ffprobe to use: the configured one, else the one on PATH (None if there's none)"""
+    return ffprobe_path or shutil.which('ffprobe')
+
+
+def expectations(info, options):
+    """What a finished file should look like, from the extracted info (small, kept until verified)"""
+    formats = info.get('requested_formats') or [info]
+
+    def has(kind):
+        return any(f.get(kind) not in (None, 'none') for f in formats)
+    audio_only = options['download_type'] == 'audio'
+    duration = info.get('duration')
+    if has_clip(options):
+        # copied cuts start at the keyframe before the start, only exact cuts have a known length
+        clips = clip_ranges(info, options)
+        exact = options.get('exact_cuts') and len(clips) == 1 and clips[0][1] is not None
+        duration = clips[0][1] - clips[0][0] if exact else None
+    return {
+        'file_format': options['file_format'],
+        'duration': duration,
+        'video': not audio_only and has('vcodec'),
+        'audio': audio_only or has('acodec'),
+    }
+
+
+def probe(path, ffprobe):
+    """ffprobe's format + streams for path"""
+    proc = subprocess.run([ffprobe, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+                          capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"ffprobe exited with {proc.returncode}")
+    return json.loads(proc.stdout or '{}')
+
+
+def check(result, expected):
+    """Problems found comparing a probe result to expectations() (empty list = fine)"""
+    problems = []
+    container = result.get('format', {}).get('format_name', '')
+    wanted = CONTAINERS.get(expected['file_format'])
+    if wanted and not wanted & set(container.split(',')):
+        problems.append(f"container is {container or 'unknown'}, expected {expected['file_format']}")
+
+    kinds = {stream.get('codec_type') for stream in result.get('streams', [])}
+    if expected['video'] and 'video' not in kinds:
+        problems.append("no video stream")
+    if expected['audio'] and 'audio' not in kinds:
+        problems.append("no audio stream")
+
+    duration = expected.get('duration')
+    try:
+        actual = float(result.get('format', {}).get('duration'))
+    except (TypeError, ValueError):
+        actual = None
+    if duration and actual is not None:
+        slack = max(DURATION_SLACK, duration * DURATION_SLACK_RATIO)
+        if abs(actual - duration) > slack:
+            problems.append(f"duration is {actual:.1f}s, expected {duration:.1f}s")
+    elif duration:
+        problems.append("duration unknown")
+    return problems
+
+
+def verify_file(path, expected, ffprobe):
+    """Problems with the file at path (empty list = fine)"""
+    try:
+        return check(probe(path, ffprobe), expected)
+    except (OSError, RuntimeError, ValueError, subprocess.TimeoutExpired) as e:
+        return [f"ffprobe failed: {e}"]